@@ -0,0 +1,179 @@
+# 📦 Response-Kompression (brotli/gzip) + Payload-Budgets
+# Reine ASGI-Middleware: funktioniert auch mit StreamingResponse (Export) und
+# fasst Bilder, Archive und bereits komprimierte Antworten nicht an.
+
+import logging
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli ist optional - dann nur gzip
+    brotli = None
+
+logger = logging.getLogger("compression")
+
+# Inhalte, die bereits komprimiert sind oder gestreamt werden müssen
+SKIP_CONTENT_TYPES = (
+    "image/", "video/", "audio/", "font/woff", "font/woff2",
+    "application/zip", "application/gzip", "application/x-gzip", "application/x-brotli",
+    "application/pdf", "application/octet-stream", "text/event-stream",
+)
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """'br;q=1.0, gzip;q=0.8, *;q=0' -> {'br': 1.0, 'gzip': 0.8, '*': 0.0}"""
+    encodings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        encodings[name.strip().lower()] = quality
+    return encodings
+
+def choose_encoding(header: str) -> Optional[str]:
+    encodings = parse_accept_encoding(header)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0.0
+    for name in candidates:
+        quality = encodings.get(name, encodings.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+class StreamCompressor:
+    """Incremental gzip/brotli compressor for chunked bodies"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self.compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.process(data) + self.compressor.flush()
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush(zlib.Z_FINISH)
+
+class CompressionMiddleware:
+    """Negotiated brotli/gzip compression with per-endpoint payload budgets.
+
+    budgets is a list of (regex, max uncompressed bytes); the first pattern
+    matching the path wins, None disables the budget (e.g. for exports).
+    Violations are logged and counted in self.violations.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4,
+                 budgets: Optional[List[Tuple[str, Optional[int]]]] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.budgets = [(re.compile(pattern), limit) for pattern, limit in (budgets or [])]
+        self.violations: Dict[str, int] = {}
+
+    def budget_for(self, path: str) -> Optional[int]:
+        for pattern, limit in self.budgets:
+            if pattern.match(path):
+                return limit
+        return None
+
+    def check_budget(self, scope, budget: Optional[int], raw_size: int, sent_size: int):
+        if budget is None or raw_size <= budget:
+            return
+        path = scope.get("path", "")
+        self.violations[path] = self.violations.get(path, 0) + 1
+        logger.warning(
+            f"📦 Payload-Budget überschritten: {scope.get('method')} {path} "
+            f"{raw_size / 1024:.0f} KB (gesendet {sent_size / 1024:.0f} KB, Budget {budget / 1024:.0f} KB)"
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        budget = self.budget_for(scope.get("path", ""))
+
+        start_message = None
+        compressor: Optional[StreamCompressor] = None
+        passthrough = False
+        raw_size = 0
+        sent_size = 0
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough, raw_size, sent_size
+
+            if message["type"] == "http.response.start":
+                # Hold back the headers until the first body chunk decides the encoding
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            raw_size += len(body)
+
+            if start_message is not None:
+                response_headers = [(key.lower(), value) for key, value in start_message["headers"]]
+                content_type = next((v.decode("latin-1") for k, v in response_headers if k == b"content-type"), "")
+                already_encoded = any(k == b"content-encoding" for k, _ in response_headers)
+
+                passthrough = (
+                    encoding is None
+                    or already_encoded
+                    or content_type.startswith(SKIP_CONTENT_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                )
+                if not passthrough:
+                    compressor = StreamCompressor(encoding, self.gzip_level, self.brotli_quality)
+                    response_headers = [(k, v) for k, v in response_headers if k != b"content-length"]
+                    response_headers.append((b"content-encoding", encoding.encode()))
+                    vary = [v for k, v in response_headers if k == b"vary"]
+                    response_headers = [(k, v) for k, v in response_headers if k != b"vary"]
+                    vary_value = b", ".join(vary + [b"Accept-Encoding"])
+                    response_headers.append((b"vary", vary_value))
+                    # The compressed bytes differ from what a strong ETag names
+                    response_headers = [(k, b"W/" + v if k == b"etag" and not v.startswith(b"W/") else v)
+                                        for k, v in response_headers]
+                    if not more_body:
+                        # Complete body: compress in one go and send an exact length
+                        body = compressor.compress(body) + compressor.finish()
+                        response_headers.append((b"content-length", str(len(body)).encode()))
+                start_message = {**start_message, "headers": response_headers}
+                await send(start_message)
+                start_message = None
+
+                if not passthrough and not more_body:
+                    sent_size += len(body)
+                    await send({"type": "http.response.body", "body": body, "more_body": False})
+                    self.check_budget(scope, budget, raw_size, sent_size)
+                    return
+
+            if not passthrough:
+                body = compressor.compress(body) if body else b""
+                if not more_body:
+                    body += compressor.finish()
+            sent_size += len(body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+            if not more_body:
+                self.check_budget(scope, budget, raw_size, sent_size)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,241 @@
+# 🗺️ Bezirksgrenzen: Punkt-in-Polygon mit Raster-Index
+# Bezirke haben eine GeoJSON-Grenze (Polygon oder MultiPolygon, [lng, lat]).
+# Über alle Grenzen wird ein dichtes Raster gelegt (~200 m Zellen):
+#   - Zellen ganz innerhalb eines Bezirks    -> Bezirk direkt ablesbar
+#   - Zellen ganz außerhalb                  -> kein Bezirk
+#   - Zellen, durch die eine Kante läuft     -> exakter Test (Strahlverfahren)
+# Für Randzellen ist beim Aufbau bekannt, ob ihr Mittelpunkt innen liegt;
+# beim Lookup zählen nur die Kanten dieser Zelle, die die Strecke Mittelpunkt
+# -> Punkt kreuzen. Liegt der Mittelpunkt auf einer Kante (Grenzen mit runden
+# Koordinaten), dient ein anderer Punkt der Zelle als Referenz.
+# Die meisten Punkte kosten einen Array-Zugriff, Randpunkte eine Handvoll
+# Kantentests.
+
+import asyncio
+import math
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+OUTSIDE = -1
+BOUNDARY = -2
+MAX_GRID_CELLS = 1_000_000
+# Reference points inside a boundary cell (fractions of the cell), centre first
+REFERENCE_OFFSETS = ((0.5, 0.5), (0.382, 0.618), (0.618, 0.382), (0.236, 0.236), (0.764, 0.764))
+
+Ring = List[Tuple[float, float]]  # (lng, lat), closed implicitly
+
+
+def boundary_rings(boundary: Any) -> List[Ring]:
+    """Rings of a GeoJSON Polygon/MultiPolygon; raises ValueError if malformed"""
+    if not isinstance(boundary, dict) or boundary.get("type") not in ("Polygon", "MultiPolygon"):
+        raise ValueError("boundary must be a GeoJSON Polygon or MultiPolygon")
+    polygons = [boundary.get("coordinates")] if boundary["type"] == "Polygon" else boundary.get("coordinates")
+    if not isinstance(polygons, list) or not polygons:
+        raise ValueError("boundary has no coordinates")
+    rings: List[Ring] = []
+    for polygon in polygons:
+        if not isinstance(polygon, list) or not polygon:
+            raise ValueError("polygon needs at least one ring")
+        for ring in polygon:
+            try:
+                points = [(float(point[0]), float(point[1])) for point in ring]
+            except (TypeError, ValueError, IndexError):
+                raise ValueError("ring positions must be [lng, lat]")
+            if len(points) > 1 and points[0] == points[-1]:
+                points = points[:-1]
+            if len(points) < 3:
+                raise ValueError("ring needs at least 3 distinct positions")
+            if any(not -180 <= lng <= 180 or not -90 <= lat <= 90 for lng, lat in points):
+                raise ValueError("positions out of range")
+            rings.append(points)
+    return rings
+
+
+def points_in_polygon(x: np.ndarray, y: np.ndarray, edges: np.ndarray, chunk: int = 2048) -> np.ndarray:
+    """Even-odd ray casting of many points against all edges (vectorized, chunked)"""
+    result = np.zeros(len(x), bool)
+    x1, y1, x2, y2 = (edges[:, column][None, :] for column in range(4))
+    for start in range(0, len(x), chunk):
+        px = x[start:start + chunk, None]
+        py = y[start:start + chunk, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing = ((y1 > py) != (y2 > py)) & (px < x1 + (py - y1) * (x2 - x1) / (y2 - y1))
+        result[start:start + chunk] = crossing.sum(axis=1) % 2 == 1
+    return result
+
+
+def distance_to_segments(x: float, y: float, segments: Sequence[Tuple[float, float, float, float]]) -> float:
+    """Shortest distance (in degrees) from a point to any of the segments"""
+    closest = math.inf
+    for x1, y1, x2, y2 in segments:
+        dx, dy = x2 - x1, y2 - y1
+        length = dx * dx + dy * dy
+        f = min(max(((x - x1) * dx + (y - y1) * dy) / length, 0.0), 1.0) if length else 0.0
+        closest = min(closest, math.hypot(x - x1 - f * dx, y - y1 - f * dy))
+    return closest
+
+
+class DistrictIndex:
+    def __init__(self, districts: Sequence[Dict[str, Any]], cell_deg: float = 0.002):
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        edges: List[np.ndarray] = []  # per district: (n, 4) x1, y1, x2, y2
+        for district in districts:
+            try:
+                rings = boundary_rings(district.get("boundary"))
+            except ValueError:
+                continue
+            segments = []
+            for ring in rings:
+                points = np.array(ring)
+                segments.append(np.hstack([points, np.roll(points, -1, axis=0)]))
+            self.ids.append(district["id"])
+            self.names.append(district.get("name", district["id"]))
+            edges.append(np.vstack(segments))
+
+        self.edges = edges
+        self.grid = np.full((0, 0), OUTSIDE, np.int32)
+        # boundary cell -> [(district, reference x, reference y, reference inside?, edges in the cell)]
+        self.candidates: Dict[Tuple[int, int], List[tuple]] = {}
+        self.build_seconds = 0.0
+        if edges:
+            self.build(cell_deg)
+
+    def build(self, cell_deg: float):
+        started = time.perf_counter()
+        everything = np.vstack(self.edges)
+        self.x0 = float(min(everything[:, 0].min(), everything[:, 2].min()))
+        self.y0 = float(min(everything[:, 1].min(), everything[:, 3].min()))
+        width = float(max(everything[:, 0].max(), everything[:, 2].max())) - self.x0
+        height = float(max(everything[:, 1].max(), everything[:, 3].max())) - self.y0
+        # Coarser cells if the districts span a huge area
+        cell_deg = max(cell_deg, math.sqrt(width * height / MAX_GRID_CELLS))
+        self.cell = cell_deg
+        self.columns = int(width / cell_deg) + 1
+        self.rows = int(height / cell_deg) + 1
+        self.grid = np.full((self.rows, self.columns), OUTSIDE, np.int32)
+
+        for index, edges in enumerate(self.edges):
+            # Cells touched by an edge (its bounding box - conservative is fine)
+            cx1 = ((np.minimum(edges[:, 0], edges[:, 2]) - self.x0) / cell_deg).astype(int)
+            cx2 = ((np.maximum(edges[:, 0], edges[:, 2]) - self.x0) / cell_deg).astype(int)
+            cy1 = ((np.minimum(edges[:, 1], edges[:, 3]) - self.y0) / cell_deg).astype(int)
+            cy2 = ((np.maximum(edges[:, 1], edges[:, 3]) - self.y0) / cell_deg).astype(int)
+            local: Dict[Tuple[int, int], List[Tuple[float, float, float, float]]] = {}
+            for edge, (a, b, c, d) in enumerate(zip(cx1.tolist(), cx2.tolist(), cy1.tolist(), cy2.tolist())):
+                segment = tuple(edges[edge].tolist())
+                for row in range(c, d + 1):
+                    for column in range(a, b + 1):
+                        local.setdefault((row, column), []).append(segment)
+
+            # Every cell of the bounding box gets its centre classified once
+            rows, columns = np.mgrid[cy1.min():cy2.max() + 1, cx1.min():cx2.max() + 1]
+            rows, columns = rows.ravel(), columns.ravel()
+            centres_x = self.x0 + (columns + 0.5) * cell_deg
+            centres_y = self.y0 + (rows + 0.5) * cell_deg
+            inside = points_in_polygon(centres_x, centres_y, edges)
+            for row, column, x, y, centre_inside in zip(rows.tolist(), columns.tolist(), centres_x.tolist(),
+                                                         centres_y.tolist(), inside.tolist()):
+                cell_edges = local.get((row, column))
+                if cell_edges is not None:
+                    if distance_to_segments(x, y, cell_edges) < cell_deg * 1e-6:
+                        # Edges through the reference point can't be counted at lookup
+                        x, y = self.reference_point(row, column, cell_edges)
+                        centre_inside = bool(points_in_polygon(np.array([x]), np.array([y]), edges)[0])
+                    self.candidates.setdefault((row, column), []).append((index, x, y, centre_inside, cell_edges))
+                elif centre_inside and self.grid[row, column] == OUTSIDE:
+                    # No edge crosses the cell, so the centre decides all of it
+                    self.grid[row, column] = index
+
+        for position in self.candidates:
+            self.grid[position] = BOUNDARY
+        self.build_seconds = time.perf_counter() - started
+
+    def reference_point(self, row: int, column: int, cell_edges) -> Tuple[float, float]:
+        """Point of the cell farthest from its edges among REFERENCE_OFFSETS"""
+        points = [(self.x0 + (column + fx) * self.cell, self.y0 + (row + fy) * self.cell)
+                  for fx, fy in REFERENCE_OFFSETS]
+        return max(points, key=lambda point: distance_to_segments(*point, cell_edges))
+
+    def lookup_index(self, lat: float, lng: float) -> int:
+        if not self.ids:
+            return OUTSIDE
+        row = int((lat - self.y0) // self.cell)
+        column = int((lng - self.x0) // self.cell)
+        if not 0 <= row < self.rows or not 0 <= column < self.columns:
+            return OUTSIDE
+        owner = int(self.grid[row, column])
+        if owner != BOUNDARY:
+            return owner
+        # Inside = reference status flipped once per edge between reference and point
+        for index, cx, cy, inside, edges in self.candidates[(row, column)]:
+            for x1, y1, x2, y2 in edges:
+                side_centre = (x2 - x1) * (cy - y1) - (y2 - y1) * (cx - x1)
+                side_point = (x2 - x1) * (lat - y1) - (y2 - y1) * (lng - x1)
+                if (side_centre > 0) != (side_point > 0) and side_centre and side_point:
+                    # Half-open test for the edge end points (like ray casting)
+                    if ((lng - cx) * (y1 - cy) - (lat - cy) * (x1 - cx) > 0) != \
+                            ((lng - cx) * (y2 - cy) - (lat - cy) * (x2 - cx) > 0):
+                        inside = not inside
+            if inside:
+                return index
+        return OUTSIDE
+
+    def lookup(self, lat: float, lng: float) -> Optional[str]:
+        """District id for a position, None outside every boundary"""
+        index = self.lookup_index(lat, lng)
+        return self.ids[index] if index >= 0 else None
+
+    def assign(self, lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+        """Vectorized lookup_index: grid read for all points, exact test only on boundary cells"""
+        result = np.full(len(lat), OUTSIDE, np.int64)
+        if not self.ids or not len(lat):
+            return result
+        rows = np.floor((lat - self.y0) / self.cell).astype(np.int64)
+        columns = np.floor((lng - self.x0) / self.cell).astype(np.int64)
+        inside = (rows >= 0) & (rows < self.rows) & (columns >= 0) & (columns < self.columns)
+        result[inside] = self.grid[rows[inside], columns[inside]]
+        for point in np.nonzero(result == BOUNDARY)[0].tolist():
+            result[point] = self.lookup_index(float(lat[point]), float(lng[point]))
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "districts": len(self.ids),
+            "edges": int(sum(len(edges) for edges in self.edges)),
+            "grid": [int(self.grid.shape[0]), int(self.grid.shape[1])],
+            "boundary_cells": len(self.candidates),
+            "build_ms": round(self.build_seconds * 1000, 1),
+        }
+
+
+class DistrictRegistry:
+    """Current DistrictIndex, rebuilt when the districts collection version changes"""
+
+    def __init__(self, check_interval: float = 5.0):
+        self.index = DistrictIndex([])
+        self.version: Optional[int] = None
+        self.checked_at = 0.0
+        self.check_interval = check_interval  # location pings call this constantly
+        self.lock = asyncio.Lock()
+
+    async def current(self, db) -> DistrictIndex:
+        if time.monotonic() - self.checked_at < self.check_interval:
+            return self.index
+        async with self.lock:
+            if time.monotonic() - self.checked_at < self.check_interval:
+                return self.index
+            counter = await db.collection_versions.find_one({"_id": "districts"})
+            version = counter.get("version", 0) if counter else 0
+            if version != self.version:
+                districts = await db.districts.find(
+                    {"boundary": {"$exists": True}}, {"_id": 0, "id": 1, "name": 1, "boundary": 1}).to_list(None)
+                self.index = await asyncio.to_thread(DistrictIndex, districts)
+                self.version = version
+            self.checked_at = time.monotonic()
+        return self.index
+
+    def invalidate(self):
+        self.checked_at = 0.0
@@ -0,0 +1,285 @@
+# 🔥 Heatmap-Kacheln für Vorfälle und Notrufe
+# Alle Einsatzpunkte liegen als Arrays im Speicher (nach Zeit sortiert, mit
+# vorberechneten Web-Mercator-Koordinaten). Eine Kachel z/x/y ist dann:
+# Zeitbereich per searchsorted, Bounding-Box-Maske, bincount auf ein
+# Zellraster, Farbskala, PNG (zlib) - ohne Pillow.
+#
+# Fertige Kacheln liegen in einem LRU-Cache. Kommen neue Punkte dazu, werden
+# nur die Kacheln verworfen, die den Punkt räumlich und zeitlich enthalten.
+# Neue Vorfälle anderer Worker werden über collection_versions erkannt.
+# Verschobene oder gelöschte Punkte zählen incident_locations hoch: dann wird
+# alles neu geladen und die Kacheln der alten und der neuen Position verworfen.
+
+import asyncio
+import math
+import struct
+import time
+import zlib
+from collections import Counter as Multiset, OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+import numpy as np
+
+from geo import location_point
+from metrics import Counter, registry
+from track_store import to_ms
+
+TILE_SIZE = 256
+KINDS = {"incidents": 0, "emergencies": 1}
+SYNC_OVERLAP = timedelta(minutes=1)  # re-read a little to catch slow writers
+LOCATIONS_COUNTER = "incident_locations"  # bumped when points move or disappear
+
+HEATMAP_TILES = registry.register(Counter(
+    "stadtwache_heatmap_tiles_total", "Heatmap tile requests by cache result", ("result",)))
+
+# Transparent -> yellow -> orange -> red, alpha grows with density
+COLOR_STOPS = np.array([
+    [0.0, 255, 255, 178, 0],
+    [0.15, 254, 217, 118, 140],
+    [0.4, 254, 178, 76, 180],
+    [0.7, 240, 59, 32, 210],
+    [1.0, 189, 0, 38, 235],
+])
+COLOR_RAMP = np.stack([np.interp(np.linspace(0, 1, 256), COLOR_STOPS[:, 0], COLOR_STOPS[:, channel])
+                       for channel in range(1, 5)], axis=1).astype(np.uint8)
+
+
+def mercator(lat: np.ndarray, lng: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """World coordinates in [0, 1) (Web Mercator, y grows southwards)"""
+    lat = np.clip(lat, -85.05112878, 85.05112878)
+    wx = (lng + 180.0) / 360.0
+    wy = (1.0 - np.log(np.tan(np.radians(lat)) + 1.0 / np.cos(np.radians(lat))) / math.pi) / 2.0
+    return wx, wy
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """Minimal RGBA PNG encoder (filter type 0 per row)"""
+    height, width, _ = rgba.shape
+    raw = np.zeros((height, width * 4 + 1), np.uint8)
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b""))
+
+
+EMPTY_TILE = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), np.uint8))
+
+
+class HeatmapIndex:
+    def __init__(self, max_tiles: int = 4096, cell_px: int = 8, saturation: int = 50):
+        # (t ms, world x, world y, kind) sorted by t - replaced as a whole, so a
+        # render in a worker thread always sees a consistent snapshot
+        self.points = (np.empty(0, np.int64), np.empty(0), np.empty(0), np.empty(0, np.int8))
+        self.generation = 0  # bumped on every change, guards against caching stale renders
+        self.cell_px = cell_px  # grid resolution inside a tile
+        self.saturation = saturation  # count that maps to the hottest color (log scale)
+        self.max_tiles = max_tiles
+        self.tiles: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self.tiles_by_position: Dict[Tuple[int, int, int], Set[tuple]] = {}
+        self.lock = asyncio.Lock()
+        self.loaded = False
+        self.synced_until: Optional[datetime] = None
+        self.recent_ids: Dict[str, datetime] = {}  # ids inside the overlap window
+        self.versions: Dict[str, int] = {}
+        self.checked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self.points[0])
+
+    # ------------------------------------------------------------- points
+
+    def add(self, t_ms: np.ndarray, lat: np.ndarray, lng: np.ndarray, kind: np.ndarray):
+        """Add points and drop exactly the cached tiles they fall into"""
+        if not len(t_ms):
+            return
+        wx, wy = mercator(np.asarray(lat, np.float64), np.asarray(lng, np.float64))
+        old_t, old_wx, old_wy, old_kind = self.points
+        t_ms = np.asarray(t_ms, np.int64)
+        points = (np.concatenate([old_t, t_ms]), np.concatenate([old_wx, wx]),
+                  np.concatenate([old_wy, wy]), np.concatenate([old_kind, kind.astype(np.int8)]))
+        # New incidents are nearly always the newest points - only sort if not
+        if np.any(np.diff(t_ms) < 0) or (len(old_t) and t_ms[0] < old_t[-1]):
+            order = np.argsort(points[0], kind="stable")
+            points = tuple(array[order] for array in points)
+        self.points = points
+        self.generation += 1
+        self.invalidate(t_ms, wx, wy, kind)
+
+    def replace(self, t_ms: np.ndarray, lat: np.ndarray, lng: np.ndarray, kind: np.ndarray):
+        """Swap in a full reload; drops the tiles of every point that changed, at both positions"""
+        wx, wy = mercator(np.asarray(lat, np.float64), np.asarray(lng, np.float64))
+        t_ms = np.asarray(t_ms, np.int64)
+        order = np.argsort(t_ms, kind="stable")
+        points = tuple(array[order] for array in (t_ms, wx, wy, np.asarray(kind, np.int8)))
+        old = Multiset(zip(*(array.tolist() for array in self.points)))
+        new = Multiset(zip(*(array.tolist() for array in points)))
+        # Removed points are invalidated where they were, added ones where they are now
+        changed = list((old - new).elements()) + list((new - old).elements())
+        self.points = points
+        self.generation += 1
+        if changed:
+            t, x, y, k = (np.array(values) for values in zip(*changed))
+            self.invalidate(t, x, y, k)
+
+    def invalidate(self, t_ms: np.ndarray, wx: np.ndarray, wy: np.ndarray, kind: np.ndarray):
+        zooms = {position[0] for position in self.tiles_by_position}
+        for z in zooms:
+            scale = 1 << z
+            tx = np.floor(wx * scale).astype(np.int64)
+            ty = np.floor(wy * scale).astype(np.int64)
+            for point_t, point_kind, x, y in zip(t_ms.tolist(), kind.tolist(), tx.tolist(), ty.tolist()):
+                for key in list(self.tiles_by_position.get((z, x, y), ())):
+                    key_kind, _, _, _, start_ms, end_ms = key
+                    if start_ms <= point_t < end_ms and key_kind in (-1, point_kind):
+                        self.evict(key)
+
+    # ------------------------------------------------------------- tiles
+
+    def evict(self, key: tuple):
+        self.tiles.pop(key, None)
+        position = key[1:4]
+        keys = self.tiles_by_position.get(position)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.tiles_by_position[position]
+
+    async def tile(self, kind: int, z: int, x: int, y: int, start_ms: int, end_ms: int) -> bytes:
+        """PNG for tile z/x/y; kind -1 = all kinds"""
+        key = (kind, z, x, y, start_ms, end_ms)
+        png = self.tiles.get(key)
+        if png is not None:
+            self.tiles.move_to_end(key)
+            HEATMAP_TILES.inc("hit")
+            return png
+        HEATMAP_TILES.inc("miss")
+
+        generation = self.generation
+        png = await asyncio.to_thread(self.render, self.points, kind, z, x, y, start_ms, end_ms)
+        if generation == self.generation:
+            self.tiles[key] = png
+            self.tiles_by_position.setdefault((z, x, y), set()).add(key)
+            while len(self.tiles) > self.max_tiles:
+                self.evict(next(iter(self.tiles)))
+        return png
+
+    def render(self, points, kind: int, z: int, x: int, y: int, start_ms: int, end_ms: int) -> bytes:
+        t, wx, wy, kinds = points
+        low, high = np.searchsorted(t, [start_ms, end_ms])
+        scale = 1 << z
+        px = wx[low:high] * scale - x
+        py = wy[low:high] * scale - y
+        mask = (px >= 0) & (px < 1) & (py >= 0) & (py < 1)
+        if kind >= 0:
+            mask &= kinds[low:high] == kind
+        if not mask.any():
+            return EMPTY_TILE
+
+        cells = TILE_SIZE // self.cell_px
+        cx = (px[mask] * cells).astype(np.int64)
+        cy = (py[mask] * cells).astype(np.int64)
+        counts = np.bincount(cy * cells + cx, minlength=cells * cells).reshape(cells, cells)
+        level = np.minimum(np.log1p(counts) / math.log1p(self.saturation), 1.0)
+        rgba = COLOR_RAMP[(level * 255).astype(np.uint8)]
+        rgba[counts == 0] = 0
+        # Scale the cell grid up to tile pixels
+        rgba = np.repeat(np.repeat(rgba, self.cell_px, axis=0), self.cell_px, axis=1)
+        return encode_png(rgba)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"points": len(self), "cached_tiles": len(self.tiles), "max_tiles": self.max_tiles,
+                "synced_until": self.synced_until}
+
+    # ------------------------------------------------------------- Mongo sync
+
+    @staticmethod
+    def points_from(documents: Iterable[Dict[str, Any]], time_field: str, kind: int,
+                    fallback_field: Optional[str] = None):
+        ids, t, lat, lng = [], [], [], []
+        for document in documents:
+            point = location_point(document.get("location"))
+            timestamp = document.get(time_field)
+            if timestamp is None and fallback_field:
+                timestamp = document.get(fallback_field)
+            if point is None or not isinstance(timestamp, datetime):
+                continue
+            ids.append((document.get("id") or document.get("incident_id"), timestamp))
+            t.append(to_ms(timestamp))
+            lat.append(point[0])
+            lng.append(point[1])
+        return ids, np.array(t, np.int64), np.array(lat), np.array(lng), np.full(len(t), kind, np.int8)
+
+    async def read_points(self, collection, query: Dict[str, Any], time_field: str, kind: int,
+                          fallback_field: Optional[str] = None):
+        projection = {"_id": 0, "id": 1, "incident_id": 1, "location": 1, time_field: 1}
+        if fallback_field:
+            projection[fallback_field] = 1
+        documents = await collection.find(query, projection).to_list(None)
+        return self.points_from(documents, time_field, kind, fallback_field)
+
+    async def sync(self, db, min_interval: float = 1.0):
+        """Load everything once, then pull only points newer than the last sync.
+
+        A bumped incident_locations counter (moved or deleted points) triggers a
+        full reload instead.
+        """
+        if self.loaded and time.monotonic() - self.checked_at < min_interval:
+            return
+        async with self.lock:
+            if self.loaded and time.monotonic() - self.checked_at < min_interval:
+                return
+            self.checked_at = time.monotonic()
+            versions = {document["_id"]: document.get("version", 0) async for document in
+                        db.collection_versions.find({"_id": {"$in": ["incidents", "emergency_broadcasts", LOCATIONS_COUNTER]}})}
+            if self.loaded and versions == self.versions:
+                return
+
+            now = datetime.utcnow()
+            reload = not self.loaded or versions.get(LOCATIONS_COUNTER) != self.versions.get(LOCATIONS_COUNTER)
+            if reload:
+                incidents = await self.read_points(db.incidents, {}, "created_at", KINDS["incidents"])
+                active = {point_id for point_id, _ in incidents[0]}
+                # Completed incidents live on as archive reports. They keep the
+                # incident's created_at (like before a restart); archives from
+                # before incident_created_at existed only have the completion time.
+                archived = await self.read_points(
+                    db.reports, {"incident_id": {"$exists": True, "$nin": list(active)}},
+                    "incident_created_at", KINDS["incidents"], fallback_field="created_at")
+                batches = [incidents, archived]
+                since = None
+                self.recent_ids = {}
+            else:
+                since = self.synced_until - SYNC_OVERLAP
+                batches = [await self.read_points(db.incidents, {"created_at": {"$gte": since}},
+                                                  "created_at", KINDS["incidents"])]
+            batches.append(await self.read_points(
+                db.emergency_broadcasts, {"timestamp": {"$gte": since}} if since else {},
+                "timestamp", KINDS["emergencies"]))
+
+            kept = []
+            for ids, t, lat, lng, kind in batches:
+                # The overlap window is read twice - skip what was added last time
+                keep = np.ones(len(t), bool)
+                for index, (point_id, timestamp) in enumerate(ids):
+                    key = f"{kind[index]}:{point_id}"
+                    if key in self.recent_ids:
+                        keep[index] = False
+                    elif timestamp >= now - SYNC_OVERLAP:
+                        self.recent_ids[key] = timestamp
+                kept.append((t[keep], lat[keep], lng[keep], kind[keep]))
+            if reload:
+                self.replace(*(np.concatenate(arrays) for arrays in zip(*kept)))
+            else:
+                for batch in kept:
+                    self.add(*batch)
+
+            self.recent_ids = {key: timestamp for key, timestamp in self.recent_ids.items()
+                               if timestamp >= now - SYNC_OVERLAP}
+            self.synced_until = now
+            self.versions = versions
+            self.loaded = True
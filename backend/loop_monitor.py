@@ -0,0 +1,115 @@
+# ⏱️ Event-Loop-Lag und Blockier-Erkennung
+# Ein Sampler-Task misst, wie viel später als geplant er aufwacht (= Lag).
+# Ein Watchdog-Thread merkt, wenn der Loop länger als threshold hängt, und
+# hält den Stack des Loop-Threads in genau diesem Moment fest - also die
+# synchrone Stelle (bcrypt, großes JSON, print ...), die alle Sockets blockiert.
+#
+# asyncio's eigener slow_callback_duration-Check braucht den Debug-Modus und
+# meldet erst nach dem Callback; der Watchdog sieht den Stack währenddessen.
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from metrics import Counter, Gauge, Histogram, registry
+
+logger = logging.getLogger("loop_monitor")
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25, window: int = 600, max_stalls: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self.samples = deque(maxlen=window)  # recent lag values in seconds (~1 min at 0.1s)
+        self.stalls = deque(maxlen=max_stalls)
+        self.heartbeat = time.monotonic()
+        self.loop_thread_id: Optional[int] = None
+        self.task: Optional[asyncio.Task] = None
+        self.watchdog: Optional[threading.Thread] = None
+        self.running = False
+        self.current_stall: Optional[Dict[str, Any]] = None
+
+        self.lag_histogram = registry.register(Histogram(
+            "stadtwache_event_loop_lag_seconds", "Event loop scheduling lag", (), LAG_BUCKETS))
+        self.stall_counter = registry.register(Counter(
+            "stadtwache_event_loop_stalls_total", "Event loop blocked longer than the threshold"))
+        registry.register(Gauge(
+            "stadtwache_event_loop_lag_recent_seconds", "Event loop lag percentiles over the recent window",
+            ("quantile",), self.recent_percentiles))
+
+    def recent_percentiles(self) -> Dict[tuple, float]:
+        samples = list(self.samples)
+        return {(str(q / 100),): percentile(samples, q) for q in (50, 95, 99)}
+
+    async def sample(self):
+        loop = asyncio.get_running_loop()
+        while self.running:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.heartbeat = time.monotonic()
+            self.samples.append(lag)
+            self.lag_histogram.observe(lag)
+            if self.current_stall is not None:
+                # The loop is back - record how long the stall really was
+                self.current_stall["duration_ms"] = round(lag * 1000, 1)
+                logger.warning(f"⏱️ Event-Loop blockiert für {self.current_stall['duration_ms']} ms\n"
+                               + "".join(self.current_stall["stack"]))
+                self.current_stall = None
+
+    def watch(self):
+        while self.running:
+            time.sleep(self.threshold / 2)
+            blocked_for = time.monotonic() - self.heartbeat - self.interval
+            if blocked_for < self.threshold or self.current_stall is not None:
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = traceback.format_stack(frame) if frame is not None else []
+            self.current_stall = {
+                "detected_at": datetime.utcnow().isoformat(),
+                "blocked_ms_at_detection": round(blocked_for * 1000, 1),
+                "duration_ms": None,
+                "stack": stack
+            }
+            self.stalls.append(self.current_stall)
+            self.stall_counter.inc()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self.task = asyncio.get_running_loop().create_task(self.sample())
+        self.watchdog = threading.Thread(target=self.watch, name="loop-watchdog", daemon=True)
+        self.watchdog.start()
+
+    async def stop(self):
+        self.running = False
+        if self.task:
+            self.task.cancel()
+
+    def report(self) -> Dict[str, Any]:
+        samples = list(self.samples)
+        return {
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "lag_ms": {f"p{q}": round(percentile(samples, q) * 1000, 2) for q in (50, 95, 99)},
+            "max_lag_ms": round(max(samples, default=0.0) * 1000, 2),
+            "stalls": list(reversed(self.stalls))
+        }
@@ -0,0 +1,254 @@
+# 📈 Metriken im Prometheus-Textformat
+# Latenz pro Route und Socket.IO-Event, Mongo-Roundtrips und Mongo-Zeit pro
+# Request sowie Antwortgrößen - ohne zusätzliche Abhängigkeit.
+#
+# Mongo-Zeit pro Request: Motor führt pymongo im Thread-Pool aus, kopiert
+# dabei aber den contextvars-Kontext (motor.frameworks.asyncio.run_on_executor).
+# Der CommandListener sieht also das HandlerStats-Objekt des Requests.
+
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self.lock:
+            items = sorted(self.values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value:g}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (+Inf last), sum]
+        self.values: Dict[Tuple, list] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self.lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self.values.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = _labels(self.labelnames, labels, f'le="{le}"')
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {total:g}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Gauge:
+    """Value computed at scrape time: callback() -> {label tuple: value}"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], callback):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, value in sorted(self.callback().items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value:g}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_DURATION = registry.register(Histogram(
+    "stadtwache_http_request_duration_seconds", "HTTP request latency per route", ("method", "route")))
+HTTP_REQUESTS = registry.register(Counter(
+    "stadtwache_http_requests_total", "HTTP requests per route and status", ("method", "route", "status")))
+HTTP_RESPONSE_SIZE = registry.register(Histogram(
+    "stadtwache_http_response_size_bytes", "Response body bytes sent per route", ("method", "route"), SIZE_BUCKETS))
+SOCKET_DURATION = registry.register(Histogram(
+    "stadtwache_socketio_event_duration_seconds", "Socket.IO event handler latency", ("event",)))
+SOCKET_ERRORS = registry.register(Counter(
+    "stadtwache_socketio_event_errors_total", "Socket.IO event handlers that raised", ("event",)))
+HANDLER_MONGO_COMMANDS = registry.register(Histogram(
+    "stadtwache_handler_mongo_commands", "Mongo round trips per request/event", ("handler",), COUNT_BUCKETS))
+HANDLER_MONGO_SECONDS = registry.register(Histogram(
+    "stadtwache_handler_mongo_seconds", "Mongo time per request/event", ("handler",), MONGO_LATENCY_BUCKETS))
+MONGO_DURATION = registry.register(Histogram(
+    "stadtwache_mongo_command_duration_seconds", "Mongo command latency", ("command", "collection"),
+    MONGO_LATENCY_BUCKETS))
+MONGO_FAILURES = registry.register(Counter(
+    "stadtwache_mongo_command_failures_total", "Failed Mongo commands", ("command", "collection")))
+
+
+class HandlerStats:
+    """Mongo usage of one request or Socket.IO event (shared with Motor's threads)"""
+    __slots__ = ("commands", "mongo_seconds")
+
+    def __init__(self):
+        self.commands = 0
+        self.mongo_seconds = 0.0
+
+
+current_handler: contextvars.ContextVar[Optional[HandlerStats]] = contextvars.ContextVar("current_handler", default=None)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """pymongo command listener - register via AsyncIOMotorClient(event_listeners=[...])"""
+
+    def __init__(self):
+        # request_id -> collection name (only known from the started event)
+        self.collections: Dict[int, str] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = event.command.get("collection")  # getMore
+        if isinstance(collection, str):
+            self.collections[event.request_id] = collection
+
+    def _finish(self, event, failed: bool):
+        collection = self.collections.pop(event.request_id, "")
+        seconds = event.duration_micros / 1_000_000
+        MONGO_DURATION.observe(seconds, event.command_name, collection)
+        if failed:
+            MONGO_FAILURES.inc(event.command_name, collection)
+        stats = current_handler.get()
+        if stats is not None:
+            stats.commands += 1
+            stats.mongo_seconds += seconds
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: latency, status, bytes sent and Mongo usage per route"""
+
+    def __init__(self, app, skip_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stats = HandlerStats()
+        token = current_handler.set(stats)
+        status = 500
+        sent = 0
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_handler.reset(token)
+            # The router stores the matched route in the (shared) scope; use its
+            # template so /incidents/<uuid> does not explode the label set
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_DURATION.observe(elapsed, method, route_label)
+            HTTP_REQUESTS.inc(method, route_label, str(status))
+            HTTP_RESPONSE_SIZE.observe(sent, method, route_label)
+            handler = f"{method} {route_label}"
+            HANDLER_MONGO_COMMANDS.observe(stats.commands, handler)
+            HANDLER_MONGO_SECONDS.observe(stats.mongo_seconds, handler)
+
+
+def socket_event(handler):
+    """Time a Socket.IO event handler - put it below @sio.event"""
+    event = handler.__name__
+
+    @functools.wraps(handler)
+    async def wrapper(*args, **kwargs):
+        stats = HandlerStats()
+        token = current_handler.set(stats)
+        started = time.perf_counter()
+        try:
+            return await handler(*args, **kwargs)
+        except Exception:
+            SOCKET_ERRORS.inc(event)
+            raise
+        finally:
+            current_handler.reset(token)
+            SOCKET_DURATION.observe(time.perf_counter() - started, event)
+            HANDLER_MONGO_COMMANDS.observe(stats.commands, f"socket {event}")
+            HANDLER_MONGO_SECONDS.observe(stats.mongo_seconds, f"socket {event}")
+
+    return wrapper
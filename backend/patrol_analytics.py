@@ -0,0 +1,135 @@
+# 📐 Streifen-Auswertung: Strecke, Verweildauer pro Bezirk, Abdeckung
+# Alle Tracks einer Schicht werden zu einem Array-Satz zusammengelegt
+# (officer-Index pro Punkt), danach ist alles vektorisiert: Haversine über
+# alle Segmente, bincount für Summen pro Beamtem/Bezirk, np.unique über
+# Rasterzellen für die Abdeckung - keine Python-Schleife pro Punkt.
+#
+# Segmente zählen nur, wenn beide Punkte zum selben Beamten gehören, die
+# Lücke <= max_gap ist (GPS aus / App im Hintergrund) und die Geschwindigkeit
+# plausibel ist (GPS-Sprünge). Ein Segment zählt zum Bezirk seines Startpunkts.
+
+import time
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from geo import haversine_m_vec
+from track_store import Track
+
+GRID_METERS = 100
+MAX_GAP_SECONDS = 300
+MAX_SPEED_MPS = 70  # ~250 km/h, anything faster is a GPS jump
+METERS_PER_DEGREE_LAT = 110_574
+
+
+class DistrictCenters:
+    """District lookup by nearest center point (District.coordinates)"""
+
+    def __init__(self, districts: Sequence[Dict[str, Any]], max_radius_m: float = 5000):
+        located = [district for district in districts
+                   if isinstance(district.get("coordinates"), dict)
+                   and {"lat", "lng"} <= set(district["coordinates"])]
+        self.ids = [district["id"] for district in located]
+        self.names = [district.get("name", district["id"]) for district in located]
+        self.lat = np.array([district["coordinates"]["lat"] for district in located], np.float64)
+        self.lng = np.array([district["coordinates"]["lng"] for district in located], np.float64)
+        self.max_radius_m = max_radius_m
+
+    def assign(self, lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+        """Index into self.ids per point, -1 if no center is within max_radius_m"""
+        if not self.ids or not len(lat):
+            return np.full(len(lat), -1, np.int64)
+        distances = haversine_m_vec(lat[:, None], lng[:, None], self.lat[None, :], self.lng[None, :])
+        nearest = distances.argmin(axis=1)
+        nearest[distances[np.arange(len(lat)), nearest] > self.max_radius_m] = -1
+        return nearest
+
+
+def grid_cells(lat: np.ndarray, lng: np.ndarray, grid_m: float) -> np.ndarray:
+    """int64 cell key per point on a ~grid_m metre grid (equirectangular around the data)"""
+    lat0 = np.radians(lat.mean()) if len(lat) else 0.0
+    y = np.floor(lat * METERS_PER_DEGREE_LAT / grid_m).astype(np.int64)
+    x = np.floor(lng * METERS_PER_DEGREE_LAT * np.cos(lat0) / grid_m).astype(np.int64)
+    return (y << 32) | (x & 0xFFFFFFFF)
+
+
+def shift_report(tracks: Dict[str, Track], districts, grid_m: float = GRID_METERS,
+                 max_gap: float = MAX_GAP_SECONDS) -> Dict[str, Any]:
+    """Distance, dwell time per district and grid coverage for a set of tracks"""
+    started = time.perf_counter()
+    user_ids: List[str] = [user_id for user_id, track in tracks.items() if len(track)]
+    count = len(user_ids)
+    district_count = len(districts.ids)
+
+    lengths = np.array([len(tracks[user_id]) for user_id in user_ids], np.int64)
+    officer = np.repeat(np.arange(count), lengths)
+    t = np.concatenate([tracks[user_id].t for user_id in user_ids]) if count else np.empty(0, np.int64)
+    lat = np.concatenate([tracks[user_id].lat for user_id in user_ids]) if count else np.empty(0)
+    lng = np.concatenate([tracks[user_id].lng for user_id in user_ids]) if count else np.empty(0)
+
+    # Segments between consecutive points
+    seconds = np.diff(t) / 1000
+    meters = haversine_m_vec(lat[:-1], lng[:-1], lat[1:], lng[1:])
+    start_officer = officer[:-1]
+    valid = ((start_officer == officer[1:]) & (seconds > 0) & (seconds <= max_gap)
+             & (meters <= MAX_SPEED_MPS * seconds))
+    segment_officer = start_officer[valid]
+    distance = np.bincount(segment_officer, weights=meters[valid], minlength=count)
+    active = np.bincount(segment_officer, weights=seconds[valid], minlength=count)
+
+    # Dwell: officer x (district + "outside") matrix in one bincount
+    district = districts.assign(lat, lng)
+    columns = district_count + 1
+    dwell_key = segment_officer * columns + (district[:-1][valid] + 1)
+    dwell = np.bincount(dwell_key, weights=seconds[valid], minlength=count * columns).reshape(count, columns)
+
+    # Coverage: unique grid cells overall, per officer and per district
+    cells = grid_cells(lat, lng, grid_m)
+    unique_cells, cell_index = np.unique(cells, return_inverse=True)
+    cell_count = max(len(unique_cells), 1)
+    # (group, cell) pairs as one int64 key - np.unique(axis=...) is far slower
+    officer_cells = np.unique(officer * cell_count + cell_index) // cell_count
+    cells_per_officer = np.bincount(officer_cells, minlength=count)
+    district_cells = np.unique((district + 1) * cell_count + cell_index) // cell_count
+    cells_per_district = np.bincount(district_cells, minlength=columns)
+    officers_per_district = (dwell > 0).sum(axis=0)
+    cell_km2 = (grid_m / 1000) ** 2
+
+    officers = []
+    for index, user_id in enumerate(user_ids):
+        officers.append({
+            "user_id": user_id,
+            "points": int(lengths[index]),
+            "distance_km": round(float(distance[index]) / 1000, 3),
+            "active_minutes": round(float(active[index]) / 60, 1),
+            "dwell_minutes": {
+                district_id: round(float(dwell[index, column + 1]) / 60, 1)
+                for column, district_id in enumerate(districts.ids) if dwell[index, column + 1] > 0
+            },
+            "outside_minutes": round(float(dwell[index, 0]) / 60, 1),
+            "cells_visited": int(cells_per_officer[index]),
+        })
+    district_rows = [{
+        "district_id": district_id,
+        "name": districts.names[column],
+        "dwell_minutes": round(float(dwell[:, column + 1].sum()) / 60, 1),
+        "officers": int(officers_per_district[column + 1]),
+        "cells_visited": int(cells_per_district[column + 1]),
+        "covered_km2": round(int(cells_per_district[column + 1]) * cell_km2, 3),
+    } for column, district_id in enumerate(districts.ids)]
+
+    return {
+        "officers": sorted(officers, key=lambda row: row["distance_km"], reverse=True),
+        "districts": district_rows,
+        "coverage": {
+            "grid_m": grid_m,
+            "cells_visited": int(len(unique_cells)),
+            "covered_km2": round(len(unique_cells) * cell_km2, 3),
+        },
+        "totals": {
+            "officers": count,
+            "points": int(lengths.sum()),
+            "distance_km": round(float(distance.sum()) / 1000, 3),
+        },
+        "compute_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
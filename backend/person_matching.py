@@ -0,0 +1,255 @@
+# 🔎 Personen-Abgleich für Dublettenerkennung
+# Kölner Phonetik + Trigramm-Ähnlichkeit über Name, Geburtsdatum und Aktenzeichen
+
+import re
+import unicodedata
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+SYNC_OVERLAP = timedelta(minutes=1)  # re-read a little to catch slow writers and clock skew
+
+UMLAUTS = str.maketrans({"Ä": "A", "Ö": "O", "Ü": "U", "ß": "S"})
+
+def normalize_name(value: Optional[str]) -> str:
+    """Uppercase, umlauts folded, only letters and single spaces"""
+    if not value:
+        return ""
+    value = value.upper().translate(UMLAUTS)
+    value = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode()
+    return " ".join(re.sub(r"[^A-Z]+", " ", value).split())
+
+def koelner_phonetik(value: Optional[str]) -> str:
+    """Kölner Phonetik code of a (German) name, e.g. 'Müller' -> '657'"""
+    word = normalize_name(value).replace(" ", "")
+    if not word:
+        return ""
+
+    digits = []
+    for i, char in enumerate(word):
+        prev = word[i - 1] if i > 0 else ""
+        nxt = word[i + 1] if i + 1 < len(word) else ""
+        if char in "AEIJOUY":
+            code = "0"
+        elif char == "H":
+            code = ""
+        elif char == "B":
+            code = "1"
+        elif char == "P":
+            code = "3" if nxt == "H" else "1"
+        elif char in "DT":
+            code = "8" if nxt and nxt in "CSZ" else "2"
+        elif char in "FVW":
+            code = "3"
+        elif char in "GKQ":
+            code = "4"
+        elif char == "C":
+            if i == 0:
+                code = "4" if nxt and nxt in "AHKLOQRUX" else "8"
+            else:
+                code = "4" if nxt and nxt in "AHKOQUX" and prev not in "SZ" else "8"
+        elif char == "X":
+            code = "8" if prev and prev in "CKQ" else "48"
+        elif char == "L":
+            code = "5"
+        elif char in "MN":
+            code = "6"
+        elif char == "R":
+            code = "7"
+        else:  # S, Z
+            code = "8"
+        digits.append(code)
+
+    # Collapse repeated digits, then drop every "0" except a leading one
+    collapsed = []
+    for digit in "".join(digits):
+        if not collapsed or collapsed[-1] != digit:
+            collapsed.append(digit)
+    return collapsed[0] + "".join(d for d in collapsed[1:] if d != "0") if collapsed else ""
+
+def trigrams(value: Optional[str]) -> Set[str]:
+    """Padded character trigrams of a normalized name"""
+    normalized = normalize_name(value)
+    if not normalized:
+        return set()
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def trigram_similarity(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def normalize_case_number(value: Optional[str]) -> str:
+    return re.sub(r"[^A-Z0-9]", "", (value or "").upper())
+
+class PersonMatchIndex:
+    """In-memory fuzzy match index over the persons collection.
+
+    Candidates are found through phonetic keys, last-name trigrams and the
+    case number, then scored - so a lookup only ever touches a handful of
+    entries instead of the whole collection.
+    """
+
+    def __init__(self, threshold: float = 0.6):
+        self.threshold = threshold
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.by_phonetic: Dict[str, Set[str]] = {}
+        self.by_trigram: Dict[str, Set[str]] = {}
+        self.by_case_number: Dict[str, Set[str]] = {}
+        self.last_sync = None  # newest updated_at read from the database, for incremental syncs
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def _entry(person: Dict[str, Any]) -> Dict[str, Any]:
+        first_name = person.get("first_name") or ""
+        last_name = person.get("last_name") or ""
+        return {
+            "id": person.get("id"),
+            "first_name": first_name,
+            "last_name": last_name,
+            "birth_date": person.get("birth_date") or None,
+            "case_number": normalize_case_number(person.get("case_number")),
+            "status": person.get("status"),
+            "first_phonetic": koelner_phonetik(first_name),
+            "last_phonetic": koelner_phonetik(last_name),
+            "last_trigrams": trigrams(last_name),
+            "name_trigrams": trigrams(f"{first_name} {last_name}")
+        }
+
+    def _keys(self, entry: Dict[str, Any]):
+        if entry["last_phonetic"]:
+            yield self.by_phonetic, entry["last_phonetic"]
+        for gram in entry["last_trigrams"]:
+            yield self.by_trigram, gram
+        if entry["case_number"]:
+            yield self.by_case_number, entry["case_number"]
+
+    def add(self, person: Dict[str, Any]):
+        if person.get("id") in self.entries:
+            self.remove(person["id"])
+        entry = self._entry(person)
+        self.entries[entry["id"]] = entry
+        for bucket, key in self._keys(entry):
+            bucket.setdefault(key, set()).add(entry["id"])
+
+    def remove(self, person_id: str):
+        entry = self.entries.pop(person_id, None)
+        if not entry:
+            return
+        for bucket, key in self._keys(entry):
+            ids = bucket.get(key)
+            if ids:
+                ids.discard(person_id)
+                if not ids:
+                    del bucket[key]
+
+    def apply(self, person: Dict[str, Any]):
+        """Add, update or (if archived) remove a person document"""
+        if person.get("is_active", True):
+            self.add(person)
+        else:
+            self.remove(person.get("id"))
+
+    def sync_query(self) -> Dict[str, Any]:
+        """Filter for persons changed since the last load, with an overlap window"""
+        if self.last_sync is None:
+            return {}
+        return {"updated_at": {"$gte": self.last_sync - SYNC_OVERLAP}}
+
+    def load(self, persons: Iterable[Dict[str, Any]]):
+        """Apply documents read from the database and advance the sync cursor.
+
+        Only documents read back move last_sync - a worker's own writes go
+        through apply(), so its clock can't skip persons written elsewhere.
+        Re-applying a person from the overlap window is a no-op.
+        """
+        for person in persons:
+            self.apply(person)
+            updated_at = person.get("updated_at")
+            if updated_at and (self.last_sync is None or updated_at > self.last_sync):
+                self.last_sync = updated_at
+
+    def _candidates(self, entry: Dict[str, Any]) -> Set[str]:
+        candidates: Set[str] = set()
+        if entry["last_phonetic"]:
+            candidates |= self.by_phonetic.get(entry["last_phonetic"], set())
+        if entry["case_number"]:
+            candidates |= self.by_case_number.get(entry["case_number"], set())
+        # Typos that change the phonetic code still share most trigrams
+        gram_hits: Dict[str, int] = {}
+        for gram in entry["last_trigrams"]:
+            for person_id in self.by_trigram.get(gram, ()):
+                gram_hits[person_id] = gram_hits.get(person_id, 0) + 1
+        needed = max(2, len(entry["last_trigrams"]) // 2)
+        candidates |= {person_id for person_id, hits in gram_hits.items() if hits >= needed}
+        return candidates
+
+    @staticmethod
+    def score(a: Dict[str, Any], b: Dict[str, Any]):
+        """Similarity score (0..1) and the reasons behind it"""
+        reasons = []
+        name_similarity = trigram_similarity(a["name_trigrams"], b["name_trigrams"])
+        score = 0.5 * name_similarity
+        if name_similarity >= 0.5:
+            reasons.append(f"name_similarity:{name_similarity:.2f}")
+        if a["last_phonetic"] and a["last_phonetic"] == b["last_phonetic"]:
+            score += 0.25
+            reasons.append("last_name_phonetic")
+        if a["first_phonetic"] and a["first_phonetic"] == b["first_phonetic"]:
+            score += 0.1
+            reasons.append("first_name_phonetic")
+        if a["birth_date"] and b["birth_date"]:
+            if a["birth_date"] == b["birth_date"]:
+                score += 0.15
+                reasons.append("birth_date")
+            else:
+                score *= 0.6
+        if a["case_number"] and a["case_number"] == b["case_number"]:
+            score = max(score, 0.95)
+            reasons.append("case_number")
+        return min(score, 1.0), reasons
+
+    def find_duplicates(self, person: Dict[str, Any], limit: int = 5, threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Likely duplicates of a (new or existing) person, best match first"""
+        threshold = self.threshold if threshold is None else threshold
+        entry = self._entry(person)
+        matches = []
+        for person_id in self._candidates(entry):
+            if person_id == entry["id"]:
+                continue
+            other = self.entries[person_id]
+            score, reasons = self.score(entry, other)
+            if score >= threshold:
+                matches.append({
+                    "id": person_id,
+                    "first_name": other["first_name"],
+                    "last_name": other["last_name"],
+                    "birth_date": other["birth_date"],
+                    "status": other["status"],
+                    "score": round(score, 3),
+                    "reasons": reasons
+                })
+        matches.sort(key=lambda match: match["score"], reverse=True)
+        return matches[:limit]
+
+    def duplicate_report(self, threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+        """All likely duplicate pairs in the index (each pair reported once)"""
+        threshold = self.threshold if threshold is None else threshold
+        pairs = []
+        for person_id, entry in self.entries.items():
+            for other_id in self._candidates(entry):
+                if other_id <= person_id:
+                    continue
+                other = self.entries[other_id]
+                score, reasons = self.score(entry, other)
+                if score >= threshold:
+                    pairs.append({
+                        "person_a": {"id": person_id, "name": f"{entry['first_name']} {entry['last_name']}"},
+                        "person_b": {"id": other_id, "name": f"{other['first_name']} {other['last_name']}"},
+                        "score": round(score, 3),
+                        "reasons": reasons
+                    })
+        pairs.sort(key=lambda pair: pair["score"], reverse=True)
+        return pairs
@@ -0,0 +1,77 @@
+# 📝 Berichtsversionen (Bearbeitungsverlauf)
+# Der Bericht selbst enthält nur die aktuelle Fassung. Jede Bearbeitung legt
+# einen Eintrag in db.report_versions an: geänderte kurze Felder (alt/neu) und
+# einen Rückwärts-Patch auf Zeilenebene, der aus dem neueren Inhalt die
+# ersetzte Fassung macht. Version N entsteht, indem man vom aktuellen Stand
+# aus die Einträge >= N von neu nach alt anwendet.
+
+import difflib
+import uuid
+from typing import Any, Dict, Iterable, List
+
+REPORT_VERSIONED_FIELDS = ["title", "shift_date"]
+REVISION_FIELDS = ["title", "content", "shift_date"]
+
+
+def make_content_patch(old_content: str, new_content: str) -> List[List[Any]]:
+    """Reverse patch [start, end, old_lines] that rebuilds old_content from new_content"""
+    new_lines = new_content.splitlines(keepends=True)
+    old_lines = old_content.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, new_lines, old_lines, autojunk=False)
+    return [
+        [i1, i2, old_lines[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_content_patch(new_content: str, patch: List[List[Any]]) -> str:
+    """Apply a reverse patch from make_content_patch"""
+    lines = new_content.splitlines(keepends=True)
+    for start, end, old_lines in reversed(patch):
+        lines[start:end] = old_lines
+    return "".join(lines)
+
+
+def field_changes(existing: Dict[str, Any], updated: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """{field: {old, new}} for the short fields an edit changed"""
+    return {
+        field: {"old": existing.get(field), "new": updated.get(field)}
+        for field in REPORT_VERSIONED_FIELDS
+        if existing.get(field) != updated.get(field)
+    }
+
+
+def rebuild_revision(report: Dict[str, Any], newer_entries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Title/content/shift_date of an older version.
+
+    newer_entries are the report_versions entries with version >= the wanted
+    one, newest first.
+    """
+    revision = {field: report.get(field) for field in REVISION_FIELDS}
+    for entry in newer_entries:
+        for field, change in entry.get("changes", {}).items():
+            revision[field] = change["old"]
+        revision["content"] = apply_content_patch(revision["content"] or "", entry.get("content_patch", []))
+    return revision
+
+
+def legacy_version_entries(report: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """report_versions entries for an embedded edit_history array (old format).
+
+    Legacy entries have no patch, so they are version 0 and never take part in
+    rebuilding a revision; they only show up in the history list.
+    """
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "report_id": report["id"],
+            "version": 0,
+            "legacy": True,
+            "edited_by": entry.get("edited_by"),
+            "edited_by_name": entry.get("edited_by_name"),
+            "edited_at": entry.get("edited_at"),
+            "changes": entry.get("changes", {})
+        }
+        for entry in report.get("edit_history") or []
+    ]
@@ -0,0 +1,267 @@
+# 🗄️ Aufbewahrung, Downsampling und Archivierung
+# Pro Collection eine Policy:
+#   - Rohe GPS-Pings bekommen beim Speichern expire_at (TTL-Index als
+#     Sicherheitsnetz, falls der Job nie läuft)
+#   - Abgeschlossene Stunden werden zuerst in Track-Buckets verdichtet
+#     (track_store.py), bevor irgendetwas ausgedünnt wird
+#   - Nach 24h werden Tracks ausgedünnt: ein Punkt pro N Sekunden oder wenn
+#     sich die Position um mehr als M Meter geändert hat; behaltene Punkte
+#     verlieren expire_at und gelten als downsampled
+#   - Nach archive_after wird in gzip-NDJSON archiviert und dann gelöscht
+#
+# Der Job arbeitet in kleinen Batches (delete_many über _id-Listen, kurze
+# Pausen) statt einer großen Operation und merkt sich seinen Fortschritt in
+# db.retention_state. Eine Lease dort sorgt dafür, dass bei mehreren Workern
+# nur einer läuft. Archive sind at-least-once: bricht der Job zwischen
+# Schreiben und Löschen ab, steht ein Batch doppelt drin (_id ist eindeutig).
+
+import asyncio
+import gzip
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import orjson
+from pymongo.errors import DuplicateKeyError
+
+from geo import haversine_m, location_point
+
+logger = logging.getLogger("retention")
+
+RAW_PING_TTL = timedelta(days=7)
+LEASE_ID = "lease"
+
+
+def raw_ping_expiry(now: Optional[datetime] = None) -> datetime:
+    """expire_at for a freshly stored raw GPS ping"""
+    return (now or datetime.utcnow()) + RAW_PING_TTL
+
+
+class RetentionPolicy:
+    def __init__(self, collection: str, archive_after: timedelta, time_field: str = "timestamp",
+                 downsample_after: Optional[timedelta] = None, min_interval: float = 30.0,
+                 min_distance: float = 25.0):
+        self.collection = collection
+        self.archive_after = archive_after
+        self.time_field = time_field
+        # GPS only: thin out raw pings older than downsample_after
+        self.downsample_after = downsample_after
+        self.min_interval = min_interval  # seconds between kept points
+        self.min_distance = min_distance  # meters moved since the last kept point
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "collection": self.collection,
+            "archive_after_days": self.archive_after.total_seconds() / 86400,
+            "downsample_after_hours": self.downsample_after.total_seconds() / 3600 if self.downsample_after else None,
+            "min_interval_s": self.min_interval if self.downsample_after else None,
+            "min_distance_m": self.min_distance if self.downsample_after else None,
+        }
+
+
+DEFAULT_POLICIES = [
+    RetentionPolicy("locations", archive_after=timedelta(days=90), downsample_after=timedelta(hours=24)),
+    RetentionPolicy("checkins", archive_after=timedelta(days=180)),
+    RetentionPolicy("messages", archive_after=timedelta(days=365)),
+    RetentionPolicy("emergency_broadcasts", archive_after=timedelta(days=365)),
+]
+
+
+def write_archive(path: Path, documents: List[Dict[str, Any]]):
+    """Append one gzip member of NDJSON lines (concatenated members stay valid gzip)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = b"".join(orjson.dumps(doc, default=str) + b"\n" for doc in documents)
+    with open(path, "ab") as handle:
+        handle.write(gzip.compress(data, compresslevel=6))
+        handle.flush()
+        os.fsync(handle.fileno())
+
+
+class RetentionEngine:
+    def __init__(self, get_db: Callable[[], Any], archive_dir: Path, policies: List[RetentionPolicy] = DEFAULT_POLICIES,
+                 batch_size: int = 1000, window: timedelta = timedelta(minutes=15), pause: float = 0.05,
+                 track_store=None):
+        self.get_db = get_db  # resolved per call, so a swapped server.db (tests, --in-memory) is used
+        self.track_store = track_store  # full-resolution copy of the pings, compacted first
+        self.archive_dir = Path(archive_dir)
+        self.policies = policies
+        self.batch_size = batch_size
+        self.window = window  # time slice of pings handled per downsampling step
+        self.pause = pause  # yield between batches so Mongo and the loop breathe
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.task: Optional[asyncio.Task] = None
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    @property
+    def db(self):
+        return self.get_db()
+
+    async def ensure_indexes(self):
+        for policy in self.policies:
+            await self.db[policy.collection].create_index([(policy.time_field, 1)])
+            if policy.downsample_after:
+                # Raw pings carry expire_at; downsampled points have it removed
+                await self.db[policy.collection].create_index("expire_at", expireAfterSeconds=0)
+
+    # ------------------------------------------------------------- lease
+
+    async def acquire_lease(self, duration: timedelta) -> bool:
+        now = datetime.utcnow()
+        try:
+            await self.db.retention_state.find_one_and_update(
+                {"_id": LEASE_ID, "$or": [{"until": {"$lt": now}}, {"owner": self.owner}]},
+                {"$set": {"owner": self.owner, "until": now + duration}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False  # someone else holds it
+        return True
+
+    async def release_lease(self):
+        await self.db.retention_state.update_one(
+            {"_id": LEASE_ID, "owner": self.owner}, {"$set": {"until": datetime.utcnow()}})
+
+    # ------------------------------------------------------------- downsampling
+
+    async def downsample(self, policy: RetentionPolicy) -> Dict[str, int]:
+        collection = self.db[policy.collection]
+        field = policy.time_field
+        state_id = f"downsample:{policy.collection}"
+        cutoff = datetime.utcnow() - policy.downsample_after
+        state = await self.db.retention_state.find_one({"_id": state_id}) or {}
+        position = state.get("until")
+        last_kept: Dict[Any, tuple] = {}  # user_id -> (timestamp, lat, lng)
+        kept = dropped = 0
+
+        while True:
+            # Jump over gaps instead of walking empty windows
+            query = {field: {"$lt": cutoff}, "downsampled": {"$ne": True}}
+            if position:
+                query[field]["$gte"] = position
+            first = await collection.find_one(query, {field: 1}, sort=[(field, 1)])
+            if first is None:
+                break
+            start = first[field]
+            end = min(start + self.window, cutoff)
+            pings = await collection.find(
+                {field: {"$gte": start, "$lt": end}, "downsampled": {"$ne": True}},
+                {"_id": 1, "user_id": 1, "location": 1, field: 1}
+            ).sort(field, 1).to_list(None)
+
+            keep_ids, drop_ids = [], []
+            for ping in pings:
+                point = location_point(ping.get("location"))
+                if point is None:
+                    drop_ids.append(ping["_id"])
+                    continue
+                previous = last_kept.get(ping.get("user_id"))
+                if (previous is None
+                        or (ping[field] - previous[0]).total_seconds() >= policy.min_interval
+                        or haversine_m(previous[1], previous[2], *point) >= policy.min_distance):
+                    last_kept[ping.get("user_id")] = (ping[field], *point)
+                    keep_ids.append(ping["_id"])
+                else:
+                    drop_ids.append(ping["_id"])
+
+            for offset in range(0, len(keep_ids), self.batch_size):
+                await collection.update_many(
+                    {"_id": {"$in": keep_ids[offset:offset + self.batch_size]}},
+                    {"$set": {"downsampled": True}, "$unset": {"expire_at": ""}}
+                )
+                await asyncio.sleep(self.pause)
+            for offset in range(0, len(drop_ids), self.batch_size):
+                await collection.delete_many({"_id": {"$in": drop_ids[offset:offset + self.batch_size]}})
+                await asyncio.sleep(self.pause)
+            kept += len(keep_ids)
+            dropped += len(drop_ids)
+
+            position = end
+            await self.db.retention_state.update_one(
+                {"_id": state_id}, {"$set": {"until": position}}, upsert=True)
+
+        return {"kept": kept, "dropped": dropped}
+
+    # ------------------------------------------------------------- archive
+
+    def archive_path(self, collection: str, day: datetime) -> Path:
+        return self.archive_dir / collection / f"{day:%Y}" / f"{collection}-{day:%Y-%m-%d}.ndjson.gz"
+
+    async def archive(self, policy: RetentionPolicy) -> Dict[str, int]:
+        collection = self.db[policy.collection]
+        field = policy.time_field
+        cutoff = datetime.utcnow() - policy.archive_after
+        archived = 0
+
+        while True:
+            batch = await collection.find({field: {"$lt": cutoff}}).sort(field, 1).to_list(self.batch_size)
+            if not batch:
+                break
+            by_day: Dict[datetime, List[Dict[str, Any]]] = {}
+            for document in batch:
+                day = document[field].replace(hour=0, minute=0, second=0, microsecond=0)
+                by_day.setdefault(day, []).append(document)
+            # gzip + fsync off the event loop
+            for day, documents in by_day.items():
+                await asyncio.to_thread(write_archive, self.archive_path(policy.collection, day), documents)
+            await collection.delete_many({"_id": {"$in": [document["_id"] for document in batch]}})
+            archived += len(batch)
+            await asyncio.sleep(self.pause)
+
+        return {"archived": archived}
+
+    # ------------------------------------------------------------- runs
+
+    async def run(self) -> Optional[Dict[str, Any]]:
+        """One pass over all policies; None if another worker holds the lease"""
+        if not await self.acquire_lease(timedelta(hours=1)):
+            return None
+        started = datetime.utcnow()
+        report: Dict[str, Any] = {"started_at": started, "owner": self.owner, "collections": {}}
+        try:
+            compacted = True
+            if self.track_store is not None:
+                try:
+                    report["collections"]["track_buckets"] = await self.track_store.compact()
+                except Exception as e:
+                    logger.exception("❌ Track-Verdichtung fehlgeschlagen", extra={"event": "retention"})
+                    report["collections"]["track_buckets"] = {"error": str(e)}
+                    # Downsampling would drop points that never made it into a bucket
+                    compacted = False
+            for policy in self.policies:
+                result: Dict[str, Any] = {}
+                try:
+                    if policy.downsample_after and compacted:
+                        result.update(await self.downsample(policy))
+                    result.update(await self.archive(policy))
+                except Exception as e:
+                    logger.exception(f"❌ Retention für {policy.collection} fehlgeschlagen",
+                                     extra={"event": "retention", "collection": policy.collection})
+                    result["error"] = str(e)
+                report["collections"][policy.collection] = result
+        finally:
+            await self.release_lease()
+        report["duration_s"] = round((datetime.utcnow() - started).total_seconds(), 3)
+        self.last_report = report
+        await self.db.retention_state.update_one({"_id": "last_run"}, {"$set": report}, upsert=True)
+        logger.info("🗄️ Retention-Lauf abgeschlossen", extra={"event": "retention", **report})
+        return report
+
+    async def loop(self, interval: float):
+        while True:
+            try:
+                await self.run()
+            except Exception:
+                logger.exception("❌ Retention-Lauf fehlgeschlagen", extra={"event": "retention"})
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float):
+        if interval > 0 and self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.loop(interval))
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
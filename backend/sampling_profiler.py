@@ -0,0 +1,77 @@
+# 🔥 Sampling-Profiler für den laufenden Prozess
+# Ein Thread liest in festen Abständen sys._current_frames() und zählt die
+# Stacks - kein sys.setprofile, daher nur ~1% Overhead bei 100 Hz und im
+# laufenden Dienst nutzbar. Ausgabe im "collapsed stack" Format:
+#
+#     MainThread;run_forever (base_events.py);...;login (server.py) 42
+#
+# Direkt nutzbar mit flamegraph.pl, speedscope.app oder inferno.
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+SITE_MARKERS = ("site-packages" + os.sep, "dist-packages" + os.sep)
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    for marker in SITE_MARKERS:
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    else:
+        filename = os.path.basename(filename)
+    # Function granularity (first line) so samples of one function merge
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self.lock.locked()
+
+    def run(self, seconds: float, interval: float = 0.01, thread_id: Optional[int] = None):
+        """Sample for `seconds`; only `thread_id` if given, else all threads.
+
+        Blocking - call it from a worker thread, never on the event loop.
+        Returns (collapsed stack text, sample count).
+        """
+        if not self.lock.acquire(blocking=False):
+            raise RuntimeError("Profiler already running")
+        try:
+            stacks = Counter()
+            own_id = threading.get_ident()
+            names = {}
+            samples = 0
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                for ident, frame in sys._current_frames().items():
+                    if ident == own_id or (thread_id is not None and ident != thread_id):
+                        continue
+                    labels = []
+                    while frame is not None:
+                        labels.append(frame_label(frame))
+                        frame = frame.f_back
+                    if ident not in names:
+                        thread = threading._active.get(ident)
+                        names[ident] = thread.name if thread else f"thread-{ident}"
+                    labels.append(names[ident])
+                    stacks[";".join(reversed(labels))] += 1
+                samples += 1
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
+            lines = [f"{stack} {count}" for stack, count in stacks.most_common()]
+            return "\n".join(lines) + "\n", samples
+        finally:
+            self.lock.release()
+
+
+profiler = SamplingProfiler()
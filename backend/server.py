@@ -1,10 +1,12 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
 from bson import ObjectId
 import socketio
 import os
@@ -13,58 +15,113 @@ from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
 from typing import List, Optional, Dict, Any
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import hashlib
+import hmac
+import base64
+import binascii
 import secrets
+import time
+import threading
+import orjson
+from person_matching import PersonMatchIndex
+from report_versions import field_changes, legacy_version_entries, make_content_patch, rebuild_revision
+from compression import CompressionMiddleware
+from static_frontend import StaticFrontend
+from metrics import MetricsMiddleware, MongoCommandListener, registry as metrics_registry, socket_event
+from loop_monitor import LoopMonitor
+from structured_logging import setup_logging_from_env
+from sampling_profiler import profiler
+from retention import RetentionEngine, raw_ping_expiry
+from district_index import DistrictRegistry, boundary_rings
+from geo import location_point
+from heatmap import KINDS as HEATMAP_KINDS, LOCATIONS_COUNTER as HEATMAP_LOCATIONS, HeatmapIndex
+from patrol_analytics import DistrictCenters, shift_report
+from track_store import TrackStore, floor_hour, naive_utc, to_ms
+from tracing import TracedAsyncServer, TracingCommandListener, TracingMiddleware, trace_socket_event, tracer
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Logging: JSON lines via QueueHandler, written by a background thread
+# (LOG_LEVEL, LOG_FORMAT=json|text, LOG_FILE). Configured on startup, not on
+# import - importing server from a script or test keeps the caller's logging.
+log_listener = None
+logger = logging.getLogger(__name__)
+
 # Database connection - Use environment variable or fallback
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/stadtwache_db")
 DB_NAME = os.getenv("DB_NAME", "stadtwache_db")
 
+# Mongo command timings for /metrics
+mongo_command_listener = MongoCommandListener()
+# Mongo client spans for the current trace (TRACE_FILE / TRACE_OTLP_URL)
+tracing_command_listener = TracingCommandListener()
+# Event loop lag sampler + watchdog for blocking calls (started on startup)
+loop_monitor = LoopMonitor(interval=0.1, threshold=float(os.getenv("LOOP_STALL_THRESHOLD", "0.25")))
+# Retention job runs every RETENTION_INTERVAL_MINUTES (0 = only on demand)
+RETENTION_ARCHIVE_DIR = Path(os.getenv("RETENTION_ARCHIVE_DIR", str(ROOT_DIR / "archive")))
+RETENTION_INTERVAL_MINUTES = float(os.getenv("RETENTION_INTERVAL_MINUTES", "60"))
+
 # Handle both local and cloud MongoDB URLs
 if MONGO_URL.startswith("mongodb://localhost") or MONGO_URL.startswith("mongodb://127.0.0.1"):
     # Local development
-    client = AsyncIOMotorClient(MONGO_URL)
+    client = AsyncIOMotorClient(MONGO_URL, event_listeners=[mongo_command_listener, tracing_command_listener])
     db = client[DB_NAME]
-    print(f"🔗 Connected to local MongoDB: {MONGO_URL}")
+    MONGO_TARGET = f"local MongoDB: {MONGO_URL}"
 else:
     # Production/Cloud MongoDB
-    client = AsyncIOMotorClient(MONGO_URL)
+    client = AsyncIOMotorClient(MONGO_URL, event_listeners=[mongo_command_listener, tracing_command_listener])
     db = client[DB_NAME]  
-    print(f"🔗 Connected to cloud MongoDB: {MONGO_URL[:20]}...")
+    MONGO_TARGET = f"cloud MongoDB: {MONGO_URL[:20]}..."
+
+# Hourly per-officer GPS buckets; compacted by the retention job before downsampling
+track_store = TrackStore(lambda: db)
+retention_engine = RetentionEngine(lambda: db, RETENTION_ARCHIVE_DIR, track_store=track_store)
+# Incident/emergency density tiles, loaded lazily on the first tile request
+heatmap_index = HeatmapIndex()
+# Point-in-polygon index over District.boundary, rebuilt when districts change
+district_registry = DistrictRegistry()
 
 # Test connection
 async def test_db_connection():
     try:
         await client.admin.command('ping')
-        print("✅ MongoDB connection successful!")
+        logger.info("MongoDB connection successful", extra={"event": "startup"})
     except Exception as e:
-        print(f"❌ MongoDB connection failed: {e}")
-
-# Helper function to convert ObjectId to string
-def serialize_mongo_data(data):
-    """Convert MongoDB ObjectIds to strings for JSON serialization"""
-    if isinstance(data, list):
-        return [serialize_mongo_data(item) for item in data]
-    elif isinstance(data, dict):
-        result = {}
-        for key, value in data.items():
-            if isinstance(value, ObjectId):
-                result[key] = str(value)
-            elif isinstance(value, (dict, list)):
-                result[key] = serialize_mongo_data(value)
-            else:
-                result[key] = value
-        return result
-    elif isinstance(data, ObjectId):
-        return str(data)
-    else:
-        return data
+        logger.error(f"MongoDB connection failed: {e}", extra={"event": "startup"})
+
+# Fast JSON path for trusted database reads
+def _mongo_json_default(value):
+    """orjson fallback for BSON types it doesn't know natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+class MongoJSONResponse(JSONResponse):
+    """Serialize MongoDB documents straight to JSON with orjson.
+
+    datetime and ObjectId are encoded natively, and because a Response is
+    returned FastAPI skips response_model validation - only use it for
+    documents read from our own database.
+    """
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_mongo_json_default, option=orjson.OPT_NON_STR_KEYS)
+
+class SocketJSON:
+    """json module for Socket.IO packets - emits carry datetimes and Mongo _ids
+    (e.g. location_data after insert_one) which the stdlib json rejects"""
+    
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj, default=_mongo_json_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    @staticmethod
+    def loads(data, **kwargs):
+        return orjson.loads(data)
 
 # Security
 SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key-here-change-in-production")
@@ -75,12 +132,22 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 # Socket.IO server
-sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+sio = TracedAsyncServer(async_mode='asgi', cors_allowed_origins='*', json=SocketJSON)
 
 # Online users tracking
 online_users = {}  # {user_id: {"last_seen": datetime, "socket_id": str, "username": str}}
 user_sockets = {}  # {socket_id: user_id}
 
+# Fuzzy match index for person duplicate detection (loaded at startup)
+person_match_index = PersonMatchIndex()
+PERSON_MATCH_FIELDS = {"_id": 0, "id": 1, "first_name": 1, "last_name": 1, "birth_date": 1,
+                       "case_number": 1, "status": 1, "is_active": 1, "updated_at": 1}
+
+async def sync_person_match_index():
+    """Pull person changes made by other workers since the last sync"""
+    persons = await db.persons.find(person_match_index.sync_query(), PERSON_MATCH_FIELDS).to_list(None)
+    person_match_index.load(persons)
+
 # Create FastAPI app
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
@@ -170,7 +237,9 @@ class Incident(BaseModel):
     assigned_to: Optional[str] = None
     assigned_to_name: Optional[str] = None
     assigned_at: Optional[datetime] = None
+    district_id: Optional[str] = None  # from District.boundary, None outside all districts
     images: List[str] = []  # base64 encoded images
+    version: int = 1  # Optimistic concurrency (ETag / If-Match)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -202,6 +271,7 @@ class LocationUpdate(BaseModel):
     user_id: str
     location: Dict[str, float]
     timestamp: datetime = Field(default_factory=datetime.utcnow)
+    district_id: Optional[str] = None
 
 class Person(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -223,6 +293,7 @@ class Person(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = True
+    version: int = 1  # Optimistic concurrency (ETag / If-Match)
 
 class PersonCreate(BaseModel):
     first_name: str
@@ -239,6 +310,9 @@ class PersonCreate(BaseModel):
     priority: str = "medium"
     photo: Optional[str] = None
 
+class PersonCreateResult(Person):
+    possible_duplicates: List[Dict[str, Any]] = []  # Fuzzy matches found at create time
+
 class PersonUpdate(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
@@ -279,6 +353,7 @@ class District(BaseModel):
     name: str
     area_description: str
     coordinates: Optional[Dict[str, float]] = None
+    boundary: Optional[Dict[str, Any]] = None  # GeoJSON Polygon/MultiPolygon, [lng, lat]
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Team(BaseModel):
@@ -297,6 +372,11 @@ class VacationApproval(BaseModel):
 class DistrictCreate(BaseModel):
     name: str
     area_description: str
+    coordinates: Optional[Dict[str, float]] = None
+    boundary: Optional[Dict[str, Any]] = None
+
+class DistrictBoundary(BaseModel):
+    boundary: Dict[str, Any]
 
 class TeamCreate(BaseModel):
     name: str
@@ -338,13 +418,134 @@ class ShiftCreate(BaseModel):
     start_time: str
     end_time: str
 
+# Feld-Projektionen für Listen-Endpunkte
+# Listen laden nur die Spalten, die sie auch anzeigen - kein hashed_password,
+# keine edit_history und keine Mongo-internen Felder mehr über die Leitung.
+USER_LIST_FIELDS = [
+    "id", "email", "username", "role", "badge_number", "department", "phone",
+    "service_number", "rank", "status", "photo", "is_active", "assigned_district",
+    "patrol_team", "last_activity", "last_check_in", "missed_check_ins",
+    "created_at", "updated_at"
+]
+USER_STATUS_FIELDS = [
+    "id", "username", "phone", "service_number", "rank", "department",
+    "patrol_team", "assigned_district", "photo"
+]
+# Base64 images only come from the detail endpoints (GET /incidents/{id}, ...)
+LIST_EXCLUDED_FIELDS = {"images", "photo"}
+INCIDENT_LIST_FIELDS = [field for field in Incident.model_fields if field not in LIST_EXCLUDED_FIELDS]
+PERSON_LIST_FIELDS = [field for field in Person.model_fields if field not in LIST_EXCLUDED_FIELDS]
+MESSAGE_FIELDS = list(Message.model_fields)
+
+def build_projection(fields: Optional[str], allowed: List[str]) -> Dict[str, int]:
+    """Build a MongoDB projection from a comma separated sparse fieldset (?fields=a,b,c)"""
+    selected = allowed
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in allowed]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        # id is always part of the response so clients can reference the entry
+        selected = ["id"] + [field for field in requested if field != "id"]
+    projection = {field: 1 for field in selected}
+    projection["_id"] = 0
+    return projection
+
+# Optimistic concurrency: version-stamped documents with ETag / If-Match
+def resource_etag(doc: dict) -> str:
+    """Weak ETag of an incident or person document"""
+    return f'W/"{doc.get("id")}-{doc.get("version", 1)}"'
+
+def if_match_filter(if_match: Optional[str], resource_id: str) -> Dict[str, Any]:
+    """Mongo filter for an If-Match header, empty if the client didn't send one"""
+    if not if_match or if_match.strip() == "*":
+        return {}
+    versions = []
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag_id, _, tag_version = tag.strip('"').rpartition("-")
+        if tag_id == resource_id and tag_version.isdigit():
+            versions.append(int(tag_version))
+    if not versions:
+        raise HTTPException(status_code=412, detail="If-Match does not match the current version")
+    return {"version": {"$in": versions}}
+
+async def raise_update_conflict(collection, resource_id: str, if_match_used: bool, not_found_detail: str):
+    """Explain why a conditional update matched nothing: 404 or 412"""
+    if not await collection.find_one({"id": resource_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail=not_found_detail)
+    if if_match_used:
+        raise HTTPException(status_code=412, detail="Resource was modified by someone else - reload and try again")
+    raise HTTPException(status_code=409, detail="Conflicting update")
+
+# HTTP conditional GET (ETag / Last-Modified) for read-mostly resources
+# Every write to a cached collection bumps its counter in db.collection_versions;
+# a poll whose counters are unchanged gets a 304 without touching the data.
+async def bump_collection_version(*names: str):
+    """Mark collections as changed for conditional GET"""
+    for name in names:
+        await db.collection_versions.update_one(
+            {"_id": name},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+def request_is_fresh(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """True if the client's cached copy (If-None-Match / If-Modified-Since) is still valid"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Weak comparison (RFC 9110 13.1.2): W/"x" and "x" are the same tag here
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= since
+    return False
+
+async def conditional_response(request: Request, collections: List[str], build):
+    """Answer 304 Not Modified if nothing changed, otherwise build the response"""
+    versions = {doc["_id"]: doc async for doc in db.collection_versions.find({"_id": {"$in": collections}})}
+    # build() can reuse the counters instead of reading them again
+    request.state.collection_versions = {name: versions.get(name, {}).get("version", 0) for name in collections}
+    parts = [request.url.path, str(request.query_params)]
+    parts += [f"{name}:{versions.get(name, {}).get('version', 0)}" for name in collections]
+    etag = 'W/"' + hashlib.sha1("|".join(parts).encode()).hexdigest()[:24] + '"'
+    modified = [doc["updated_at"] for doc in versions.values() if doc.get("updated_at")]
+    last_modified = max(modified) if modified else None
+    
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    if request_is_fresh(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    
+    response = await build()
+    response.headers.update(headers)
+    return response
+
+def fixed_content_response(request: Request, content: Any) -> Response:
+    """Conditional GET for a payload that doesn't live in the database: ETag = body hash"""
+    response = MongoJSONResponse(content)
+    etag = 'W/"' + hashlib.sha1(response.body).hexdigest()[:24] + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request_is_fresh(request, etag, None):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return response
+
 # Security functions
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     try:
         return pwd_context.verify(plain_password, hashed_password)
     except Exception as e:
-        print(f"Password verification error: {e}")
+        logger.warning(f"Password verification error: {e}", extra={"event": "auth"})
         return False
 
 def get_password_hash(password: str) -> str:
@@ -405,11 +606,11 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
 # Socket.IO events
 @sio.event
 async def connect(sid, environ):
-    print(f"🔗 Client {sid} connected")
+    logger.info("Socket connected", extra={"event": "socket_connect", "sid": sid})
 
 @sio.event
 async def disconnect(sid):
-    print(f"🔌 Client {sid} disconnected")
+    logger.info("Socket disconnected", extra={"event": "socket_disconnect", "sid": sid})
     # Remove from user_sockets mapping
     if sid in user_sockets:
         user_id = user_sockets[sid]
@@ -419,21 +620,27 @@ async def disconnect(sid):
             online_users[user_id]["socket_id"] = None
 
 @sio.event
+@trace_socket_event
+@socket_event
 async def join_user_room(sid, user_id):
     """Join user to their personal room for notifications"""
     await sio.enter_room(sid, f"user_{user_id}")
     user_sockets[sid] = user_id
     if user_id in online_users:
         online_users[user_id]["socket_id"] = sid
-    print(f"👤 User {user_id} joined personal room")
+    logger.info("User joined personal room", extra={"event": "join_room", "user_id": user_id, "sid": sid})
 
 @sio.event
+@trace_socket_event
+@socket_event
 async def join_channel(sid, channel):
     """Join a channel room"""
     await sio.enter_room(sid, f"channel_{channel}")
-    print(f"📺 Socket {sid} joined channel: {channel}")
+    logger.info("Socket joined channel", extra={"event": "join_room", "channel": channel, "sid": sid})
 
 @sio.event
+@trace_socket_event
+@socket_event
 async def join_private_room(sid, data):
     """Join private chat room between two users"""
     user1 = data.get('user1')
@@ -442,9 +649,11 @@ async def join_private_room(sid, data):
     users = sorted([user1, user2])
     room_name = f"private_{users[0]}_{users[1]}"
     await sio.enter_room(sid, room_name)
-    print(f"💬 Socket {sid} joined private room: {room_name}")
+    logger.info("Socket joined private room", extra={"event": "join_room", "room": room_name, "sid": sid})
 
 @sio.event
+@trace_socket_event
+@socket_event
 async def send_message(sid, data):
     """Handle real-time message sending"""
     try:
@@ -484,30 +693,44 @@ async def send_message(sid, data):
             # Send to channel room
             await sio.emit('new_message', message_data, room=f"channel_{channel}")
             
-        print(f"📩 Message sent: {content[:50]}...")
+        logger.info("Message sent", extra={"event": "socket_message", "channel": channel, "sender_id": sender_id})
         
-    except Exception as e:
-        print(f"❌ Error sending message: {e}")
+    except Exception:
+        logger.exception("Error sending message", extra={"event": "socket_message"})
 
 @sio.event
+@trace_socket_event
+@socket_event
 async def join_room(sid, data):
     room = data.get('room', 'general')
     await sio.enter_room(sid, room)
     await sio.emit('joined_room', {'room': room}, room=sid)
 
 @sio.event
+@trace_socket_event
+@socket_event
 async def location_update(sid, data):
     # Save location update
     location_data = {
         "user_id": data.get('user_id'),
         "location": data.get('location'),
-        "timestamp": datetime.utcnow()
+        "timestamp": datetime.utcnow(),
+        "district_id": await lookup_district(data.get('location'))
     }
-    await db.locations.insert_one(location_data)
+    # Raw ping: the TTL index drops it unless the retention job keeps it
+    await db.locations.insert_one({**location_data, "expire_at": raw_ping_expiry()})
+    logger.debug("Location update", extra={"event": "location_update", "user_id": location_data["user_id"]})
     
     # Broadcast to all connected clients
     await sio.emit('location_updated', location_data)
 
+async def lookup_district(location) -> Optional[str]:
+    """District id for a {lat, lng} location via the boundary index"""
+    point = location_point(location)
+    if point is None:
+        return None
+    return (await district_registry.current(db)).lookup(*point)
+
 # API Routes
 @api_router.post("/auth/register", response_model=User)
 async def register_user(user_data: UserCreate):
@@ -517,7 +740,8 @@ async def register_user(user_data: UserCreate):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Hash password
-    hashed_password = get_password_hash(user_data.password)
+    # bcrypt takes ~250 ms of CPU - keep it off the event loop
+    hashed_password = await run_in_threadpool(get_password_hash, user_data.password)
     
     # Create user object with all required fields
     user_dict = {
@@ -555,7 +779,7 @@ async def login(user_data: UserLogin):
     if not stored_password:
         raise HTTPException(status_code=400, detail="User password not found")
     
-    if not verify_password(user_data.password, stored_password):
+    if not await run_in_threadpool(verify_password, user_data.password, stored_password):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -602,7 +826,12 @@ async def update_profile(user_updates: UserUpdate, current_user: User = Depends(
     return User(**updated_user)
 
 @api_router.put("/incidents/{incident_id}/assign", response_model=Incident)
-async def assign_incident(incident_id: str, current_user: User = Depends(get_current_user)):
+async def assign_incident(
+    incident_id: str,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
     # Allow all authenticated users to assign incidents (removed admin restriction)
     # Old restriction: Only police and admin can assign incidents
     # if current_user.role not in [UserRole.POLICE, UserRole.ADMIN]:
@@ -612,16 +841,36 @@ async def assign_incident(incident_id: str, current_user: User = Depends(get_cur
         'assigned_to': current_user.id,
         'assigned_to_name': current_user.username,
         'status': 'in_progress',
-        'updated_at': datetime.utcnow()
+        'updated_at': datetime.utcnow(),
+        'assigned_at': datetime.utcnow()
     }
     
-    result = await db.incidents.update_one({"id": incident_id}, {"$set": updates})
+    # Compare-and-set: only take the incident if nobody else has it yet
+    version_filter = if_match_filter(if_match, incident_id)
+    query = {
+        "id": incident_id,
+        "$or": [{"assigned_to": None}, {"assigned_to": current_user.id}],
+        **version_filter
+    }
+    incident = await db.incidents.find_one_and_update(
+        query,
+        {"$set": updates, "$inc": {"version": 1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
     
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Incident not found")
+    if incident is None:
+        current = await db.incidents.find_one({"id": incident_id}, {"_id": 0, "assigned_to": 1, "assigned_to_name": 1})
+        # {} for an incident that was never assigned - only None means it's gone
+        if current is None:
+            raise HTTPException(status_code=404, detail="Incident not found")
+        if current.get("assigned_to") not in (None, current_user.id):
+            raise HTTPException(status_code=409, detail=f"Incident already assigned to {current.get('assigned_to_name')}")
+        raise HTTPException(status_code=412, detail="Resource was modified by someone else - reload and try again")
     
-    incident = await db.incidents.find_one({"id": incident_id})
     incident_obj = Incident(**incident)
+    response.headers["ETag"] = resource_etag(incident)
+    await bump_collection_version("incidents")
     
     # Notify about incident assignment
     await sio.emit('incident_assigned', {
@@ -633,9 +882,13 @@ async def assign_incident(incident_id: str, current_user: User = Depends(get_cur
     return incident_obj
 
 @api_router.get("/users/by-status")
-async def get_users_by_status(current_user: User = Depends(get_current_user)):
+async def get_users_by_status(fields: Optional[str] = None, current_user: User = Depends(get_current_user)):
     """Get users grouped by their work status with online information"""
-    users = await db.users.find().to_list(100)
+    projection = build_projection(fields, USER_STATUS_FIELDS)
+    user_fields = [field for field in projection if field != "_id"]
+    # status and last_activity are needed for grouping and the online check
+    projection.update({"status": 1, "last_activity": 1})
+    users = await db.users.find({}, projection).to_list(100)
     now = datetime.utcnow()
     offline_threshold = timedelta(minutes=2)
     
@@ -652,24 +905,16 @@ async def get_users_by_status(current_user: User = Depends(get_current_user)):
         if user_status not in users_by_status:
             users_by_status[user_status] = []
             
-        user_data = {
-            "id": user_doc.get("id"),
-            "username": user_doc.get("username"),
-            "phone": user_doc.get("phone"),
-            "service_number": user_doc.get("service_number"),
-            "rank": user_doc.get("rank"),
-            "department": user_doc.get("department"),
+        user_data = {field: user_doc.get(field) for field in user_fields}
+        user_data.update({
             "status": user_status,
             "is_online": is_online,
             "online_status": "Online" if is_online else "Offline",
-            "last_activity": last_activity.isoformat() if last_activity else None,
-            "patrol_team": user_doc.get("patrol_team"),
-            "assigned_district": user_doc.get("assigned_district"),
-            "photo": user_doc.get("photo")
-        }
+            "last_activity": last_activity.isoformat() if last_activity else None
+        })
         users_by_status[user_status].append(user_data)
     
-    return serialize_mongo_data(users_by_status)
+    return MongoJSONResponse(users_by_status)
 
 @api_router.delete("/messages/{message_id}")
 async def delete_message(message_id: str, current_user: User = Depends(get_current_user)):
@@ -707,13 +952,83 @@ class Report(BaseModel):
     status: str = "draft"  # draft, submitted, reviewed
     last_edited_by: Optional[str] = None  # ID of last editor
     last_edited_by_name: Optional[str] = None  # Name of last editor
-    edit_history: List[Dict[str, Any]] = []  # Track edit history
+    version: int = 1  # Edit history lives in db.report_versions
 
 class ReportCreate(BaseModel):
     title: str
     content: str
     shift_date: str
 
+REPORT_LIST_PROJECTION = build_projection(None, [field for field in Report.model_fields if field not in LIST_EXCLUDED_FIELDS])
+REPORT_FOLDER_ITEM_PROJECTION = build_projection(None, ["id", "title", "author_name", "shift_date", "created_at", "status"])
+
+# Report versions (Bearbeitungsverlauf): see report_versions.py
+async def migrate_legacy_edit_history(report: dict):
+    """Move an embedded edit_history array (old format) into db.report_versions"""
+    legacy_entries = legacy_version_entries(report)
+    if legacy_entries:
+        await db.report_versions.insert_many(legacy_entries)
+    await db.reports.update_one({"id": report["id"]}, {"$unset": {"edit_history": ""}})
+
+# Report folder index (Berichte/{year}/{month})
+# db.report_folders holds one counter document per author and month, so the
+# folder tree can be served without touching the reports collection.
+def report_folder_key(report: dict) -> Dict[str, Any]:
+    """Folder index key for a report document"""
+    created_date = report['created_at']
+    if isinstance(created_date, str):
+        created_date = datetime.fromisoformat(created_date.replace('Z', '+00:00'))
+    return {"author_id": report["author_id"], "year": created_date.year, "month": created_date.month}
+
+def report_folder_path(year: int, month: int) -> str:
+    return f"Berichte/{year}/{datetime(year, month, 1).strftime('%B')}"
+
+async def update_report_folder_index(report: dict, delta: int):
+    """Add (+1) or remove (-1) a report from the folder index"""
+    key = report_folder_key(report)
+    await db.report_folders.update_one(
+        key,
+        {"$inc": {"count": delta}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+    if delta < 0:
+        await db.report_folders.delete_one({**key, "count": {"$lte": 0}})
+
+async def count_archived_report(report: dict) -> bool:
+    """+1 for an incident archive report, at most once per archive id; True if it was counted now"""
+    key = report_folder_key(report)
+    await db.report_folders.update_one(key, {"$setOnInsert": {"count": 0, "archived_ids": []}}, upsert=True)
+    result = await db.report_folders.update_one(
+        {**key, "archived_ids": {"$ne": report["id"]}},
+        {"$inc": {"count": 1}, "$addToSet": {"archived_ids": report["id"]}, "$set": {"updated_at": datetime.utcnow()}}
+    )
+    return result.modified_count == 1
+
+async def touch_report_folder_index(report: dict):
+    """Mark a folder as changed after a report inside it was edited"""
+    await db.report_folders.update_one(report_folder_key(report), {"$set": {"updated_at": datetime.utcnow()}})
+
+async def rebuild_report_folder_index():
+    """Rebuild db.report_folders from the reports collection with a single $group"""
+    pipeline = [
+        {"$project": {"author_id": 1, "created": {"$toDate": "$created_at"},
+                      "archive_id": {"$cond": [{"$gt": ["$incident_id", None]}, "$id", None]}}},
+        {"$group": {
+            "_id": {"author_id": "$author_id", "year": {"$year": "$created"}, "month": {"$month": "$created"}},
+            "count": {"$sum": 1},
+            "archived_ids": {"$addToSet": "$archive_id"}
+        }}
+    ]
+    folders = [
+        {**folder["_id"], "count": folder["count"], "updated_at": datetime.utcnow(),
+         "archived_ids": [archive_id for archive_id in folder["archived_ids"] if archive_id]}
+        async for folder in db.reports.aggregate(pipeline)
+    ]
+    await db.report_folders.delete_many({})
+    if folders:
+        await db.report_folders.insert_many(folders)
+    return len(folders)
+
 @api_router.post("/reports", response_model=Report)
 async def create_report(report_data: ReportCreate, current_user: User = Depends(get_current_user)):
     report_dict = report_data.dict()
@@ -728,6 +1043,8 @@ async def create_report(report_data: ReportCreate, current_user: User = Depends(
     if not result.inserted_id:
         raise HTTPException(status_code=500, detail="Failed to create report")
     
+    await update_report_folder_index(report_dict, 1)
+    
     return report_obj
 
 @api_router.put("/reports/{report_id}", response_model=Report)
@@ -736,10 +1053,10 @@ async def update_report(
     report_data: ReportCreate, 
     current_user: User = Depends(get_current_user)
 ):
-    """Update an existing report including status changes"""
+    """Update an existing report and record the change in db.report_versions"""
     try:
         # Find the existing report
-        existing_report = await db.reports.find_one({"id": report_id})
+        existing_report = await db.reports.find_one({"id": report_id}, {"_id": 0})
         
         if not existing_report:
             raise HTTPException(status_code=404, detail="Report not found")
@@ -748,25 +1065,52 @@ async def update_report(
         if existing_report.get("author_id") != current_user.id and current_user.role != 'admin':
             raise HTTPException(status_code=403, detail="Permission denied")
         
+        if "edit_history" in existing_report:
+            await migrate_legacy_edit_history(existing_report)
+        
+        now = datetime.utcnow()
+        current_version = existing_report.get("version", 1)
+        
+        # Compact diff: only changed short fields plus a line patch for the content
+        changes = field_changes(existing_report, report_data.dict())
+        old_content = existing_report.get("content") or ""
+        content_patch = make_content_patch(old_content, report_data.content) if old_content != report_data.content else []
+        
         # Prepare update data
         update_data = report_data.dict()
-        update_data['updated_at'] = datetime.utcnow()
+        update_data.update({
+            "updated_at": now,
+            "last_edited_by": current_user.id,
+            "last_edited_by_name": current_user.username,
+            "version": current_version + 1
+        })
         
-        # Update the report
+        # Compare-and-set on the version we diffed against - a concurrent edit
+        # would otherwise record the same version twice and break the patch chain
+        version_filter = {"version": current_version} if "version" in existing_report else {"version": {"$exists": False}}
         result = await db.reports.update_one(
-            {"id": report_id},
+            {"id": report_id, **version_filter},
             {"$set": update_data}
         )
         
         if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Report not found")
+            await raise_update_conflict(db.reports, report_id, False, "Report not found")
         
-        # Get the updated report
-        updated_report = await db.reports.find_one({"id": report_id})
-        if '_id' in updated_report:
-            del updated_report['_id']
+        await db.report_versions.insert_one({
+            "id": str(uuid.uuid4()),
+            "report_id": report_id,
+            "version": current_version,
+            "edited_by": current_user.id,
+            "edited_by_name": current_user.username,
+            "edited_at": now,
+            "changes": changes,
+            "content_patch": content_patch
+        })
+        
+        updated_report = {**existing_report, **update_data}
+        await touch_report_folder_index(updated_report)
         
-        logger.info(f"Report updated: {report_id} by {current_user.username} - Status: {update_data.get('status', 'unchanged')}")
+        logger.info(f"Report updated: {report_id} by {current_user.username} - Version: {current_version + 1}")
         return Report(**updated_report)
         
     except HTTPException:
@@ -775,11 +1119,61 @@ async def update_report(
         logger.error(f"Error updating report: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@api_router.get("/reports/{report_id}/history")
+async def get_report_history(
+    report_id: str,
+    page: int = 1,
+    page_size: int = 20,
+    current_user: User = Depends(get_current_user)
+):
+    """Edit history of a report, newest first, loaded page by page"""
+    report = await db.reports.find_one({"id": report_id}, {"_id": 0, "author_id": 1, "version": 1})
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    if report["author_id"] != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized to view this report")
+    
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), 100)
+    query = {"report_id": report_id}
+    total = await db.report_versions.count_documents(query)
+    versions = await db.report_versions.find(query, {"_id": 0}) \
+        .sort([("edited_at", -1)]).skip((page - 1) * page_size).limit(page_size).to_list(page_size)
+    
+    return MongoJSONResponse({
+        "report_id": report_id,
+        "current_version": report.get("version", 1),
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "versions": versions
+    })
+
+@api_router.get("/reports/{report_id}/versions/{version}")
+async def get_report_version(report_id: str, version: int, current_user: User = Depends(get_current_user)):
+    """Rebuild an older revision of a report from the stored reverse patches"""
+    report = await db.reports.find_one({"id": report_id}, {"_id": 0, "images": 0, "edit_history": 0})
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    if report["author_id"] != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized to view this report")
+    
+    current_version = report.get("version", 1)
+    if not 1 <= version <= current_version:
+        raise HTTPException(status_code=404, detail="Version not found")
+    
+    newer_versions = await db.report_versions.find(
+        {"report_id": report_id, "version": {"$gte": version}}, {"_id": 0}
+    ).sort("version", -1).to_list(None)
+    revision = rebuild_revision(report, newer_versions)
+    
+    return {"report_id": report_id, "version": version, **revision}
+
 @api_router.delete("/reports/{report_id}")
 async def delete_report(report_id: str, current_user: User = Depends(get_current_user)):
     """Delete a report"""
     # Find the report
-    report = await db.reports.find_one({"id": report_id})
+    report = await db.reports.find_one({"id": report_id}, {"_id": 0, "id": 1, "author_id": 1, "created_at": 1, "incident_id": 1})
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     
@@ -793,18 +1187,24 @@ async def delete_report(report_id: str, current_user: User = Depends(get_current
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Report not found")
     
+    await update_report_folder_index(report, -1)
+    await db.report_versions.delete_many({"report_id": report_id})
+    if report.get("incident_id"):
+        # Archived incidents are heatmap points
+        await bump_collection_version(HEATMAP_LOCATIONS)
+    
     return {"status": "success", "message": "Report deleted"}
 
 @api_router.get("/reports", response_model=List[Report])
 async def get_reports(current_user: User = Depends(get_current_user)):
     if current_user.role == UserRole.ADMIN:
         # Admin can see all reports
-        reports = await db.reports.find().sort("created_at", -1).to_list(100)
+        reports = await db.reports.find({}, REPORT_LIST_PROJECTION).sort("created_at", -1).to_list(100)
     else:
         # Users can only see their own reports
-        reports = await db.reports.find({"author_id": current_user.id}).sort("created_at", -1).to_list(100)
+        reports = await db.reports.find({"author_id": current_user.id}, REPORT_LIST_PROJECTION).sort("created_at", -1).to_list(100)
     
-    return [Report(**serialize_mongo_data(report)) for report in reports]
+    return MongoJSONResponse(reports)
 
 @api_router.put("/users/{user_id}")
 async def update_user(user_id: str, updates: UserUpdate, current_user: User = Depends(get_current_user)):
@@ -821,7 +1221,7 @@ async def update_user(user_id: str, updates: UserUpdate, current_user: User = De
         raise HTTPException(status_code=404, detail="User not found")
     
     updated_user = await db.users.find_one({"id": user_id})
-    return serialize_mongo_data(updated_user)
+    return MongoJSONResponse(updated_user)
 
 @api_router.delete("/users/{user_id}")
 async def delete_user(user_id: str, current_user: User = Depends(get_current_user)):
@@ -850,142 +1250,232 @@ async def delete_incident(incident_id: str, current_user: User = Depends(get_cur
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Incident not found")
     
+    # The heatmap only picks up new points on its own - a removed one needs a reload
+    await bump_collection_version("incidents", HEATMAP_LOCATIONS)
     return {"status": "success", "message": "Incident deleted"}
 
+# Archive ids are derived from the incident id, so a retried completion
+# always targets the same report
+INCIDENT_ARCHIVE_NAMESPACE = uuid.UUID("6f1c9a52-3b8e-4c57-9d7a-2e0b8f4d1a63")
+
+def incident_archive_id(incident_id: str) -> str:
+    return str(uuid.uuid5(INCIDENT_ARCHIVE_NAMESPACE, incident_id))
+
+def incident_archive_pipeline(incident_id: str, archive_id: str, current_user: User, now: datetime) -> List[Dict[str, Any]]:
+    """Copy an incident into the reports archive entirely inside MongoDB"""
+    def text(field):
+        return {"$ifNull": [f"${field}", ""]}
+    
+    return [
+        {"$match": {"id": incident_id}},
+        {"$project": {
+            "_id": 0,
+            "id": {"$literal": archive_id},
+            "title": {"$concat": ["Archiv: ", text("title")]},
+            "content": {"$concat": [
+                "Vorfall abgeschlossen:\n\nTitel: ", text("title"),
+                "\nBeschreibung: ", text("description"),
+                "\nOrt: ", text("address"),
+                "\nPriorität: ", text("priority"),
+                {"$literal": f"\n\nAbgeschlossen von: {current_user.username}\nDatum: {now.strftime('%d.%m.%Y %H:%M')}"}
+            ]},
+            "author_id": {"$literal": current_user.id},
+            "author_name": {"$literal": current_user.username},
+            "shift_date": {"$literal": now.strftime('%Y-%m-%d')},
+            "status": {"$literal": "archived"},
+            "incident_id": {"$literal": incident_id},
+            "images": {"$ifNull": ["$images", []]},  # Transfer images from incident to report
+            "location": "$location",
+            "address": "$address",
+            "priority": "$priority",
+            "incident_created_at": "$created_at",  # keeps the heatmap on the reporting time
+            "created_at": {"$literal": now},
+            "updated_at": {"$literal": now},
+            "version": {"$literal": 1}
+        }},
+        # keepExisting makes a retry after a partial failure a no-op
+        {"$merge": {"into": "reports", "on": "id", "whenMatched": "keepExisting", "whenNotMatched": "insert"}}
+    ]
+
 @api_router.put("/incidents/{incident_id}/complete", response_model=dict)
 async def complete_incident(incident_id: str, current_user: User = Depends(get_current_user)):
+    """Move an incident into the report archive - idempotent and safe to retry"""
     # Allow all authenticated users to complete incidents (removed admin restriction)
     # Old restriction: Only police and admin can complete incidents
     # if current_user.role not in [UserRole.POLICE, UserRole.ADMIN]:
     #     raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Get incident details first
-    incident = await db.incidents.find_one({"id": incident_id})
-    if not incident:
-        raise HTTPException(status_code=404, detail="Incident not found")
-    
-    # Create archive report with images
-    archive_report = {
-        "id": str(uuid.uuid4()),
-        "title": f"Archiv: {incident['title']}",
-        "content": f"Vorfall abgeschlossen:\n\nTitel: {incident['title']}\nBeschreibung: {incident['description']}\nOrt: {incident['address']}\nPriorität: {incident['priority']}\n\nAbgeschlossen von: {current_user.username}\nDatum: {datetime.utcnow().strftime('%d.%m.%Y %H:%M')}",
-        "author_id": current_user.id,
-        "author_name": current_user.username,
-        "shift_date": datetime.utcnow().strftime('%Y-%m-%d'),
-        "status": "archived",
-        "incident_id": incident_id,
-        "images": incident.get('images', []),  # Transfer images from incident to report
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
-    }
+    started = time.perf_counter()
+    archive_id = incident_archive_id(incident_id)
     
-    # Save to archive
-    await db.reports.insert_one(archive_report)
-    
-    # Delete the incident from active incidents
+    # 1. Server-side copy into the archive (images never leave MongoDB)
+    pipeline = incident_archive_pipeline(incident_id, archive_id, current_user, datetime.utcnow())
+    try:
+        await db.incidents.aggregate(pipeline).to_list(None)
+    except OperationFailure as e:
+        # $merge needs the unique reports.id index - copy through the app instead
+        logger.warning(f"Archive $merge failed, falling back to upsert: {e}", extra={"event": "incident_completed"})
+        async for archive in db.incidents.aggregate(pipeline[:-1]):
+            await db.reports.update_one({"id": archive_id}, {"$setOnInsert": archive}, upsert=True)
+    
+    # 2. Remove the active incident. Whoever deletes it owns the completion;
+    #    a crash between 1 and 2 is repaired by simply retrying.
     result = await db.incidents.delete_one({"id": incident_id})
+    archive_report = await db.reports.find_one(
+        {"id": archive_id}, {"_id": 0, "id": 1, "author_id": 1, "created_at": 1}
+    )
     
-    if result.deleted_count == 0:
+    if archive_report is None:
         raise HTTPException(status_code=404, detail="Incident not found")
     
-    # Notify about incident completion
+    # 3. Folder counter, keyed by archive id - also runs on retries, so a crash
+    #    after the delete cannot leave the counter short
+    counted = await count_archived_report(archive_report)
+    
+    duration_ms = round((time.perf_counter() - started) * 1000, 2)
+    if result.deleted_count == 0 and not counted:
+        # Already completed by an earlier request
+        return {"status": "success", "message": "Incident already completed", "archive_id": archive_id,
+                "already_completed": True, "duration_ms": duration_ms}
+    
+    await bump_collection_version("incidents")
+    
+    # Notify about incident completion (a retry that finished an interrupted completion sends it too)
     await sio.emit('incident_completed', {
         'incident_id': incident_id,
         'completed_by': current_user.username,
-        'archived_as': archive_report['id']
+        'archived_as': archive_id
     })
     
-    return {"status": "success", "message": "Incident completed and archived", "archive_id": archive_report['id']}
+    duration_ms = round((time.perf_counter() - started) * 1000, 2)
+    logger.info(f"Incident completed: {incident_id} -> {archive_id} by {current_user.username} in {duration_ms} ms")
+    return {"status": "success", "message": "Incident completed and archived", "archive_id": archive_id,
+            "already_completed": result.deleted_count == 0, "duration_ms": duration_ms}
 
 @api_router.get("/reports/folders")
 async def get_report_folders(current_user: User = Depends(get_current_user)):
-    """Get all report folders and their contents"""
+    """Get the report folder tree (year/month) with report counts from the folder index"""
     if current_user.role == UserRole.ADMIN:
-        # Admin can see all reports
-        reports = await db.reports.find().sort("created_at", -1).to_list(1000)
+        # Admin can see all reports - sum up the per-author counters
+        pipeline = [
+            {"$group": {"_id": {"year": "$year", "month": "$month"}, "count": {"$sum": "$count"}}},
+            {"$project": {"_id": 0, "year": "$_id.year", "month": "$_id.month", "count": 1}}
+        ]
+        entries = await db.report_folders.aggregate(pipeline).to_list(None)
     else:
         # Users can only see their own reports
-        reports = await db.reports.find({"author_id": current_user.id}).sort("created_at", -1).to_list(1000)
+        entries = await db.report_folders.find(
+            {"author_id": current_user.id}, {"_id": 0, "year": 1, "month": 1, "count": 1}
+        ).to_list(None)
     
-    # Organize reports by folders (year/month)
     folders = {}
-    for report in reports:
-        created_date = report['created_at']
-        if isinstance(created_date, str):
-            from datetime import datetime
-            created_date = datetime.fromisoformat(created_date.replace('Z', '+00:00'))
-        
-        year = str(created_date.year)
-        month = created_date.strftime('%B')  # Full month name
-        
-        folder_path = f"Berichte/{year}/{month}"
-        
-        if folder_path not in folders:
-            folders[folder_path] = []
-        
-        folders[folder_path].append({
-            "id": report["id"],
-            "title": report["title"],
-            "content": report["content"],
-            "author_name": report["author_name"],
-            "shift_date": report["shift_date"],
-            "created_at": report["created_at"],
-            "status": report.get("status", "submitted")
-        })
+    for entry in sorted(entries, key=lambda e: (e["year"], e["month"]), reverse=True):
+        if entry["count"] <= 0:
+            continue
+        folders[report_folder_path(entry["year"], entry["month"])] = {
+            "year": entry["year"],
+            "month": entry["month"],
+            "count": entry["count"]
+        }
     
     return folders
 
-@api_router.put("/reports/{report_id}", response_model=Report)
-async def update_report(report_id: str, updated_data: ReportCreate, current_user: User = Depends(get_current_user)):
-    """Update an existing report"""
-    # Find the report
-    report = await db.reports.find_one({"id": report_id})
+@api_router.get("/reports/folders/{year}/{month}")
+async def get_report_folder_contents(
+    year: int,
+    month: int,
+    page: int = 1,
+    page_size: int = 20,
+    current_user: User = Depends(get_current_user)
+):
+    """Lazily load the reports of one folder, newest first"""
+    if not 1 <= month <= 12:
+        raise HTTPException(status_code=400, detail="Month must be between 1 and 12")
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), 100)
+    
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    query = {"created_at": {"$gte": start, "$lt": end}}
+    if current_user.role != UserRole.ADMIN:
+        query["author_id"] = current_user.id
+    
+    total = await db.reports.count_documents(query)
+    reports = await db.reports.find(query, REPORT_FOLDER_ITEM_PROJECTION) \
+        .sort("created_at", -1).skip((page - 1) * page_size).limit(page_size).to_list(page_size)
+    
+    return MongoJSONResponse({
+        "folder": report_folder_path(year, month),
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "reports": reports
+    })
+
+@api_router.get("/reports/export")
+async def export_reports(
+    format: str = "ndjson",
+    include_images: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream reports straight from the Mongo cursor as NDJSON or a chunked JSON array"""
+    if format not in ("ndjson", "json"):
+        raise HTTPException(status_code=400, detail="Format must be 'ndjson' or 'json'")
+    
+    query = {} if current_user.role == UserRole.ADMIN else {"author_id": current_user.id}
+    projection = {"_id": 0}
+    if not include_images:
+        projection["images"] = 0
+    
+    cursor = db.reports.find(query, projection).sort("created_at", -1).batch_size(100)
+    
+    async def ndjson_lines():
+        async for report in cursor:
+            yield orjson.dumps(report, default=_mongo_json_default) + b"\n"
+    
+    async def json_array():
+        yield b"["
+        first = True
+        async for report in cursor:
+            yield (b"" if first else b",") + orjson.dumps(report, default=_mongo_json_default)
+            first = False
+        yield b"]"
+    
+    filename = f"berichte-{datetime.utcnow().strftime('%Y%m%d')}.{'ndjson' if format == 'ndjson' else 'json'}"
+    return StreamingResponse(
+        ndjson_lines() if format == "ndjson" else json_array(),
+        media_type="application/x-ndjson" if format == "ndjson" else "application/json",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@api_router.get("/reports/{report_id}", response_model=Report)
+async def get_report(report_id: str, current_user: User = Depends(get_current_user)):
+    """Single report including its images (the list leaves them out)"""
+    report = await db.reports.find_one({"id": report_id}, {"_id": 0, "edit_history": 0})
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
-    
-    # Check if user owns the report or is admin
     if report["author_id"] != current_user.id and current_user.role != UserRole.ADMIN:
-        raise HTTPException(status_code=403, detail="Not authorized to edit this report")
-    
-    # Create edit history entry
-    edit_history_entry = {
-        "edited_by": current_user.id,
-        "edited_by_name": current_user.username,
-        "edited_at": datetime.utcnow(),
-        "changes": {
-            "title": {"old": report.get("title"), "new": updated_data.title},
-            "content": {"old": report.get("content"), "new": updated_data.content},
-            "shift_date": {"old": report.get("shift_date"), "new": updated_data.shift_date}
-        }
-    }
-    
-    # Update the report
-    update_fields = {
-        "title": updated_data.title,
-        "content": updated_data.content,
-        "shift_date": updated_data.shift_date,
-        "updated_at": datetime.utcnow(),
-        "last_edited_by": current_user.id,
-        "last_edited_by_name": current_user.username
-    }
-    
-    result = await db.reports.update_one(
-        {"id": report_id}, 
-        {
-            "$set": update_fields,
-            "$push": {"edit_history": edit_history_entry}
-        }
-    )
-    
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Report not found")
-    
-    # Get updated report
-    updated_report = await db.reports.find_one({"id": report_id})
-    return Report(**updated_report)
+        raise HTTPException(status_code=403, detail="Not authorized to view this report")
+    return MongoJSONResponse(report)
 
 # Person Database Endpoints
-@api_router.post("/persons", response_model=Person)
+@api_router.post("/persons/duplicates/check")
+async def check_person_duplicates(person_data: PersonCreate, current_user: User = Depends(get_current_user)):
+    """Likely duplicates for a person that is about to be created"""
+    await sync_person_match_index()
+    return person_match_index.find_duplicates(person_data.dict())
+
+@api_router.get("/admin/persons/duplicates")
+async def get_person_duplicate_report(threshold: float = 0.75, current_user: User = Depends(get_current_user)):
+    """Batch dedup report over the whole persons collection (Admin only)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    await sync_person_match_index()
+    pairs = person_match_index.duplicate_report(threshold)
+    return {"persons_checked": len(person_match_index), "threshold": threshold, "duplicates": pairs}
+
+@api_router.post("/persons", response_model=PersonCreateResult)
 async def create_person(person_data: PersonCreate, current_user: User = Depends(get_current_user)):
     """Erstelle eine neue Person in der Datenbank"""
     # Allow all authenticated users to create person entries (removed admin restriction)
@@ -998,33 +1488,51 @@ async def create_person(person_data: PersonCreate, current_user: User = Depends(
     person_dict['created_by_name'] = current_user.username
     person_obj = Person(**person_dict)
     
+    # Check for likely duplicates before the new entry joins the index
+    await sync_person_match_index()
+    possible_duplicates = person_match_index.find_duplicates(person_obj.dict())
+    
     await db.persons.insert_one(person_obj.dict())
+    person_match_index.apply(person_obj.dict())
+    await bump_collection_version("persons")
     
     # Notify all users about new person entry
     await sio.emit('new_person', person_obj.dict())
     
-    return person_obj
+    return PersonCreateResult(**person_obj.dict(), possible_duplicates=possible_duplicates)
 
 @api_router.get("/persons", response_model=List[Person])
-async def get_persons(status: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_persons(request: Request, status: Optional[str] = None, fields: Optional[str] = None, current_user: User = Depends(get_current_user)):
     """Lade alle Personen oder nach Status gefiltert"""
     query = {"is_active": True}
     if status:
         query["status"] = status
     
-    persons = await db.persons.find(query).sort("created_at", -1).to_list(100)
-    return [Person(**person) for person in persons]
+    projection = build_projection(fields, PERSON_LIST_FIELDS)
+    
+    async def build():
+        persons = await db.persons.find(query, projection).sort("created_at", -1).to_list(100)
+        return MongoJSONResponse(persons)
+    
+    return await conditional_response(request, ["persons"], build)
 
 @api_router.get("/persons/{person_id}", response_model=Person)
-async def get_person(person_id: str, current_user: User = Depends(get_current_user)):
+async def get_person(person_id: str, response: Response, current_user: User = Depends(get_current_user)):
     """Lade eine spezifische Person"""
     person = await db.persons.find_one({"id": person_id})
     if not person:
         raise HTTPException(status_code=404, detail="Person not found")
+    response.headers["ETag"] = resource_etag(person)
     return Person(**person)
 
 @api_router.put("/persons/{person_id}", response_model=Person)
-async def update_person(person_id: str, updates: PersonUpdate, current_user: User = Depends(get_current_user)):
+async def update_person(
+    person_id: str,
+    updates: PersonUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
     """Aktualisiere Person-Daten"""
     # Allow all authenticated users to update person entries (removed admin restriction)
     # Old restriction: Only police and admin can update person entries
@@ -1034,13 +1542,21 @@ async def update_person(person_id: str, updates: PersonUpdate, current_user: Use
     update_data = {k: v for k, v in updates.dict().items() if v is not None}
     update_data['updated_at'] = datetime.utcnow()
     
-    result = await db.persons.update_one({"id": person_id}, {"$set": update_data})
+    version_filter = if_match_filter(if_match, person_id)
+    person = await db.persons.find_one_and_update(
+        {"id": person_id, **version_filter},
+        {"$set": update_data, "$inc": {"version": 1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
     
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Person not found")
+    if person is None:
+        await raise_update_conflict(db.persons, person_id, bool(version_filter), "Person not found")
     
-    person = await db.persons.find_one({"id": person_id})
     person_obj = Person(**person)
+    person_match_index.apply(person)
+    response.headers["ETag"] = resource_etag(person)
+    await bump_collection_version("persons")
     
     # Notify about person update
     await sio.emit('person_updated', person_obj.dict())
@@ -1061,6 +1577,9 @@ async def delete_person(person_id: str, current_user: User = Depends(get_current
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Person not found")
     
+    person_match_index.remove(person_id)
+    await bump_collection_version("persons")
+    
     return {"status": "success", "message": "Person archived"}
 
 @api_router.get("/persons/stats/overview")
@@ -1111,6 +1630,7 @@ async def broadcast_emergency_alert(
         
         if not result.inserted_id:
             raise HTTPException(status_code=500, detail="Failed to create emergency broadcast")
+        await bump_collection_version("emergency_broadcasts")
         
         # Log detailed info
         location_info = ""
@@ -1182,6 +1702,7 @@ async def create_incident(incident_data: IncidentCreate, current_user: User = De
     incident_dict["updated_at"] = datetime.utcnow()
     incident_dict["status"] = "open"
     incident_dict["reported_by"] = current_user.username
+    incident_dict["version"] = 1
     
     # FIXED: Handle coordinates from GPS data correctly
     if isinstance(incident_dict.get("coordinates"), dict):
@@ -1202,37 +1723,71 @@ async def create_incident(incident_data: IncidentCreate, current_user: User = De
             "lat": 51.2879,
             "lng": 7.2954
         }
+    incident_dict["district_id"] = await lookup_district(incident_dict["location"])
     
     await db.incidents.insert_one(incident_dict)
+    await bump_collection_version("incidents")
     return Incident(**incident_dict)
 
 @api_router.get("/incidents", response_model=List[Incident])
-async def get_incidents(current_user: User = Depends(get_current_user)):
-    incidents = await db.incidents.find().sort("created_at", -1).to_list(100)
-    return [Incident(**incident) for incident in incidents]
+async def get_incidents(request: Request, fields: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    projection = build_projection(fields, INCIDENT_LIST_FIELDS)
+    
+    async def build():
+        incidents = await db.incidents.find({}, projection).sort("created_at", -1).to_list(100)
+        return MongoJSONResponse(incidents)
+    
+    return await conditional_response(request, ["incidents"], build)
 
 @api_router.get("/incidents/{incident_id}", response_model=Incident)
-async def get_incident(incident_id: str, current_user: User = Depends(get_current_user)):
+async def get_incident(incident_id: str, response: Response, current_user: User = Depends(get_current_user)):
     incident = await db.incidents.find_one({"id": incident_id})
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
+    response.headers["ETag"] = resource_etag(incident)
     return Incident(**incident)
 
+INCIDENT_ASSIGNMENT_FIELDS = {"assigned_to", "assigned_to_name", "assigned_at"}
+
 @api_router.put("/incidents/{incident_id}", response_model=Incident)
-async def update_incident(incident_id: str, updates: Dict[str, Any], current_user: User = Depends(get_current_user)):
+async def update_incident(
+    incident_id: str,
+    updates: Dict[str, Any],
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
     # Allow all authenticated users to update incidents (removed admin restriction)
     # Old restriction: Only police and admin can update incidents
     # if current_user.role not in [UserRole.POLICE, UserRole.ADMIN]:
     #     raise HTTPException(status_code=403, detail="Not authorized")
     
+    # Identity, version and district are managed by the server
+    for field in ("_id", "id", "version", "district_id"):
+        updates.pop(field, None)
+    # Assignment only via PUT /incidents/{id}/assign (compare-and-set, 409 on conflict)
+    assignment_fields = sorted(INCIDENT_ASSIGNMENT_FIELDS & updates.keys())
+    if assignment_fields:
+        raise HTTPException(status_code=400, detail=f"{', '.join(assignment_fields)} can only be set via PUT /api/incidents/{incident_id}/assign")
+    if "location" in updates:
+        # Moved incidents belong to the district of the new location
+        updates["district_id"] = await lookup_district(updates["location"])
     updates['updated_at'] = datetime.utcnow()
-    result = await db.incidents.update_one({"id": incident_id}, {"$set": updates})
     
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Incident not found")
+    version_filter = if_match_filter(if_match, incident_id)
+    incident = await db.incidents.find_one_and_update(
+        {"id": incident_id, **version_filter},
+        {"$set": updates, "$inc": {"version": 1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    
+    if incident is None:
+        await raise_update_conflict(db.incidents, incident_id, bool(version_filter), "Incident not found")
     
-    incident = await db.incidents.find_one({"id": incident_id})
     incident_obj = Incident(**incident)
+    response.headers["ETag"] = resource_etag(incident)
+    await bump_collection_version("incidents", *([HEATMAP_LOCATIONS] if "location" in updates else []))
     
     # Notify about incident update
     await sio.emit('incident_updated', incident_obj.dict())
@@ -1244,9 +1799,9 @@ async def get_messages(channel: str = "general", current_user: User = Depends(ge
     """Get messages from specified channel"""
     try:
         messages = await db.messages.find({"channel": channel}).sort("timestamp", 1).limit(100).to_list(100)
-        return serialize_mongo_data(messages)
+        return MongoJSONResponse(messages)
     except Exception as e:
-        print(f"❌ Fehler beim Laden der Nachrichten: {str(e)}")
+        logger.exception("Fehler beim Laden der Nachrichten", extra={"event": "messages", "channel": channel})
         return []
 
 @api_router.get("/messages/private", response_model=List[Message])
@@ -1261,8 +1816,9 @@ async def get_private_messages(unread_only: bool = False, current_user: User = D
     if unread_only:
         query["is_read"] = {"$ne": True}
     
-    messages = await db.messages.find(query).sort("timestamp", -1).limit(50).to_list(50)
-    return [Message(**message) for message in messages]
+    projection = build_projection(None, MESSAGE_FIELDS)
+    messages = await db.messages.find(query, projection).sort("timestamp", -1).limit(50).to_list(50)
+    return MongoJSONResponse(messages)
 
 @api_router.post("/messages", response_model=Message)
 async def send_message(message_data: MessageCreate, current_user: User = Depends(get_current_user)):
@@ -1342,12 +1898,13 @@ async def get_live_locations(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"Failed to get live locations: {str(e)}")
 
 @api_router.get("/users")
-async def get_users(current_user: User = Depends(get_current_user)):
+async def get_users(fields: Optional[str] = None, current_user: User = Depends(get_current_user)):
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    users = await db.users.find().to_list(100)
-    return serialize_mongo_data(users)
+    projection = build_projection(fields, USER_LIST_FIELDS)
+    users = await db.users.find({}, projection).to_list(100)
+    return MongoJSONResponse(users)
 
 @api_router.get("/locations/live")
 async def get_live_locations(current_user: User = Depends(get_current_user)):
@@ -1375,10 +1932,90 @@ async def get_live_locations(current_user: User = Depends(get_current_user)):
     
     return result
 
+@api_router.get("/tracks/{user_id}")
+async def get_patrol_track(
+    user_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Patrol track of one officer as columns (t in ms UTC, lat, lng) - default: last 12h"""
+    if current_user.id != user_id and current_user.role not in (UserRole.ADMIN, UserRole.POLICE):
+        raise HTTPException(status_code=403, detail="Not allowed to view this track")
+    end = naive_utc(end) if end else datetime.utcnow()
+    start = naive_utc(start) if start else end - timedelta(hours=12)
+    if not timedelta(0) < end - start <= timedelta(days=7):
+        raise HTTPException(status_code=400, detail="Time range must be between 0 and 7 days")
+    
+    track = await track_store.fetch(user_id, start, end)
+    return MongoJSONResponse({"start": start, "end": end, **track.to_json()})
+
+@api_router.get("/analytics/patrol")
+async def get_patrol_analytics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    grid_m: float = 100,
+    current_user: User = Depends(get_current_user)
+):
+    """Distance, dwell time per district and coverage of all officers - default: last 12h"""
+    if current_user.role not in (UserRole.ADMIN, UserRole.POLICE):
+        raise HTTPException(status_code=403, detail="Not authorized")
+    end = naive_utc(end) if end else datetime.utcnow()
+    start = naive_utc(start) if start else end - timedelta(hours=12)
+    if not timedelta(0) < end - start <= timedelta(days=7):
+        raise HTTPException(status_code=400, detail="Time range must be between 0 and 7 days")
+    if not 10 <= grid_m <= 5000:
+        raise HTTPException(status_code=400, detail="grid_m must be between 10 and 5000")
+    
+    tracks = await track_store.fetch_all(start, end)
+    districts = await district_registry.current(db)
+    if not districts.ids:
+        # No boundaries drawn yet - fall back to the nearest district center
+        districts = DistrictCenters(await db.districts.find({}, {"_id": 0, "id": 1, "name": 1, "coordinates": 1}).to_list(1000))
+    # CPU work - keep the event loop free for sockets
+    report = await run_in_threadpool(shift_report, tracks, districts, grid_m)
+    return MongoJSONResponse({"start": start, "end": end, **report})
+
+HEATMAP_MAX_DAYS = 3650
+
+@api_router.get("/heatmap/{z}/{x}/{y}.png")
+async def get_heatmap_tile(
+    z: int,
+    x: int,
+    y: int,
+    kind: str = "all",
+    days: int = 30,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """256px density tile (slippy map z/x/y) of incidents and/or emergencies"""
+    if kind != "all" and kind not in HEATMAP_KINDS:
+        raise HTTPException(status_code=400, detail="kind must be all, incidents or emergencies")
+    if not 0 <= z <= 20 or not 0 <= x < 2 ** z or not 0 <= y < 2 ** z:
+        raise HTTPException(status_code=400, detail="Invalid tile coordinates")
+    if not 1 <= days <= HEATMAP_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"days must be between 1 and {HEATMAP_MAX_DAYS}")
+    # Whole hours, so "last 30 days" maps to the same cached tile for an hour
+    try:
+        end = naive_utc(end) if end else datetime.utcnow()
+        if end != floor_hour(end):
+            end = floor_hour(end) + timedelta(hours=1)
+        start = floor_hour(naive_utc(start) if start else end - timedelta(days=days))
+    except OverflowError:
+        raise HTTPException(status_code=400, detail="Time range out of bounds")
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    await heatmap_index.sync(db)
+    png = await heatmap_index.tile(HEATMAP_KINDS.get(kind, -1), z, x, y, to_ms(start), to_ms(end))
+    return Response(content=png, media_type="image/png", headers={"Cache-Control": "private, max-age=60"})
+
 @api_router.post("/locations/update")
 async def update_location(location_data: LocationUpdate, current_user: User = Depends(get_current_user)):
     location_data.user_id = current_user.id
-    await db.locations.insert_one(location_data.dict())
+    location_data.district_id = await lookup_district(location_data.location)
+    await db.locations.insert_one({**location_data.dict(), "expire_at": raw_ping_expiry()})
     
     # Emit location update
     await sio.emit('location_updated', location_data.dict())
@@ -1403,6 +2040,72 @@ async def get_admin_stats(current_user: User = Depends(get_current_user)):
         "total_messages": total_messages
     }
 
+@api_router.get("/admin/diagnostics/loop")
+async def get_loop_diagnostics(current_user: User = Depends(get_current_user)):
+    """Event loop lag percentiles and the stacks of recent stalls (this worker)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return loop_monitor.report()
+
+@api_router.get("/admin/retention")
+async def get_retention_status(current_user: User = Depends(get_current_user)):
+    """Retention policies and the result of the last run"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    last_run = await db.retention_state.find_one({"_id": "last_run"}, {"_id": 0})
+    return MongoJSONResponse({
+        "policies": [policy.describe() for policy in retention_engine.policies],
+        "archive_dir": str(retention_engine.archive_dir),
+        "interval_minutes": RETENTION_INTERVAL_MINUTES,
+        "last_run": last_run
+    })
+
+@api_router.post("/admin/retention/run")
+async def run_retention(current_user: User = Depends(get_current_user)):
+    """Run downsampling and archiving now"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    report = await retention_engine.run()
+    if report is None:
+        raise HTTPException(status_code=409, detail="Retention job is already running")
+    return MongoJSONResponse(report)
+
+@api_router.get("/admin/tracks/storage")
+async def get_track_storage(current_user: User = Depends(get_current_user)):
+    """Disk and memory per GPS point: raw location documents vs. track buckets"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return MongoJSONResponse(await track_store.storage_report())
+
+@api_router.get("/admin/diagnostics/profile")
+async def profile_worker(
+    seconds: float = 10,
+    interval_ms: float = 10,
+    threads: str = "loop",
+    current_user: User = Depends(get_current_user)
+):
+    """Sample this worker's stacks for N seconds - collapsed stacks for flamegraphs"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if not 0 < seconds <= 60 or not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="seconds must be 0-60, interval_ms 1-1000")
+    if threads not in ("loop", "all"):
+        raise HTTPException(status_code=400, detail="threads must be 'loop' or 'all'")
+    if profiler.busy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    # This handler runs on the event loop thread, so that's the one to sample
+    thread_id = threading.get_ident() if threads == "loop" else None
+    try:
+        collapsed, samples = await run_in_threadpool(profiler.run, seconds, interval_ms / 1000, thread_id)
+    except RuntimeError:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    logger.info("Profile captured", extra={"event": "profile", "user_id": current_user.id,
+                                           "seconds": seconds, "samples": samples})
+    return Response(content=collapsed, media_type="text/plain; charset=utf-8",
+                    headers={"X-Profile-Samples": str(samples)})
+
 # Online Status Management
 @api_router.post("/users/online-status")
 async def set_online_status(current_user: User = Depends(get_current_user)):
@@ -1447,9 +2150,9 @@ async def user_heartbeat(current_user: User = Depends(get_current_user)):
             {"id": user_id},
             {"$set": {"last_activity": now}}
         )
-        print(f"💓 Heartbeat: {current_user.username} activity updated in database")
-    except Exception as e:
-        print(f"❌ Heartbeat database update error: {e}")
+        logger.info("Heartbeat", extra={"event": "heartbeat", "user_id": user_id})
+    except Exception:
+        logger.exception("Heartbeat database update error", extra={"event": "heartbeat", "user_id": user_id})
     
     return {"status": "heartbeat", "timestamp": now}
 
@@ -1505,7 +2208,7 @@ async def create_first_user(user_data: UserCreate):
         raise HTTPException(status_code=400, detail="Users already exist. Use normal registration.")
     
     # Create first admin user
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await run_in_threadpool(hash_password, user_data.password)
     user_dict = user_data.dict()
     user_dict["hashed_password"] = hashed_password  # Use consistent field name
     user_dict.pop("password", None)  # Remove plain password
@@ -1518,10 +2221,10 @@ async def create_first_user(user_data: UserCreate):
     
     await db.users.insert_one(user_dict)
     
-    # Return user without password - use serialize_mongo_data for proper serialization
+    # Return user without password
     user_dict.pop("hashed_password", None)
     
-    return {"message": "First admin user created successfully", "user": serialize_mongo_data(user_dict)}
+    return MongoJSONResponse({"message": "First admin user created successfully", "user": user_dict})
 
 # Database reset endpoint (DANGER!)
 @api_router.delete("/admin/reset-database")
@@ -1540,6 +2243,9 @@ async def reset_database():
             total_documents_deleted += result.deleted_count
             collection_names.append(collection_name)
         
+        # Counters were wiped too - start them again so no client keeps a stale 304
+        await bump_collection_version("incidents", "persons", "app_config", "districts", HEATMAP_LOCATIONS)
+        
         return {
             "message": "Database completely reset!",
             "collections_cleared": collections_cleared,
@@ -1550,21 +2256,80 @@ async def reset_database():
         raise HTTPException(status_code=500, detail=f"Reset failed: {str(e)}")
 
 # App Configuration Endpoints
+# Process-wide cache: every worker compares its cached version with the
+# app_config counter (see bump_collection_version), so an update on one
+# worker invalidates all others on their next request
+app_config_cache: Dict[str, Any] = {"version": None, "config": None, "icon": None}
+
+ICON_SIGNATURES = [
+    (b"\x89PNG", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"RIFF", "image/webp"),
+]
+
+def decode_app_icon(value: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Decode the stored base64 / data-URL icon into bytes for /app/icon"""
+    if not value:
+        return None
+    media_type = None
+    if value.startswith("data:"):
+        header, _, value = value.partition(",")
+        media_type = header[5:].split(";")[0] or None
+    try:
+        data = base64.b64decode(value)
+    except (binascii.Error, ValueError):
+        logger.warning("App-Icon ist kein gültiges Base64", extra={"event": "app_config"})
+        return None
+    if not media_type:
+        media_type = next((kind for magic, kind in ICON_SIGNATURES if data.startswith(magic)), "image/png")
+    return {"data": data, "media_type": media_type, "hash": hashlib.sha1(data).hexdigest()[:16]}
+
+async def load_app_configuration(version: Optional[int] = None) -> Dict[str, Any]:
+    """Cached app configuration (without the icon bytes) and the decoded icon"""
+    # Read the counter before the document: a write in between only makes
+    # us cache a newer config under an older version, which reloads next time
+    if version is None:
+        counter = await db.collection_versions.find_one({"_id": "app_config"})
+        version = counter["version"] if counter else 0
+    if app_config_cache["config"] is not None and app_config_cache["version"] == version:
+        return app_config_cache
+    
+    config = await db.app_config.find_one({}, {"_id": 0})
+    # No default document is written on the read path anymore
+    config = AppConfiguration(**config).dict() if config else AppConfiguration(id="default").dict()
+    icon = decode_app_icon(config.get("app_icon"))
+    config["app_icon"] = None
+    config["app_icon_url"] = f"/api/app/icon?v={icon['hash']}" if icon else None
+    
+    app_config_cache.update(version=version, config=config, icon=icon)
+    return app_config_cache
+
 @api_router.get("/app/config", response_model=AppConfiguration)
-async def get_app_configuration():
-    """Get current app configuration"""
-    config = await db.app_config.find_one()
-    if not config:
-        # Create default configuration
-        default_config = AppConfiguration()
-        await db.app_config.insert_one(default_config.dict())
-        return default_config
-    
-    # Convert MongoDB _id to our id field
-    if "_id" in config:
-        del config["_id"]
-    
-    return AppConfiguration(**config)
+async def get_app_configuration(request: Request):
+    """Get current app configuration (icon via app_icon_url)"""
+    async def build():
+        # conditional_response already read the app_config counter
+        cache = await load_app_configuration(request.state.collection_versions["app_config"])
+        return MongoJSONResponse(cache["config"])
+    
+    return await conditional_response(request, ["app_config"], build)
+
+@api_router.get("/app/icon")
+async def get_app_icon(request: Request, v: Optional[str] = None):
+    """App icon as binary image - immutable when requested with its hash"""
+    icon = (await load_app_configuration())["icon"]
+    if not icon:
+        raise HTTPException(status_code=404, detail="No app icon configured")
+    
+    etag = f'"{icon["hash"]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable" if v == icon["hash"] else "public, max-age=300"
+    }
+    if request_is_fresh(request, etag, None):
+        return Response(status_code=304, headers=headers)
+    return Response(content=icon["data"], media_type=icon["media_type"], headers=headers)
 
 @api_router.put("/admin/app/config", response_model=AppConfiguration)
 async def update_app_configuration(
@@ -1592,6 +2357,8 @@ async def update_app_configuration(
         {"id": current_config["id"]},
         {"$set": update_data}
     )
+    await bump_collection_version("app_config")
+    app_config_cache["version"] = None
     
     # Get updated config
     updated_config = await db.app_config.find_one({"id": current_config["id"]})
@@ -1627,67 +2394,154 @@ async def assign_user_district_team(
         raise HTTPException(status_code=404, detail="User not found")
     
     updated_user = await db.users.find_one({"id": user_id})
-    return serialize_mongo_data(updated_user)
+    return MongoJSONResponse(updated_user)
 
 # Get all districts
 @api_router.get("/districts")
-async def get_districts(current_user: User = Depends(get_current_user)):
+async def get_districts(request: Request, current_user: User = Depends(get_current_user)):
     """Get all available districts"""
-    districts = [
-        {"id": "innenstadt", "name": "Innenstadt", "description": "Stadtzentrum und Geschäftsviertel"},
-        {"id": "nord", "name": "Nord", "description": "Nördliche Stadtbezirke"},
-        {"id": "sued", "name": "Süd", "description": "Südliche Stadtbezirke"},
-        {"id": "ost", "name": "Ost", "description": "Östliche Stadtbezirke"},
-        {"id": "west", "name": "West", "description": "Westliche Stadtbezirke"},
-        {"id": "industriegebiet", "name": "Industriegebiet", "description": "Industrielle Bereiche"},
-        {"id": "wohngebiet", "name": "Wohngebiet", "description": "Wohngebiete und Siedlungen"},
-        {"id": "zentrum", "name": "Zentrum", "description": "Zentraler Bereich"}
-    ]
-    return districts
+    return fixed_content_response(request, DISTRICT_LIST)
+
+@api_router.get("/districts/lookup")
+async def lookup_district_at(lat: float, lng: float, current_user: User = Depends(get_current_user)):
+    """District containing a position (District.boundary), district_id None outside"""
+    return {"lat": lat, "lng": lng, "district_id": await lookup_district({"lat": lat, "lng": lng})}
+
+DISTRICT_LIST = [
+    {"id": "innenstadt", "name": "Innenstadt", "description": "Stadtzentrum und Geschäftsviertel"},
+    {"id": "nord", "name": "Nord", "description": "Nördliche Stadtbezirke"},
+    {"id": "sued", "name": "Süd", "description": "Südliche Stadtbezirke"},
+    {"id": "ost", "name": "Ost", "description": "Östliche Stadtbezirke"},
+    {"id": "west", "name": "West", "description": "Westliche Stadtbezirke"},
+    {"id": "industriegebiet", "name": "Industriegebiet", "description": "Industrielle Bereiche"},
+    {"id": "wohngebiet", "name": "Wohngebiet", "description": "Wohngebiete und Siedlungen"},
+    {"id": "zentrum", "name": "Zentrum", "description": "Zentraler Bereich"}
+]
 
 # Get all teams
 @api_router.get("/teams")
-async def get_teams(current_user: User = Depends(get_current_user)):
+async def get_teams(request: Request, current_user: User = Depends(get_current_user)):
     """Get all available teams"""
-    teams = [
-        {"id": "alpha", "name": "Team Alpha", "description": "Streifendienst Alpha"},
-        {"id": "bravo", "name": "Team Bravo", "description": "Streifendienst Bravo"},
-        {"id": "charlie", "name": "Team Charlie", "description": "Streifendienst Charlie"},
-        {"id": "delta", "name": "Team Delta", "description": "Streifendienst Delta"},
-        {"id": "spezial", "name": "Spezialeinheit", "description": "Spezielle Einsätze"},
-        {"id": "verkehr", "name": "Verkehrspolizei", "description": "Verkehrsüberwachung"},
-        {"id": "kripo", "name": "Kriminalpolizei", "description": "Ermittlungsdienst"},
-        {"id": "bereitschaft", "name": "Bereitschaftspolizei", "description": "Bereitschaftsdienst"}
-    ]
-    return teams
+    return fixed_content_response(request, TEAM_LIST)
+
+TEAM_LIST = [
+    {"id": "alpha", "name": "Team Alpha", "description": "Streifendienst Alpha"},
+    {"id": "bravo", "name": "Team Bravo", "description": "Streifendienst Bravo"},
+    {"id": "charlie", "name": "Team Charlie", "description": "Streifendienst Charlie"},
+    {"id": "delta", "name": "Team Delta", "description": "Streifendienst Delta"},
+    {"id": "spezial", "name": "Spezialeinheit", "description": "Spezielle Einsätze"},
+    {"id": "verkehr", "name": "Verkehrspolizei", "description": "Verkehrsüberwachung"},
+    {"id": "kripo", "name": "Kriminalpolizei", "description": "Ermittlungsdienst"},
+    {"id": "bereitschaft", "name": "Bereitschaftspolizei", "description": "Bereitschaftsdienst"}
+]
+
+# Volltextsuche über Berichte, Vorfälle und Personen
+# Uses the German MongoDB text indexes from ensure_indexes() (snowball stemming,
+# so "Einbrüche" finds "Einbruch"); results are ranked by textScore.
+SEARCH_MAX_PAGE = 10  # every page reads page * page_size hits per collection
+SEARCH_TARGETS = {
+    "reports": {
+        "collection": "reports",
+        "fields": ["id", "title", "content", "author_name", "shift_date", "status", "created_at"],
+        "title": lambda doc: doc.get("title"),
+        "snippet": lambda doc: doc.get("content")
+    },
+    "incidents": {
+        "collection": "incidents",
+        "fields": ["id", "title", "description", "address", "priority", "status", "created_at"],
+        "title": lambda doc: doc.get("title"),
+        "snippet": lambda doc: doc.get("description")
+    },
+    "persons": {
+        "collection": "persons",
+        "fields": ["id", "first_name", "last_name", "case_number", "description", "status", "created_at"],
+        "title": lambda doc: f"{doc.get('first_name', '')} {doc.get('last_name', '')}".strip(),
+        "snippet": lambda doc: doc.get("description")
+    }
+}
+
+def search_scope(target: str, current_user: User) -> Dict[str, Any]:
+    """Visibility filter per search target - same rules as the list endpoints"""
+    if target == "reports" and current_user.role != UserRole.ADMIN:
+        return {"author_id": current_user.id}
+    if target == "persons":
+        return {"is_active": True}
+    return {}
+
+@api_router.get("/search")
+async def search(
+    q: str,
+    types: str = "reports,incidents,persons",
+    page: int = 1,
+    page_size: int = 20,
+    with_totals: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Ranked full-text search with pagination; with_totals adds a count per type (extra query each)"""
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="Search query must not be empty")
+    targets = [target.strip() for target in types.split(",") if target.strip()]
+    unknown = [target for target in targets if target not in SEARCH_TARGETS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(unknown)}")
+    if not 1 <= page <= SEARCH_MAX_PAGE:
+        raise HTTPException(status_code=400, detail=f"page must be between 1 and {SEARCH_MAX_PAGE}")
+    page_size = min(max(page_size, 1), 100)
+    
+    # Every collection returns its best page * page_size hits (+1 to detect
+    # more), the merged list is ranked by text score and the requested page is
+    # sliced out of it. The text index weights (see INDEXES) are set up as one
+    # scale, so raw scores compare across collections - a surname or case number
+    # hit outranks a title, which outranks a word in a report body.
+    limit = page * page_size
+    hits = []
+    totals = {}
+    has_more = False
+    for target in targets:
+        config = SEARCH_TARGETS[target]
+        collection = db[config["collection"]]
+        query = {"$text": {"$search": q}, **search_scope(target, current_user)}
+        projection = build_projection(None, config["fields"])
+        projection["score"] = {"$meta": "textScore"}
+        
+        if with_totals:
+            totals[target] = await collection.count_documents(query)
+        cursor = collection.find(query, projection).sort([("score", {"$meta": "textScore"})]).limit(limit + 1)
+        docs = await cursor.to_list(limit + 1)
+        has_more = has_more or len(docs) > limit
+        for doc in docs[:limit]:
+            snippet = config["snippet"](doc) or ""
+            hits.append({
+                "type": target,
+                "id": doc.get("id"),
+                "title": config["title"](doc),
+                "snippet": snippet[:200],
+                "score": round(doc.pop("score"), 4),
+                "document": doc
+            })
+    
+    hits.sort(key=lambda hit: hit["score"], reverse=True)
+    start = (page - 1) * page_size
+    
+    result = {
+        "query": q,
+        "page": page,
+        "page_size": page_size,
+        "has_more": has_more or len(hits) > start + page_size,
+        "results": hits[start:start + page_size]
+    }
+    if with_totals:
+        result["total"] = sum(totals.values())
+        result["totals"] = totals
+    return MongoJSONResponse(result)
 
 # Root route
 @api_router.get("/")
 async def root():
     return {"message": "Stadtwache API", "version": "1.0.0"}
 
-# Statische Dateien für Frontend
-static_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../frontend/dist"))
-expo_static_path = os.path.join(static_path, "_expo")
-assets_path = os.path.join(static_path, "assets")
-fonts_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../frontend/node_modules/@expo/vector-icons/build/vendor/react-native-vector-icons/Fonts"))
-
-if os.path.exists(expo_static_path):
-    # Mount _expo directory to /_expo path
-    app.mount("/_expo", StaticFiles(directory=expo_static_path), name="expo_static")
-    print(f"✅ Expo static files mounted from: {expo_static_path}")
-
-if os.path.exists(assets_path):
-    # Mount assets directory to /assets path  
-    app.mount("/assets", StaticFiles(directory=assets_path), name="assets")
-    print(f"✅ Assets mounted from: {assets_path}")
-
-if os.path.exists(fonts_path):
-    # Mount fonts for icons
-    app.mount("/assets/node_modules/@expo/vector-icons/build/vendor/react-native-vector-icons/Fonts", StaticFiles(directory=fonts_path), name="fonts")
-    print(f"✅ Icon fonts mounted from: {fonts_path}")
-
-# Root route wird weiter unten definiert
+# Statische Dateien für Frontend: siehe StaticFrontend nach include_router
 
 # CORS middleware
 app.add_middleware(
@@ -1698,12 +2552,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+# Kompression + Payload-Budgets (unkomprimierte Bytes pro Antwort)
+# Listen mit Base64-Fotos sollen mobil nicht unbemerkt auf mehrere MB wachsen
+PAYLOAD_BUDGETS = [
+    (r"^/api/reports/export$", None),
+    (r"^/api/app/icon$", None),
+    (r"^/api/(users|users/by-status)$", 512 * 1024),
+    (r"^/api/(incidents|persons)$", 1024 * 1024),
+    (r"^/api/(reports|reports/folders/.+)$", 512 * 1024),
+    (r"^/api/(messages|messages/private.*)$", 512 * 1024),
+    (r"^/api/(app/config|districts|teams|search)$", 128 * 1024),
+    (r"^/api/", 2 * 1024 * 1024),
+]
+
+app.add_middleware(CompressionMiddleware, minimum_size=1024, budgets=PAYLOAD_BUDGETS)
+# Server span per request, continues an incoming traceparent / X-Trace-Id
+app.add_middleware(TracingMiddleware)
+# Outermost: measures the full request including compression and bytes on the wire
+app.add_middleware(MetricsMiddleware)
 
 # Schichtverwaltung API Endpoints - Einfache Funktionen
 @app.post("/api/checkin")
@@ -1726,7 +2592,7 @@ async def check_in(current_user: User = Depends(get_current_user)):
             {"$set": {"last_check_in": datetime.utcnow(), "missed_check_ins": 0}}
         )
         
-        return serialize_mongo_data(checkin_data)
+        return MongoJSONResponse(checkin_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1739,7 +2605,7 @@ async def get_checkins(current_user: User = Depends(get_current_user)):
         else:
             checkins = await db.checkins.find({"user_id": current_user.id}).sort("timestamp", -1).to_list(50)
         
-        return serialize_mongo_data(checkins)
+        return MongoJSONResponse(checkins)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1758,19 +2624,15 @@ async def request_vacation(vacation_data: VacationCreate, current_user: User = D
             "created_at": datetime.utcnow()
         }
         
-        # Log vacation request
-        print(f"📅 URLAUBSANTRAG: {current_user.username} ({current_user.id}) beantragt Urlaub vom {vacation_data.start_date} bis {vacation_data.end_date}")
-        print(f"   Grund: {vacation_data.reason}")
-        print(f"   Status: pending")
-        print(f"   ID: {vacation_dict['id']}")
-        
         await db.vacations.insert_one(vacation_dict)
         
-        print(f"✅ Urlaubsantrag erfolgreich in Datenbank gespeichert")
+        logger.info(f"Urlaubsantrag von {current_user.username}: {vacation_data.start_date} bis {vacation_data.end_date}",
+                    extra={"event": "vacation_requested", "user_id": current_user.id, "vacation_id": vacation_dict["id"]})
         
-        return serialize_mongo_data(vacation_dict)
+        return MongoJSONResponse(vacation_dict)
     except Exception as e:
-        print(f"❌ FEHLER beim Urlaubsantrag von {current_user.username}: {str(e)}")
+        logger.exception(f"Fehler beim Urlaubsantrag von {current_user.username}",
+                         extra={"event": "vacation_requested", "user_id": current_user.id})
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/vacations")
@@ -1782,7 +2644,7 @@ async def get_vacations(current_user: User = Depends(get_current_user)):
         else:
             vacations = await db.vacations.find({"user_id": current_user.id}).sort("created_at", -1).to_list(100)
         
-        return serialize_mongo_data(vacations)
+        return MongoJSONResponse(vacations)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1840,30 +2702,22 @@ async def approve_vacation(vacation_id: str, approval_data: VacationApproval, cu
         else:
             update_data["rejection_reason"] = approval_data.reason
         
-        # Log vacation approval/rejection
-        action_text = "GENEHMIGT" if approval_data.action == "approve" else "ABGELEHNT"
-        print(f"📅 URLAUBSENTSCHEIDUNG: Admin {current_user.username} hat Urlaubsantrag {action_text}")
-        print(f"   Antrag ID: {vacation_id}")
-        print(f"   Benutzer: {vacation.get('user_name', 'unbekannt')}")
-        print(f"   Zeitraum: {vacation.get('start_date')} bis {vacation.get('end_date')}")
-        print(f"   Begründung: {approval_data.reason}")
-        
         result = await db.vacations.update_one(
             {"id": vacation_id},
             {"$set": update_data}
         )
         
         if result.matched_count > 0:
-            print(f"✅ Urlaubsentscheidung erfolgreich in Datenbank gespeichert")
-        else:
-            print(f"❌ Fehler: Urlaubsantrag {vacation_id} nicht gefunden")
+            action_text = "genehmigt" if approval_data.action == "approve" else "abgelehnt"
+            logger.info(f"Urlaubsantrag von {vacation.get('user_name', 'unbekannt')} {action_text} durch {current_user.username}",
+                        extra={"event": "vacation_decided", "vacation_id": vacation_id, "action": approval_data.action})
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Vacation request not found")
         
         # Aktualisierte Vacation zurückgeben
         updated_vacation = await db.vacations.find_one({"id": vacation_id})
-        return serialize_mongo_data(updated_vacation)
+        return MongoJSONResponse(updated_vacation)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1880,7 +2734,7 @@ async def get_all_vacations(current_user: User = Depends(get_current_user)):
         for vacation in vacations:
             if "_id" in vacation:
                 del vacation["_id"]
-        return serialize_mongo_data(vacations)
+        return MongoJSONResponse(vacations)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1904,12 +2758,13 @@ async def create_sick_leave(sick_leave_data: dict, current_user: User = Depends(
         
         result = await db.sick_leave.insert_one(sick_leave)
         if result.inserted_id:
-            print(f"✅ Krankmeldung erstellt: {sick_leave['user_name']} ({sick_leave['start_date']} - {sick_leave['end_date']})")
-            return {"message": "Krankmeldung erfolgreich eingereicht", "sick_leave": serialize_mongo_data(sick_leave)}
+            logger.info(f"Krankmeldung erstellt: {sick_leave['user_name']} ({sick_leave['start_date']} - {sick_leave['end_date']})",
+                        extra={"event": "sick_leave", "user_id": sick_leave["user_id"]})
+            return MongoJSONResponse({"message": "Krankmeldung erfolgreich eingereicht", "sick_leave": sick_leave})
         else:
             raise HTTPException(status_code=500, detail="Krankmeldung konnte nicht erstellt werden")
     except Exception as e:
-        print(f"❌ Fehler beim Erstellen der Krankmeldung: {e}")
+        logger.exception("Fehler beim Erstellen der Krankmeldung", extra={"event": "sick_leave"})
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/sick-leave")
@@ -1917,9 +2772,9 @@ async def get_user_sick_leave(current_user: User = Depends(get_current_user)):
     """Get current user's sick leave requests"""
     try:
         sick_leave_list = await db.sick_leave.find({"user_id": current_user.id}).to_list(None)
-        return serialize_mongo_data(sick_leave_list)
+        return MongoJSONResponse(sick_leave_list)
     except Exception as e:
-        print(f"❌ Fehler beim Laden der Krankmeldungen: {e}")
+        logger.exception("Fehler beim Laden der Krankmeldungen", extra={"event": "sick_leave"})
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/admin/sick-leave")
@@ -1930,9 +2785,9 @@ async def get_all_sick_leave(current_user: User = Depends(get_current_user)):
     
     try:
         sick_leave_list = await db.sick_leave.find({}).to_list(None)
-        return serialize_mongo_data(sick_leave_list)
+        return MongoJSONResponse(sick_leave_list)
     except Exception as e:
-        print(f"❌ Fehler beim Laden aller Krankmeldungen: {e}")
+        logger.exception("Fehler beim Laden aller Krankmeldungen", extra={"event": "sick_leave"})
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.put("/admin/sick-leave/{sick_leave_id}/approve")
@@ -1969,14 +2824,15 @@ async def approve_sick_leave(sick_leave_id: str, action_data: dict, current_user
         
         # Get updated sick leave
         updated_sick_leave = await db.sick_leave.find_one({"id": sick_leave_id})
-        print(f"✅ Krankmeldung {status}: {updated_sick_leave.get('user_name')} von {current_user.username}")
+        logger.info(f"Krankmeldung {status}: {updated_sick_leave.get('user_name')} von {current_user.username}",
+                    extra={"event": "sick_leave", "sick_leave_id": sick_leave_id})
         
-        return serialize_mongo_data(updated_sick_leave)
+        return MongoJSONResponse(updated_sick_leave)
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Fehler beim Genehmigen der Krankmeldung: {e}")
+        logger.exception("Fehler beim Genehmigen der Krankmeldung", extra={"event": "sick_leave"})
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.delete("/sick-leave/{sick_leave_id}")
@@ -2000,7 +2856,7 @@ async def delete_sick_leave(sick_leave_id: str, current_user: User = Depends(get
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Fehler beim Löschen der Krankmeldung: {e}")
+        logger.exception("Fehler beim Löschen der Krankmeldung", extra={"event": "sick_leave"})
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/admin/districts")
@@ -2010,12 +2866,38 @@ async def create_district(district_data: DistrictCreate, current_user: User = De
         raise HTTPException(status_code=403, detail="Not authorized")
     
     district_dict = district_data.dict()
+    if district_dict.get('boundary') is not None:
+        validate_boundary(district_dict['boundary'])
     district_dict['id'] = str(uuid.uuid4())
     district_dict['created_at'] = datetime.utcnow()
     
     await db.districts.insert_one(district_dict)
+    await bump_collection_version("districts")
+    district_registry.invalidate()
+    district_dict.pop('_id', None)
     return district_dict
 
+def validate_boundary(boundary: Dict[str, Any]):
+    try:
+        boundary_rings(boundary)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid boundary: {e}")
+
+@app.put("/api/admin/districts/{district_id}/boundary")
+async def set_district_boundary(district_id: str, data: DistrictBoundary, current_user: User = Depends(get_current_user)):
+    """Bezirksgrenze setzen (GeoJSON, nur Admin)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    validate_boundary(data.boundary)
+    
+    result = await db.districts.update_one({"id": district_id}, {"$set": {"boundary": data.boundary}})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="District not found")
+    await bump_collection_version("districts")
+    district_registry.invalidate()
+    index = await district_registry.current(db)
+    return {"status": "success", "district_id": district_id, "index": index.stats()}
+
 @app.get("/api/admin/districts")
 async def get_districts(current_user: User = Depends(get_current_user)):
     """Alle Bezirke abrufen"""
@@ -2176,59 +3058,49 @@ async def update_team_status(team_id: str, status_data: dict, current_user: User
 # Include router - MUST be after all endpoint definitions
 app.include_router(api_router)
 
-# Mount static files from frontend build
+# Health check endpoint (vor dem Frontend-Catch-All, sonst nie erreichbar)
+@app.get("/api/health")
+async def api_health():
+    return {"message": "Stadtwache API", "version": "1.0.0", "status": "läuft"}
+
+# Prometheus metrics (per worker process). Scrapers send the METRICS_TOKEN
+# bearer token; without it only admins (JWT) may read - like /admin/diagnostics
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+metrics_auth = HTTPBearer(auto_error=False)
+
+@app.get("/metrics")
+async def prometheus_metrics(credentials: Optional[HTTPAuthorizationCredentials] = Depends(metrics_auth)):
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    if not (METRICS_TOKEN and hmac.compare_digest(credentials.credentials, METRICS_TOKEN)):
+        current_user = await get_current_user(credentials)
+        if current_user.role != UserRole.ADMIN:
+            raise HTTPException(status_code=403, detail="Not authorized")
+    return Response(content=metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Frontend build - indexed once, served with precompressed variants and cache headers
 FRONTEND_BUILD_DIR = Path(__file__).parent.parent / "frontend" / "dist"
-FRONTEND_STATIC_DIR = Path(__file__).parent.parent / "frontend" / "dist" / "_expo"
+ICON_FONTS_DIR = Path(__file__).parent.parent / "frontend" / "node_modules" / "@expo" / "vector-icons" / "build" / "vendor" / "react-native-vector-icons" / "Fonts"
 
+static_frontend = None
 if FRONTEND_BUILD_DIR.exists():
-    # Mount static assets
-    if FRONTEND_STATIC_DIR.exists():
-        app.mount("/_expo", StaticFiles(directory=str(FRONTEND_STATIC_DIR)), name="static")
-    
-    # Mount assets
-    assets_dir = FRONTEND_BUILD_DIR / "assets"
-    if assets_dir.exists():
-        app.mount("/assets", StaticFiles(directory=str(assets_dir)), name="assets")
+    static_frontend = StaticFrontend(FRONTEND_BUILD_DIR, extra_roots={
+        "assets/node_modules/@expo/vector-icons/build/vendor/react-native-vector-icons/Fonts": ICON_FONTS_DIR
+    })
     
-    # Serve index.html for root
+    # Serve the frontend for all non-API routes
     @app.get("/")
-    async def serve_index():
-        index_path = FRONTEND_BUILD_DIR / "index.html"
-        if index_path.exists():
-            return FileResponse(str(index_path))
-        return {"message": "Frontend not available"}
-    
-    # Serve frontend for all non-API routes
     @app.get("/{full_path:path}")
-    async def serve_frontend(full_path: str):
+    async def serve_frontend(request: Request, full_path: str = ""):
         """Serve the frontend application for all non-API routes"""
-        # Skip API routes
         if full_path.startswith("api/"):
             raise HTTPException(status_code=404, detail="API endpoint not found")
-        
-        # Check for specific files first
-        if full_path:
-            file_path = FRONTEND_BUILD_DIR / full_path
-            if file_path.is_file():
-                return FileResponse(str(file_path))
-        
-        # Serve index.html for SPA routes
-        index_path = FRONTEND_BUILD_DIR / "index.html"
-        if index_path.exists():
-            return FileResponse(str(index_path))
-        
-        # Fallback
-        return FileResponse(str(FRONTEND_BUILD_DIR / "index.html"))
+        return static_frontend.response(full_path, request.headers)
 else:
     @app.get("/")
     async def root_no_frontend():
         return {"message": "Frontend not built. Run 'npx expo export --platform web' first."}
 
-# Health check endpoint
-@app.get("/api/health")
-async def api_health():
-    return {"message": "Stadtwache API", "version": "1.0.0", "status": "läuft"}
-
 # Create team endpoint
 @api_router.post("/admin/teams")
 async def create_team(team_data: dict, current_user: User = Depends(get_current_user)):
@@ -2252,12 +3124,13 @@ async def create_team(team_data: dict, current_user: User = Depends(get_current_
         # Insert team
         await db.teams.insert_one(team_dict)
         
-        print(f"✅ Team '{team_dict['name']}' erstellt von {current_user.username}")
+        logger.info("Team erstellt", extra={"event": "team_created", "team_id": team_dict["id"],
+                                             "team": team_dict["name"], "user_id": current_user.id})
         
-        return serialize_mongo_data(team_dict)
+        return MongoJSONResponse(team_dict)
         
     except Exception as e:
-        print(f"❌ Fehler beim Team-Erstellen: {str(e)}")
+        logger.exception("Fehler beim Team-Erstellen", extra={"event": "team_created"})
         raise HTTPException(status_code=500, detail=str(e))
 
 # Get teams
@@ -2266,9 +3139,9 @@ async def get_teams(current_user: User = Depends(get_current_user)):
     """Get all teams"""
     try:
         teams = await db.teams.find().to_list(100)
-        return serialize_mongo_data(teams)
+        return MongoJSONResponse(teams)
     except Exception as e:
-        print(f"❌ Fehler beim Laden der Teams: {str(e)}")
+        logger.exception("Fehler beim Laden der Teams", extra={"event": "teams"})
         return []
 
 # ✅ NEU: Admin teams endpoint for team management
@@ -2288,14 +3161,94 @@ async def get_admin_teams(current_user: User = Depends(get_current_user)):
             team["member_count"] = member_count
             team["status"] = f"{member_count} Mitglieder"
         
-        return serialize_mongo_data(teams)
+        return MongoJSONResponse(teams)
     except Exception as e:
-        print(f"❌ Fehler beim Laden der Admin-Teams: {e}")
+        logger.exception("Fehler beim Laden der Admin-Teams", extra={"event": "teams"})
         raise HTTPException(status_code=500, detail=str(e))
 
+# (collection, keys, options) - created one by one, a failing index does not block the rest
+INDEXES = [
+    ("incidents", [("id", 1)], {"unique": True}),
+    ("persons", [("id", 1)], {"unique": True}),
+    ("reports", [("id", 1)], {"unique": True}),  # required by $merge in complete_incident
+    ("reports", [("author_id", 1), ("created_at", -1)], {}),
+    ("reports", [("created_at", -1)], {}),
+    ("report_folders", [("author_id", 1), ("year", 1), ("month", 1)], {"unique": True}),
+    ("report_versions", [("report_id", 1), ("version", -1)], {}),
+    ("persons", [("updated_at", 1)], {}),
+    # Volltextsuche (German stemming, weighted fields)
+    ("reports", [("title", "text"), ("content", "text")], {
+        "name": "reports_text", "default_language": "german", "language_override": "search_language",
+        "weights": {"title": 5, "content": 1}}),
+    ("incidents", [("title", "text"), ("description", "text"), ("address", "text")], {
+        "name": "incidents_text", "default_language": "german", "language_override": "search_language",
+        "weights": {"title": 5, "address": 3, "description": 1}}),
+    ("persons", [("first_name", "text"), ("last_name", "text"), ("case_number", "text"), ("description", "text")], {
+        "name": "persons_text", "default_language": "german", "language_override": "search_language",
+        "weights": {"last_name": 10, "case_number": 10, "first_name": 8, "description": 1}}),
+]
+
+async def ensure_indexes() -> List[str]:
+    """Create the indexes the API relies on (idempotent); returns the names of failed indexes"""
+    # Documents from before optimistic concurrency start at version 1
+    await db.incidents.update_many({"version": {"$exists": False}}, {"$set": {"version": 1}})
+    await db.persons.update_many({"version": {"$exists": False}}, {"$set": {"version": 1}})
+    failed = []
+    for collection, keys, options in INDEXES:
+        name = options.get("name") or "_".join(f"{field}_{direction}" for field, direction in keys)
+        try:
+            await db[collection].create_index(keys, **options)
+        except Exception as e:
+            # e.g. unique index over duplicate ids, or a different text index already exists
+            logger.error(f"Index {collection}.{name} could not be created: {e}",
+                         extra={"event": "startup", "collection": collection, "index": name})
+            failed.append(f"{collection}.{name}")
+    return failed
+
+async def startup_step(name: str, step):
+    """Run one startup step; a failure is logged and does not skip the following steps"""
+    try:
+        return await step()
+    except Exception as e:
+        logger.exception(f"Startup step {name} failed: {e}", extra={"event": "startup", "step": name})
+
+async def backfill_report_folder_index():
+    # Backfill the folder index once for databases that predate it
+    if await db.report_folders.estimated_document_count() == 0 and await db.reports.estimated_document_count() > 0:
+        folder_count = await rebuild_report_folder_index()
+        logger.info(f"Report folder index rebuilt: {folder_count} folders", extra={"event": "startup"})
+
+async def load_person_match_index():
+    await sync_person_match_index()
+    logger.info(f"Person match index loaded: {len(person_match_index)} persons", extra={"event": "startup"})
+
+@app.on_event("startup")
+async def startup_db_client():
+    global log_listener
+    if log_listener is None:
+        log_listener = setup_logging_from_env()
+    logger.info(f"Connected to {MONGO_TARGET}", extra={"event": "startup"})
+    if static_frontend is not None:
+        logger.info(f"Frontend indiziert aus {FRONTEND_BUILD_DIR}: {static_frontend.stats()}", extra={"event": "startup"})
+    loop_monitor.start()
+    tracer.start()
+    await startup_step("indexes", ensure_indexes)
+    await startup_step("retention indexes", retention_engine.ensure_indexes)
+    await startup_step("track indexes", track_store.ensure_indexes)
+    await startup_step("report folder backfill", backfill_report_folder_index)
+    await startup_step("person match index", load_person_match_index)
+    retention_engine.start(RETENTION_INTERVAL_MINUTES * 60)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await loop_monitor.stop()
+    await retention_engine.stop()
     client.close()
+    tracer.stop()  # flush pending spans
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()  # flush queued log records
+        log_listener = None
 
 # Server starten
 if __name__ == "__main__":
@@ -0,0 +1,147 @@
+# 🌐 Statische Auslieferung des Expo-Web-Builds (frontend/dist)
+# Der Build wird einmal beim Start indiziert - pro Request gibt es keinen
+# Dateisystem-Check mehr. Vorkomprimierte .br/.gz Varianten werden bevorzugt.
+#
+# Varianten erzeugen (nach `npx expo export --platform web`):
+#     python backend/static_frontend.py frontend/dist
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+from starlette.responses import FileResponse, Response
+
+from compression import parse_accept_encoding
+
+try:
+    import brotli
+except ImportError:  # brotli ist optional - dann nur gzip
+    brotli = None
+
+# Expo/Metro hängt Content-Hashes an Bundles und Assets an
+HASHED_NAME = re.compile(r"[.-][0-9a-f]{8,32}\.[A-Za-z0-9]+$")
+COMPRESSIBLE_SUFFIXES = {".js", ".css", ".html", ".json", ".map", ".svg", ".txt", ".ttf", ".otf", ".ico", ".wasm"}
+VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+class StaticFrontend:
+    """In-memory index of the frontend build: url path -> file metadata"""
+
+    def __init__(self, build_dir: Path, extra_roots: Optional[Dict[str, Path]] = None):
+        self.build_dir = Path(build_dir)
+        self.files: Dict[str, Dict] = {}
+        self.index_path = "index.html"
+        self.index_roots(extra_roots or {})
+
+    def index_roots(self, extra_roots: Dict[str, Path]):
+        roots = [("", self.build_dir)]
+        roots += [(prefix.strip("/") + "/", Path(directory)) for prefix, directory in extra_roots.items()]
+        for prefix, root in roots:
+            if not root.is_dir():
+                continue
+            for path in sorted(root.rglob("*")):
+                if not path.is_file() or path.suffix in (".br", ".gz"):
+                    continue
+                url_path = prefix + path.relative_to(root).as_posix()
+                # Do not let an extra root shadow a file from the build itself
+                self.files.setdefault(url_path, self.describe(path))
+        # Expo "static" output: /settings -> settings.html
+        for url_path in [p for p in self.files if p.endswith(".html")]:
+            clean = url_path[:-5]
+            if clean.endswith("/index"):
+                clean = clean[:-6]
+            if clean and clean != "index":
+                self.files.setdefault(clean, self.files[url_path])
+
+    @staticmethod
+    def describe(path: Path) -> Dict:
+        stat_result = path.stat()
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+            media_type += "; charset=utf-8"
+        immutable = bool(HASHED_NAME.search(path.name))
+        if immutable:
+            # The name already changes with the content
+            etag = f'"{stat_result.st_size:x}-{int(stat_result.st_mtime):x}"'
+        else:
+            etag = '"' + hashlib.sha1(path.read_bytes()).hexdigest()[:20] + '"'
+        variants = {}
+        for encoding, suffix in VARIANTS:
+            variant = path.with_name(path.name + suffix)
+            if variant.is_file() and variant.stat().st_mtime >= stat_result.st_mtime:
+                variants[encoding] = (str(variant), variant.stat())
+        return {
+            "path": str(path),
+            "stat": stat_result,
+            "media_type": media_type,
+            "etag": etag,
+            "cache_control": IMMUTABLE if immutable else REVALIDATE,
+            "variants": variants
+        }
+
+    def lookup(self, url_path: str) -> Optional[Dict]:
+        url_path = url_path.strip("/")
+        entry = self.files.get(url_path or self.index_path)
+        if entry is not None:
+            return entry
+        last_segment = url_path.rsplit("/", 1)[-1]
+        if "." in last_segment or url_path.startswith(("_expo/", "assets/")):
+            return None  # Missing asset - never answer a .js request with HTML
+        return self.files.get(self.index_path)  # SPA route
+
+    def response(self, url_path: str, headers) -> Response:
+        entry = self.lookup(url_path)
+        if entry is None:
+            return Response(status_code=404)
+
+        accepted = parse_accept_encoding(headers.get("accept-encoding", ""))
+        encoding = next((encoding for encoding, _ in VARIANTS if encoding in entry["variants"]
+                         and accepted.get(encoding, accepted.get("*", 0.0)) > 0), None)
+        # Each encoding is a different representation and needs its own validator
+        etag = entry["etag"][:-1] + f'-{encoding}"' if encoding else entry["etag"]
+        response_headers = {"ETag": etag, "Cache-Control": entry["cache_control"], "Vary": "Accept-Encoding"}
+        if_none_match = headers.get("if-none-match", "")
+        # Weak comparison, as for the API (a proxy may have weakened the tag)
+        if etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=response_headers)
+
+        if encoding:
+            variant_path, variant_stat = entry["variants"][encoding]
+            response_headers["Content-Encoding"] = encoding
+            return FileResponse(variant_path, stat_result=variant_stat, media_type=entry["media_type"],
+                                headers=response_headers)
+        return FileResponse(entry["path"], stat_result=entry["stat"], media_type=entry["media_type"],
+                            headers=response_headers)
+
+    def stats(self) -> Dict[str, int]:
+        entries = {id(entry): entry for entry in self.files.values()}.values()
+        return {
+            "files": len(entries),
+            "immutable": sum(1 for entry in entries if entry["cache_control"] == IMMUTABLE),
+            "precompressed": sum(1 for entry in entries if entry["variants"])
+        }
+
+def precompress(build_dir: Path, min_size: int = 1024):
+    """Write .br (if available) and .gz next to every compressible file"""
+    written = 0
+    for path in Path(build_dir).rglob("*"):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE_SUFFIXES or path.stat().st_size < min_size:
+            continue
+        data = path.read_bytes()
+        path.with_name(path.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            path.with_name(path.name + ".br").write_bytes(brotli.compress(data, quality=11))
+        written += 1
+    return written
+
+if __name__ == "__main__":
+    target = Path(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "..", "frontend", "dist"))
+    count = precompress(target)
+    print(f"✅ {count} Dateien vorkomprimiert in {target}" + ("" if brotli else " (nur gzip - brotli fehlt)"))
@@ -0,0 +1,120 @@
+# 📝 Strukturiertes, nicht-blockierendes Logging
+# Handler im Request-Pfad legen Records nur in eine Queue (QueueHandler),
+# ein Hintergrund-Thread (QueueListener) formatiert sie als JSON-Zeilen und
+# schreibt sie. Ist die Queue voll, wird verworfen statt zu blockieren.
+# Hochfrequente Events (Heartbeats, GPS-Pings) werden gesampelt.
+#
+#     logger.info("Heartbeat", extra={"event": "heartbeat", "user_id": user_id})
+
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import orjson
+
+# Attributes every LogRecord has - everything else came in via extra={...}
+RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# Only every Nth INFO/DEBUG record of these events is written
+DEFAULT_SAMPLE_RATES = {
+    "heartbeat": 100,
+    "location_update": 50,
+    "online_status": 20,
+    "socket_connect": 10,
+    "socket_disconnect": 10,
+    "join_room": 10,
+}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """Keep 1 of N records per `event`; warnings and errors always pass"""
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = rates
+        self.counts: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        rate = self.rates.get(event) if event else None
+        if not rate or rate <= 1 or record.levelno >= logging.WARNING:
+            return True
+        with self.lock:
+            count = self.counts.get(event, 0)
+            self.counts[event] = count + 1
+        if count % rate:
+            return False
+        record.sample_rate = rate  # lets readers scale counts back up
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller - drops when the writer lags"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level: str = "INFO", fmt: str = "json", path: Optional[str] = None,
+                  sample_rates: Optional[Dict[str, int]] = None, max_queue: int = 10000):
+    """Route the root logger through a queue; returns the started QueueListener"""
+    if path:
+        target = logging.handlers.WatchedFileHandler(path, encoding="utf-8")
+    else:
+        target = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        target.setFormatter(JsonFormatter())
+    else:
+        target.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+
+    log_queue = queue.Queue(maxsize=max_queue)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(DEFAULT_SAMPLE_RATES if sample_rates is None else sample_rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, target, respect_handler_level=True)
+    listener.start()
+    listener.queue_handler = queue_handler
+    return listener
+
+
+def setup_logging_from_env():
+    return setup_logging(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        fmt=os.getenv("LOG_FORMAT", "json"),
+        path=os.getenv("LOG_FILE") or None,
+    )
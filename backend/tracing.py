@@ -0,0 +1,364 @@
+# 🧵 Leichtgewichtiges Tracing über HTTP, Socket.IO und MongoDB
+# Eine Trace-ID kommt aus dem Request (traceparent / X-Trace-Id) oder dem
+# Socket-Payload (traceparent / trace_id) und wird per ContextVar an alle
+# Mongo-Kommandos (auch in Motors Thread-Pool) und sio.emit weitergereicht.
+#
+# Export (Hintergrund-Thread, blockiert nie den Request):
+#   TRACE_FILE=traces.jsonl         - eine Span pro Zeile (OTLP-Feldnamen)
+#   TRACE_OTLP_URL=http://host:4318 - OTLP/HTTP JSON an einen Collector
+#   TRACE_SAMPLE_RATE=0.1           - Anteil neuer Traces (Default 1.0)
+#
+# Auswertung pro Hop:  python backend/tracing.py traces.jsonl [--slowest 10]
+
+import contextvars
+import functools
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import orjson
+import socketio
+from pymongo import monitoring
+
+TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+HEX_ID = re.compile(r"^[0-9a-f]{32}$")
+
+SPAN_KIND = {"internal": 1, "server": 2, "client": 3, "producer": 4, "consumer": 5}
+
+
+def new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, kind: str = "internal",
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.error = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": SPAN_KIND[self.kind],
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+
+
+current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    def __init__(self, path: Optional[str] = None, otlp_url: Optional[str] = None, sample_rate: float = 1.0,
+                 service_name: str = "stadtwache-backend", max_queue: int = 20000):
+        self.path = path
+        self.otlp_url = otlp_url.rstrip("/") + "/v1/traces" if otlp_url else None
+        self.sample_rate = sample_rate
+        self.service_name = service_name
+        self.enabled = bool(path or otlp_url)
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------- spans
+
+    def start_root(self, name: str, kind: str, traceparent: Optional[str] = None,
+                   trace_id: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """Continue an incoming trace or (sampled) start a new one"""
+        parent_id = None
+        match = TRACEPARENT.match(traceparent or "")
+        if match:
+            trace_id, parent_id = match.group(1), match.group(2)
+        elif trace_id and HEX_ID.match(trace_id.replace("-", "").lower()):
+            trace_id = trace_id.replace("-", "").lower()
+        else:
+            if random.random() >= self.sample_rate:
+                return None
+            trace_id = new_trace_id()
+        return Span(name, trace_id, parent_id, kind, attributes)
+
+    def start_child(self, name: str, kind: str = "internal", attributes: Optional[Dict[str, Any]] = None,
+                    parent: Optional[Span] = None) -> Optional[Span]:
+        parent = parent or current_span.get()
+        if parent is None:
+            return None
+        return Span(name, parent.trace_id, parent.span_id, kind, attributes)
+
+    def finish(self, span: Optional[Span], error: Optional[str] = None):
+        if span is None:
+            return
+        span.end_ns = time.time_ns()
+        if error:
+            span.error = error
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    # ------------------------------------------------------------- export
+
+    def start(self):
+        if self.enabled and self.thread is None:
+            self.thread = threading.Thread(target=self.export_loop, name="trace-exporter", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def export_loop(self):
+        handle = open(self.path, "ab") if self.path else None
+        try:
+            while True:
+                batch: List[Span] = []
+                item = self.queue.get()
+                stop = item is None
+                if item is not None:
+                    batch.append(item)
+                # Drain whatever else is waiting to write in one go
+                while len(batch) < 512:
+                    try:
+                        item = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                if batch:
+                    self.write(handle, batch)
+                if stop:
+                    return
+        finally:
+            if handle:
+                handle.close()
+
+    def write(self, handle, batch: List[Span]):
+        spans = [span.to_dict() for span in batch]
+        if handle:
+            handle.write(b"".join(orjson.dumps(span, default=str) + b"\n" for span in spans))
+            handle.flush()
+        if self.otlp_url:
+            self.post_otlp(spans)
+
+    def post_otlp(self, spans: List[Dict[str, Any]]):
+        import requests
+
+        def attributes(values):
+            return [{"key": key, "value": {"stringValue": str(value)}} for key, value in values.items()]
+
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": attributes({"service.name": self.service_name})},
+            "scopeSpans": [{"scope": {"name": "stadtwache.tracing"}, "spans": [
+                {**span, "attributes": attributes(span["attributes"]),
+                 "startTimeUnixNano": str(span["startTimeUnixNano"]), "endTimeUnixNano": str(span["endTimeUnixNano"])}
+                for span in spans
+            ]}]
+        }]}
+        try:
+            requests.post(self.otlp_url, data=orjson.dumps(payload, default=str),
+                          headers={"Content-Type": "application/json"}, timeout=5)
+        except requests.RequestException:
+            self.dropped += len(spans)
+
+
+tracer = Tracer(
+    path=os.getenv("TRACE_FILE") or None,
+    otlp_url=os.getenv("TRACE_OTLP_URL") or None,
+    sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "1.0")),
+)
+
+
+# ----------------------------------------------------------------- integrations
+
+
+class TracingMiddleware:
+    """Server span per HTTP request; answers with the traceparent it used"""
+
+    def __init__(self, app, skip_paths=("/metrics", "/api/health")):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if not tracer.enabled or scope["type"] != "http" or scope.get("path") in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        span = tracer.start_root(f"{scope['method']} {scope['path']}", "server",
+                                 traceparent=headers.get("traceparent"),
+                                 trace_id=headers.get("x-trace-id") or headers.get("x-request-id"),
+                                 attributes={"http.method": scope["method"], "http.target": scope["path"]})
+        if span is None:
+            await self.app(scope, receive, send)
+            return
+
+        token = current_span.set(span)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.attributes["http.status_code"] = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"traceparent", span.traceparent.encode()), (b"x-trace-id", span.trace_id.encode())]}
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            current_span.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                span.name = f"{scope['method']} {route}"
+                span.attributes["http.route"] = route
+            if span.attributes.get("http.status_code", 500) >= 500 and not error:
+                error = f"HTTP {span.attributes.get('http.status_code', 500)}"
+            tracer.finish(span, error)
+
+
+def trace_socket_event(handler):
+    """Consumer span per Socket.IO event; trace id from data['traceparent'/'trace_id']"""
+    event = handler.__name__
+
+    @functools.wraps(handler)
+    async def wrapper(sid, *args, **kwargs):
+        if not tracer.enabled:
+            return await handler(sid, *args, **kwargs)
+        data = args[0] if args else None
+        incoming = data if isinstance(data, dict) else {}
+        span = tracer.start_root(f"socket {event}", "consumer", traceparent=incoming.get("traceparent"),
+                                 trace_id=incoming.get("trace_id"), attributes={"socketio.sid": sid})
+        if span is None:
+            return await handler(sid, *args, **kwargs)
+        token = current_span.set(span)
+        error = None
+        try:
+            return await handler(sid, *args, **kwargs)
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            current_span.reset(token)
+            tracer.finish(span, error)
+
+    return wrapper
+
+
+class TracedAsyncServer(socketio.AsyncServer):
+    """AsyncServer whose emits become producer spans of the current trace"""
+
+    async def emit(self, event, data=None, to=None, room=None, skip_sid=None, namespace=None, callback=None,
+                   ignore_queue=False):
+        span = tracer.start_child(f"emit {event}", "producer", {"socketio.room": str(to or room or "*")}) \
+            if tracer.enabled else None
+        try:
+            return await super().emit(event, data=data, to=to, room=room, skip_sid=skip_sid, namespace=namespace,
+                                      callback=callback, ignore_queue=ignore_queue)
+        finally:
+            tracer.finish(span)
+
+
+class TracingCommandListener(monitoring.CommandListener):
+    """Client span per Mongo command. Motor copies the context into its executor
+    threads, so started() sees the span of the request that issued the command."""
+
+    def __init__(self):
+        self.spans: Dict[int, Span] = {}
+
+    def started(self, event):
+        if not tracer.enabled:
+            return
+        collection = event.command.get(event.command_name)
+        span = tracer.start_child(f"mongo {event.command_name}", "client", {
+            "db.system": "mongodb",
+            "db.name": event.database_name,
+            "db.operation": event.command_name,
+            "db.collection": collection if isinstance(collection, str) else event.command.get("collection", ""),
+        })
+        if span is not None:
+            self.spans[event.request_id] = span
+
+    def succeeded(self, event):
+        tracer.finish(self.spans.pop(event.request_id, None))
+
+    def failed(self, event):
+        tracer.finish(self.spans.pop(event.request_id, None), error=str(event.failure))
+
+
+# ----------------------------------------------------------------- Auswertung
+
+
+def summarize(path: str, slowest: int = 10):
+    """Print the slowest traces as a tree with per-hop durations"""
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    with open(path, "rb") as handle:
+        for line in handle:
+            span = orjson.loads(line)
+            traces.setdefault(span["traceId"], []).append(span)
+
+    def duration(span):
+        return (span["endTimeUnixNano"] - span["startTimeUnixNano"]) / 1e6
+
+    roots = []
+    for trace_id, spans in traces.items():
+        ids = {span["spanId"] for span in spans}
+        for span in spans:
+            if not span["parentSpanId"] or span["parentSpanId"] not in ids:
+                roots.append((duration(span), trace_id, span))
+    roots.sort(key=lambda item: item[0], reverse=True)
+
+    for total, trace_id, root in roots[:slowest]:
+        spans = traces[trace_id]
+        children: Dict[str, List[Dict[str, Any]]] = {}
+        for span in spans:
+            children.setdefault(span["parentSpanId"], []).append(span)
+        print(f"\n🧵 {trace_id}  {total:.1f} ms")
+
+        def show(span, depth):
+            offset = (span["startTimeUnixNano"] - root["startTimeUnixNano"]) / 1e6
+            marker = " ❌" if span["status"]["code"] == 2 else ""
+            print(f"   {'  ' * depth}{span['name']:<{48 - 2 * depth}} +{offset:7.1f} ms {duration(span):8.1f} ms{marker}")
+            for child in sorted(children.get(span["spanId"], []), key=lambda s: s["startTimeUnixNano"]):
+                show(child, depth + 1)
+
+        show(root, 0)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python tracing.py traces.jsonl [--slowest N]")
+        sys.exit(1)
+    count = int(sys.argv[sys.argv.index("--slowest") + 1]) if "--slowest" in sys.argv else 10
+    summarize(sys.argv[1], count)
@@ -0,0 +1,319 @@
+# 🛰️ Spaltenorientierter GPS-Track-Speicher
+# Rohe Pings (ein Dokument pro Ping in db.locations) werden nach Abschluss
+# einer Stunde pro Beamtem in ein Bucket-Dokument verdichtet:
+#
+#   {_id: "<user_id>:2024051314", user_id, start, end, count,
+#    encoding: "delta-i32-zlib/1", data: Binary}
+#
+# data = zlib(int32 Deltas von [ms seit start], [lat µ°], [lng µ°]).
+# 1 µ° ≈ 0,11 m - genauer als jedes Handy-GPS. Ein Schicht-Track ist damit
+# ein einziger Index-Read von ~12 kleinen Dokumenten statt tausender Pings.
+# Die noch nicht verdichtete letzte Stunde kommt weiter aus db.locations.
+#
+# Späte Pings (Handy war offline, Zeitstempel in einer schon verdichteten
+# Stunde) findet die Verdichtung über die ObjectId = Einfügezeit: alles, was
+# seit dem letzten Lauf eingefügt wurde und vor `until` liegt, wird in die
+# bestehenden Buckets gemischt. Bis dahin liefert fetch() sie aus db.locations.
+
+import asyncio
+import sys
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from bson import Binary, ObjectId
+from pymongo import ReplaceOne
+
+from geo import location_point
+
+ENCODING = "delta-i32-zlib/1"
+EPOCH = datetime(1970, 1, 1)
+MICRODEGREES = 1_000_000
+STATE_ID = "compaction"
+ID_CLOCK_SKEW = timedelta(minutes=5)  # ObjectIds come from the app servers' clocks
+
+
+def to_ms(value: datetime) -> int:
+    return (value - EPOCH) // timedelta(milliseconds=1)
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Naive UTC like everything Motor stores and returns here"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+class Track:
+    """One officer's pings as parallel arrays, sorted by time"""
+    __slots__ = ("user_id", "t", "lat", "lng")
+
+    def __init__(self, user_id: str, t: np.ndarray, lat: np.ndarray, lng: np.ndarray):
+        self.user_id = user_id
+        self.t = t  # int64 ms since epoch (UTC)
+        self.lat = lat  # float64 degrees
+        self.lng = lng
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    @classmethod
+    def empty(cls, user_id: str) -> "Track":
+        return cls(user_id, np.empty(0, np.int64), np.empty(0), np.empty(0))
+
+    @classmethod
+    def from_pings(cls, user_id: str, pings: Iterable[Dict[str, Any]]) -> "Track":
+        t, lat, lng = [], [], []
+        for ping in pings:
+            point = location_point(ping.get("location"))
+            if point is None or not isinstance(ping.get("timestamp"), datetime):
+                continue
+            t.append(to_ms(ping["timestamp"]))
+            lat.append(point[0])
+            lng.append(point[1])
+        track = cls(user_id, np.array(t, np.int64), np.array(lat, np.float64), np.array(lng, np.float64))
+        return track.normalized()
+
+    @classmethod
+    def concat(cls, user_id: str, tracks: List["Track"]) -> "Track":
+        if not tracks:
+            return cls.empty(user_id)
+        return cls(user_id, np.concatenate([track.t for track in tracks]),
+                   np.concatenate([track.lat for track in tracks]),
+                   np.concatenate([track.lng for track in tracks])).normalized()
+
+    def normalized(self) -> "Track":
+        """Sorted by time, one point per millisecond"""
+        t, index = np.unique(self.t, return_index=True)
+        return Track(self.user_id, t, self.lat[index], self.lng[index])
+
+    def between(self, start_ms: int, end_ms: int) -> "Track":
+        mask = (self.t >= start_ms) & (self.t < end_ms)
+        return Track(self.user_id, self.t[mask], self.lat[mask], self.lng[mask])
+
+    @property
+    def nbytes(self) -> int:
+        return self.t.nbytes + self.lat.nbytes + self.lng.nbytes
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"user_id": self.user_id, "count": len(self), "t": self.t.tolist(),
+                "lat": self.lat.round(6).tolist(), "lng": self.lng.round(6).tolist()}
+
+
+def encode_bucket(track: Track, start: datetime) -> Dict[str, Any]:
+    """Bucket document for the points of `track` inside [start, start + 1h)"""
+    offsets = track.t - to_ms(start)
+    lat = np.rint(track.lat * MICRODEGREES).astype(np.int64)
+    lng = np.rint(track.lng * MICRODEGREES).astype(np.int64)
+    # First value absolute, then deltas - small numbers that zlib packs well
+    columns = np.stack([np.diff(column, prepend=0) for column in (offsets, lat, lng)]).astype("<i4")
+    return {
+        "_id": f"{track.user_id}:{start:%Y%m%d%H}",
+        "user_id": track.user_id,
+        "start": start,
+        "end": start + timedelta(hours=1),
+        "count": len(track),
+        "encoding": ENCODING,
+        "data": Binary(zlib.compress(columns.tobytes(), 6)),
+        "updated_at": datetime.utcnow(),
+    }
+
+
+def decode_bucket(bucket: Dict[str, Any]) -> Track:
+    if bucket.get("encoding") != ENCODING:
+        raise ValueError(f"Unknown track encoding: {bucket.get('encoding')}")
+    columns = np.frombuffer(zlib.decompress(bucket["data"]), dtype="<i4").reshape(3, bucket["count"])
+    offsets, lat, lng = np.cumsum(columns, axis=1, dtype=np.int64)
+    return Track(bucket["user_id"], offsets + to_ms(bucket["start"]),
+                 lat / MICRODEGREES, lng / MICRODEGREES)
+
+
+def deep_sizeof(value: Any) -> int:
+    """Rough in-memory size of a decoded Mongo document"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(key) + deep_sizeof(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(deep_sizeof(item) for item in value)
+    return size
+
+
+class TrackStore:
+    def __init__(self, get_db: Callable[[], Any], pause: float = 0.05):
+        self.get_db = get_db  # resolved per call, so a swapped server.db (tests, --in-memory) is used
+        self.pause = pause
+
+    @property
+    def db(self):
+        return self.get_db()
+
+    async def ensure_indexes(self):
+        await self.db.track_buckets.create_index([("user_id", 1), ("start", 1)])
+        await self.db.track_buckets.create_index([("start", 1)])
+        await self.db.locations.create_index([("user_id", 1), ("timestamp", 1)])
+
+    async def state(self) -> Dict[str, Any]:
+        return await self.db.track_state.find_one({"_id": STATE_ID}) or {}
+
+    async def compacted_until(self) -> Optional[datetime]:
+        return (await self.state()).get("until")
+
+    @staticmethod
+    def late_query(state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Pings inserted since the last run with a timestamp in an already compacted hour"""
+        if not state.get("until") or not state.get("scanned_at"):
+            return None
+        return {"_id": {"$gte": ObjectId.from_datetime(state["scanned_at"] - ID_CLOCK_SKEW)},
+                "timestamp": {"$lt": state["until"]}}
+
+    async def merge(self, pings: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """Fold pings into their (user, hour) buckets; returns (points written, points new)"""
+        by_bucket: Dict[tuple, List[Dict[str, Any]]] = {}
+        for ping in pings:
+            if ping.get("user_id") and isinstance(ping.get("timestamp"), datetime):
+                by_bucket.setdefault((ping["user_id"], floor_hour(ping["timestamp"])), []).append(ping)
+        if not by_bucket:
+            return 0, 0
+
+        ids = [f"{user_id}:{hour:%Y%m%d%H}" for user_id, hour in by_bucket]
+        existing = {bucket["_id"]: decode_bucket(bucket)
+                    async for bucket in self.db.track_buckets.find({"_id": {"$in": ids}})}
+        operations = []
+        points = added = 0
+        for (user_id, hour), bucket_pings in by_bucket.items():
+            track = Track.from_pings(user_id, bucket_pings)
+            stored = existing.get(f"{user_id}:{hour:%Y%m%d%H}")
+            if stored is not None:
+                # normalized() keeps one point per ms, so re-merging is idempotent
+                track = Track.concat(user_id, [stored, track])
+                if len(track) == len(stored):
+                    continue  # nothing new for this bucket
+            if len(track):
+                bucket = encode_bucket(track, hour)
+                operations.append(ReplaceOne({"_id": bucket["_id"]}, bucket, upsert=True))
+                points += len(track)
+                added += len(track) - (len(stored) if stored is not None else 0)
+        if operations:
+            await self.db.track_buckets.bulk_write(operations, ordered=False)
+        return points, added
+
+    async def compact(self) -> Dict[str, int]:
+        """Fold raw pings of closed hours into buckets, one hour per step"""
+        started = datetime.utcnow()
+        until = floor_hour(started)
+        state = await self.state()
+        position = state.get("until")
+        hours = points = late = 0
+
+        # Late arrivals for hours that were compacted in an earlier run
+        late_query = self.late_query(state)
+        if late_query is not None:
+            late_pings = await self.db.locations.find(
+                late_query, {"_id": 0, "user_id": 1, "location": 1, "timestamp": 1}).to_list(None)
+            if late_pings:
+                _, late = await self.merge(late_pings)
+
+        while True:
+            query: Dict[str, Any] = {"timestamp": {"$lt": until}}
+            if position:
+                query["timestamp"]["$gte"] = position
+            first = await self.db.locations.find_one(query, {"timestamp": 1}, sort=[("timestamp", 1)])
+            if first is None:
+                break
+            hour = floor_hour(first["timestamp"])
+            pings = await self.db.locations.find(
+                {"timestamp": {"$gte": hour, "$lt": hour + timedelta(hours=1)}},
+                {"_id": 0, "user_id": 1, "location": 1, "timestamp": 1}
+            ).to_list(None)
+            points += (await self.merge(pings))[0]
+
+            hours += 1
+            position = hour + timedelta(hours=1)
+            await self.db.track_state.update_one({"_id": STATE_ID}, {"$set": {"until": position}}, upsert=True)
+            await asyncio.sleep(self.pause)
+
+        # Everything inserted before `started` is in a bucket now - the next
+        # run only looks for late pings inserted after it
+        update: Dict[str, Any] = {"scanned_at": started}
+        if position is None or position < until:
+            # Nothing left to fold - later reads only need raw pings from here
+            update["until"] = until
+        await self.db.track_state.update_one({"_id": STATE_ID}, {"$set": update}, upsert=True)
+        return {"hours": hours, "points": points, "late": late}
+
+    async def read_raw(self, state: Dict[str, Any], start: datetime, end: datetime,
+                       user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Raw pings not yet in a bucket: the tail after `until` plus late arrivals before it"""
+        compacted_until = state.get("until")
+        scope = {"user_id": user_id} if user_id else {}
+        projection = {"_id": 0, "user_id": 1, "location": 1, "timestamp": 1}
+        pings: List[Dict[str, Any]] = []
+        if compacted_until is None or compacted_until < end:
+            pings += await self.db.locations.find(
+                {**scope, "timestamp": {"$gte": max(start, compacted_until or start), "$lt": end}}, projection
+            ).to_list(None)
+        late_query = self.late_query(state)
+        if late_query is not None and start < compacted_until:
+            late_query["timestamp"] = {"$gte": start, "$lt": min(end, compacted_until)}
+            pings += await self.db.locations.find({**scope, **late_query}, projection).to_list(None)
+        return pings
+
+    async def fetch(self, user_id: str, start: datetime, end: datetime) -> Track:
+        """Track of one officer for [start, end): buckets plus raw pings not compacted yet"""
+        buckets = await self.db.track_buckets.find(
+            {"user_id": user_id, "start": {"$gte": floor_hour(start), "$lt": end}}
+        ).sort("start", 1).to_list(None)
+        parts = [decode_bucket(bucket) for bucket in buckets]
+        parts.append(Track.from_pings(user_id, await self.read_raw(await self.state(), start, end, user_id)))
+        return Track.concat(user_id, parts).between(to_ms(start), to_ms(end))
+
+    async def fetch_all(self, start: datetime, end: datetime) -> Dict[str, Track]:
+        """Tracks of every officer with pings in [start, end)"""
+        parts: Dict[str, List[Track]] = {}
+        async for bucket in self.db.track_buckets.find({"start": {"$gte": floor_hour(start), "$lt": end}}):
+            parts.setdefault(bucket["user_id"], []).append(decode_bucket(bucket))
+
+        pings: Dict[str, List[Dict[str, Any]]] = {}
+        for ping in await self.read_raw(await self.state(), start, end):
+            if ping.get("user_id"):
+                pings.setdefault(ping["user_id"], []).append(ping)
+        for user_id, user_pings in pings.items():
+            parts.setdefault(user_id, []).append(Track.from_pings(user_id, user_pings))
+
+        start_ms, end_ms = to_ms(start), to_ms(end)
+        tracks = {user_id: Track.concat(user_id, user_parts).between(start_ms, end_ms)
+                  for user_id, user_parts in parts.items()}
+        return {user_id: track for user_id, track in tracks.items() if len(track)}
+
+    async def storage_report(self) -> Dict[str, Any]:
+        """Disk and memory per point: raw ping documents vs. buckets"""
+        report: Dict[str, Any] = {"compacted_until": await self.compacted_until()}
+        for name in ("locations", "track_buckets"):
+            try:
+                stats = await self.db.command("collStats", name)
+                report[name] = {key: stats.get(key) for key in
+                                ("count", "size", "storageSize", "avgObjSize", "totalIndexSize")}
+            except Exception as e:
+                report[name] = {"error": str(e)}
+
+        totals = await self.db.track_buckets.aggregate(
+            [{"$group": {"_id": None, "points": {"$sum": "$count"}}}]).to_list(1)
+        bucket_points = totals[0]["points"] if totals else 0
+        report["track_buckets"]["points"] = bucket_points
+        for name, points in (("locations", report["locations"].get("count")), ("track_buckets", bucket_points)):
+            size = report[name].get("size")
+            if points and size:
+                report[name]["bytes_per_point"] = round(size / points, 2)
+
+        sample = await self.db.locations.find_one({}) or {
+            "user_id": "x" * 36, "location": {"lat": 51.0, "lng": 7.0}, "timestamp": datetime.utcnow()}
+        report["memory_bytes_per_point"] = {
+            "documents": deep_sizeof(sample),  # list of dicts as loaded by Motor
+            "track_arrays": 24,  # int64 time + float64 lat + float64 lng
+        }
+        return report
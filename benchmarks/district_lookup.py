@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Bezirks-Lookup Benchmark
+Erzeugt ein Raster aus N unregelmäßigen Bezirkspolygonen (gezackte Grenzen
+mit vielen Stützpunkten) und vergleicht den Raster-Index mit dem naiven
+Strahlverfahren über alle Polygone - Ergebnis und Zeit pro Lookup.
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from district_index import DistrictIndex, boundary_rings  # noqa: E402
+
+ORIGIN = (51.24, 7.22)  # lat, lng of the south-west corner
+
+
+def jagged_edge(start, end, vertices: int, amplitude: float, seed: int):
+    """Border from start (included) to end (excluded), wobbling sideways"""
+    rng = random.Random(seed)
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    length = math.hypot(dx, dy)
+    normal = (-dy / length, dx / length)
+    points = [start]
+    for step in range(1, vertices):
+        f = step / vertices
+        wobble = amplitude * math.sin(f * math.pi) * rng.uniform(-1, 1)
+        points.append((start[0] + dx * f + normal[0] * wobble, start[1] + dy * f + normal[1] * wobble))
+    return points
+
+
+def make_districts(side: int, size: float, vertices: int):
+    """side x side districts; borders are shared so the plane is tiled without gaps"""
+    corner = {(row, column): (ORIGIN[1] + column * size, ORIGIN[0] + row * size)
+              for row in range(side + 1) for column in range(side + 1)}
+    borders = {}
+
+    def border(a, b):
+        key = (min(a, b), max(a, b))
+        if key not in borders:
+            borders[key] = jagged_edge(corner[key[0]], corner[key[1]], vertices, size * 0.1, len(borders))
+        points = borders[key]
+        # Walking the shared border backwards: start at our corner, skip the other one
+        return points if a == key[0] else [corner[a]] + points[1:][::-1]
+
+    districts = []
+    for row in range(side):
+        for column in range(side):
+            a, b, c, d = (row, column), (row, column + 1), (row + 1, column + 1), (row + 1, column)
+            ring = border(a, b) + border(b, c) + border(c, d) + border(d, a)
+            ring.append(ring[0])
+            districts.append({"id": f"d{row}_{column}", "name": f"Bezirk {row}/{column}",
+                              "boundary": {"type": "Polygon", "coordinates": [[list(point) for point in ring]]}})
+    return districts
+
+
+def naive_lookup(rings_by_district, lat: float, lng: float):
+    for index, rings in enumerate(rings_by_district):
+        inside = False
+        for ring in rings:
+            for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+                if (y1 > lat) != (y2 > lat) and lng < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+                    inside = not inside
+        if inside:
+            return index
+    return -1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Punkt-in-Polygon: Raster-Index vs. naiv")
+    parser.add_argument("--side", type=int, default=4, help="Bezirke pro Richtung (side x side)")
+    parser.add_argument("--vertices", type=int, default=100, help="Stützpunkte pro Grenzabschnitt")
+    parser.add_argument("--points", type=int, default=200_000)
+    args = parser.parse_args()
+
+    size = 0.03
+    districts = make_districts(args.side, size, args.vertices)
+    index = DistrictIndex(districts)
+    stats = index.stats()
+    print(f"🗺️ {stats['districts']} Bezirke, {stats['edges']} Kanten, Raster {stats['grid'][0]}x{stats['grid'][1]}, "
+          f"{stats['boundary_cells']} Randzellen, Aufbau {stats['build_ms']} ms\n")
+
+    rng = np.random.default_rng(7)
+    extent = args.side * size
+    lat = ORIGIN[0] - 0.01 + rng.random(args.points) * (extent + 0.02)
+    lng = ORIGIN[1] - 0.01 + rng.random(args.points) * (extent + 0.02)
+
+    sample = min(args.points, 5000)
+    rings_by_district = [boundary_rings(district["boundary"]) for district in districts]
+    started = time.perf_counter()
+    expected = [naive_lookup(rings_by_district, float(lat[i]), float(lng[i])) for i in range(sample)]
+    naive_us = (time.perf_counter() - started) / sample * 1e6
+
+    started = time.perf_counter()
+    single = [index.lookup_index(float(lat[i]), float(lng[i])) for i in range(sample)]
+    single_us = (time.perf_counter() - started) / sample * 1e6
+
+    started = time.perf_counter()
+    vectorized = index.assign(lat, lng)
+    vector_us = (time.perf_counter() - started) / args.points * 1e6
+
+    mismatches = sum(a != b for a, b in zip(expected, single)) + int((vectorized[:sample] != single).sum())
+    print(f"   naiv (alle Polygone):     {naive_us:9.2f} µs/Lookup")
+    print(f"   Raster-Index, einzeln:    {single_us:9.2f} µs/Lookup  ({naive_us / single_us:.0f}x)")
+    print(f"   Raster-Index, vektoriell: {vector_us:9.2f} µs/Punkt   ({args.points} Punkte)")
+    print(f"   Abweichungen zu naiv:     {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
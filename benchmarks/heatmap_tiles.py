@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Heatmap-Kachel Benchmark
+Lädt N synthetische Vorfälle (Standard: 1 Mio., über 5 Jahre, in Clustern um
+Schwelm) in den HeatmapIndex und misst: Aufbau, Rendern ungecachter Kacheln
+pro Zoomstufe, Cache-Treffer und die gezielte Invalidierung bei einem neuen
+Vorfall.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from heatmap import HeatmapIndex, mercator  # noqa: E402
+from track_store import to_ms  # noqa: E402
+
+CENTER = (51.2879, 7.2954)
+
+
+def make_incidents(count: int, years: float, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    end = to_ms(datetime.utcnow())
+    t = rng.integers(end - int(years * 365 * 86400 * 1000), end, count)
+    # Hot spots plus background noise over the whole city
+    hotspots = rng.normal(CENTER, (0.02, 0.03), (40, 2))
+    which = rng.integers(0, len(hotspots), count)
+    points = hotspots[which] + rng.normal(0, 0.002, (count, 2))
+    noise = rng.random(count) < 0.3
+    points[noise] = rng.normal(CENTER, (0.05, 0.08), (int(noise.sum()), 2))
+    kind = (rng.random(count) < 0.05).astype(np.int8)  # ~5% emergencies
+    return t, points[:, 0], points[:, 1], kind
+
+
+def tiles_around(z: int, count: int):
+    wx, wy = mercator(np.array([CENTER[0]]), np.array([CENTER[1]]))
+    cx, cy = int(wx[0] * (1 << z)), int(wy[0] * (1 << z))
+    side = max(1, int(count ** 0.5))
+    return [(cx + dx - side // 2, cy + dy - side // 2) for dx in range(side) for dy in range(side)]
+
+
+async def run(args):
+    t, lat, lng, kind = make_incidents(args.count, args.years)
+    index = HeatmapIndex()
+    started = time.perf_counter()
+    index.add(t, lat, lng, kind)
+    print(f"🔥 {len(index):,} Vorfälle geladen in {(time.perf_counter() - started) * 1000:.0f} ms "
+          f"({sum(array.nbytes for array in index.points) / 1024 / 1024:.1f} MB)\n")
+
+    end = to_ms(datetime.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1))
+    ranges = {"30 Tage": end - 30 * 86400 * 1000, "1 Jahr": end - 365 * 86400 * 1000, "alles": 0}
+
+    print(f"{'Zoom':<6}{'Zeitraum':<10}{'Kacheln':>8}{'p50 kalt':>11}{'p95 kalt':>11}{'Cache-Treffer':>15}")
+    for z in (11, 13, 15, 17):
+        for label, start in ranges.items():
+            tiles = tiles_around(z, args.tiles)
+            cold = []
+            for x, y in tiles:
+                begin = time.perf_counter()
+                await index.tile(-1, z, x, y, start, end)
+                cold.append((time.perf_counter() - begin) * 1000)
+            begin = time.perf_counter()
+            for x, y in tiles:
+                await index.tile(-1, z, x, y, start, end)
+            hit = (time.perf_counter() - begin) * 1e6 / len(tiles)
+            print(f"{z:<6}{label:<10}{len(tiles):>8}{statistics.median(cold):>9.2f}ms"
+                  f"{np.percentile(cold, 95):>9.2f}ms{hit:>12.1f} µs")
+
+    cached = len(index.tiles)
+    begin = time.perf_counter()
+    index.add(np.array([end - 1000]), np.array([CENTER[0]]), np.array([CENTER[1]]), np.array([0], np.int8))
+    elapsed = (time.perf_counter() - begin) * 1000
+    print(f"\n➕ Neuer Vorfall: {cached - len(index.tiles)} von {cached} Kacheln verworfen, {elapsed:.1f} ms "
+          f"(inkl. Einsortieren in {len(index):,} Punkte)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Heatmap-Kacheln auf historischen Vorfällen")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--tiles", type=int, default=16, help="Kacheln pro Zoomstufe und Zeitraum")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+JSON Encoding Microbenchmark für Lese-Endpunkte
+Vergleicht den alten Pfad (Pydantic-Objekt pro Dokument + response_model
+Validierung + jsonable_encoder) und den alten serialize_mongo_data Pfad mit
+MongoJSONResponse (orjson) für 100, 1k und 10k Dokumente.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import List
+
+from bson import ObjectId
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from server import Incident, MongoJSONResponse  # noqa: E402
+
+
+def serialize_mongo_data(data):
+    """Der frühere rekursive Helper aus server.py (Referenz)"""
+    if isinstance(data, list):
+        return [serialize_mongo_data(item) for item in data]
+    elif isinstance(data, dict):
+        result = {}
+        for key, value in data.items():
+            if isinstance(value, ObjectId):
+                result[key] = str(value)
+            elif isinstance(value, (dict, list)):
+                result[key] = serialize_mongo_data(value)
+            else:
+                result[key] = value
+        return result
+    elif isinstance(data, ObjectId):
+        return str(data)
+    else:
+        return data
+
+
+def make_incident(i: int) -> dict:
+    return {
+        "_id": ObjectId(),
+        "id": str(uuid.uuid4()),
+        "title": f"Vorfall {i}",
+        "description": "Ruhestörung in der Hauptstraße, Anwohner melden laute Musik.",
+        "priority": "medium",
+        "status": "open",
+        "location": {"lat": 51.2879, "lng": 7.2954},
+        "address": "Hauptstraße 1, 58332 Schwelm",
+        "reported_by": "Beamter 1",
+        "assigned_to": None,
+        "assigned_to_name": None,
+        "assigned_at": None,
+        "images": [],
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+    }
+
+
+incident_list_adapter = TypeAdapter(List[Incident])
+
+
+def pydantic_path(docs):
+    """[Incident(**i) for i in incidents] + FastAPI response_model Serialisierung"""
+    objects = [Incident(**doc) for doc in docs]
+    validated = incident_list_adapter.validate_python(objects, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def serialize_mongo_data_path(docs):
+    """serialize_mongo_data + jsonable_encoder + JSONResponse"""
+    return json.dumps(jsonable_encoder(serialize_mongo_data(docs)), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(docs):
+    return MongoJSONResponse(docs).body
+
+
+def measure(func, docs, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(docs)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON Encoding Microbenchmark")
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'Dokumente':>10}{'Pydantic':>14}{'serialize_mongo':>18}{'orjson':>12}{'Speedup':>10}")
+    for size in [int(value) for value in args.sizes.split(",")]:
+        docs = [make_incident(i) for i in range(size)]
+        pydantic_ms = measure(pydantic_path, docs, args.repeat)
+        legacy_ms = measure(serialize_mongo_data_path, docs, args.repeat)
+        fast_ms = measure(fast_path, docs, args.repeat)
+        print(f"{size:>10}{pydantic_ms:>11.2f} ms{legacy_ms:>15.2f} ms{fast_ms:>9.2f} ms{pydantic_ms / fast_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
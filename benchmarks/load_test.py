@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Lokaler Lasttest für das Stadtwache Backend
+Startet server.py (uvicorn) als eigenen Prozess - gegen eine lokale MongoDB
+oder mit --in-memory gegen mongomock-motor - und lässt N simulierte Beamte
+einen gemischten Workload fahren: Logins, Heartbeats, GPS-Pings, Chat,
+Vorfall-CRUD und Dashboard-Polls.
+
+Ausgabe: Durchsatz und p50/p95/p99 pro Endpunkt. Mit --save-baseline wird das
+Ergebnis als Baseline gespeichert, jeder weitere Lauf vergleicht dagegen und
+endet mit Exit-Code 1 bei einer Regression.
+
+    pip install httpx                 # Lastgenerator
+    pip install mongomock-motor       # nur für --in-memory
+    python benchmarks/load_test.py --in-memory --users 50 --duration 30 --save-baseline
+    python benchmarks/load_test.py --in-memory --users 50 --duration 30
+
+Die eingecheckte Baseline (baselines/load_test.json) stammt aus genau diesem
+Aufruf auf einer einzelnen CPU-Kern-VM - auf anderer Hardware zuerst mit
+--save-baseline neu anlegen.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "load_test.json")
+
+# Schwelm Innenstadt
+CENTER = (51.2879, 7.2954)
+
+# Gewichte pro Iteration eines Beamten
+WORKLOAD = {
+    "heartbeat": 30,
+    "gps": 30,
+    "dashboard": 20,
+    "chat": 10,
+    "incident": 8,
+    "login": 2,
+}
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# ------------------------------------------------------------------ Server
+
+
+def serve(args):
+    """Kindprozess: server.py mit optionaler In-Memory-Datenbank starten"""
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    import uvicorn
+
+    import server
+
+    if args.in_memory:
+        from mongomock_motor import AsyncMongoMockClient
+
+        server.client = AsyncMongoMockClient()
+        server.db = server.client[args.db_name]
+        print("🧪 In-Memory-Datenbank (mongomock-motor)")
+    # uvicorn schließt Keep-Alive-Verbindungen nach 5s - unter Last (bcrypt) greift httpx
+    # sonst auf bereits geschlossene Verbindungen zu (ReadError)
+    uvicorn.run(server.socket_app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False,
+                timeout_keep_alive=60)
+
+
+def start_server(args, quiet: bool = False) -> subprocess.Popen:
+    env = dict(os.environ, MONGO_URL=args.mongo_url, DB_NAME=args.db_name)
+    command = [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port), "--db-name", args.db_name]
+    if args.in_memory:
+        command.append("--in-memory")
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL if quiet else None)
+
+
+async def wait_for_server(http, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = await http.get("/api/health")
+            if response.status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server ist nicht gestartet")
+
+
+# ------------------------------------------------------------------ Workload
+
+
+class Recorder:
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, http, label: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await http.request(method, url, **kwargs)
+            ok = response.status_code < 400 or response.status_code == 304
+        except Exception:
+            response, ok = None, False
+        self.timings[label].append((time.perf_counter() - start) * 1000)
+        if not ok:
+            self.errors[label] += 1
+        return response
+
+
+class Officer:
+    """Ein simulierter Beamter mit eigener Session"""
+
+    def __init__(self, index: int, run_id: str, recorder: Recorder, can_complete: bool = True):
+        self.email = f"lasttest{index}-{run_id}@stadtwache.de"
+        self.password = "Lasttest123!"
+        self.username = f"Lasttest {index}"
+        self.recorder = recorder
+        self.can_complete = can_complete
+        self.headers = {}
+        self.incident_ids = []
+        self.etags = {}
+        self.position = (CENTER[0] + random.uniform(-0.01, 0.01), CENTER[1] + random.uniform(-0.01, 0.01))
+
+    async def register(self, http, role: str):
+        await http.post("/api/auth/register", json={
+            "email": self.email, "username": self.username, "password": self.password, "role": role
+        })
+        # 50 gleichzeitige bcrypt-Logins können einzeln ins Timeout laufen - ohne Token
+        # würde der Beamte den ganzen Lauf nur 403 sammeln
+        for _ in range(3):
+            await self.login(http)
+            if self.headers:
+                return
+        raise RuntimeError(f"Login für {self.email} fehlgeschlagen")
+
+    async def login(self, http):
+        response = await self.recorder.call(http, "POST /api/auth/login", "POST", "/api/auth/login",
+                                            json={"email": self.email, "password": self.password})
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def heartbeat(self, http):
+        await self.recorder.call(http, "POST /api/users/heartbeat", "POST", "/api/users/heartbeat", headers=self.headers)
+
+    async def gps(self, http):
+        lat, lng = self.position
+        self.position = (lat + random.uniform(-0.0005, 0.0005), lng + random.uniform(-0.0005, 0.0005))
+        await self.recorder.call(http, "POST /api/locations/update", "POST", "/api/locations/update", headers=self.headers,
+                                 json={"user_id": "", "location": {"lat": self.position[0], "lng": self.position[1]}})
+
+    async def poll(self, http, url: str):
+        # Dashboards pollen mit If-None-Match wie ein Browser
+        headers = dict(self.headers)
+        if url in self.etags:
+            headers["If-None-Match"] = self.etags[url]
+        response = await self.recorder.call(http, f"GET {url}", "GET", url, headers=headers)
+        if response is not None and response.headers.get("etag"):
+            self.etags[url] = response.headers["etag"]
+
+    async def dashboard(self, http):
+        for url in ("/api/incidents", "/api/users/by-status", "/api/locations/live", "/api/app/config"):
+            await self.poll(http, url)
+
+    async def chat(self, http):
+        await self.recorder.call(http, "POST /api/messages", "POST", "/api/messages", headers=self.headers,
+                                 json={"content": f"Lage ruhig, Streife {self.username}", "channel": "general"})
+        await self.recorder.call(http, "GET /api/messages", "GET", "/api/messages?channel=general", headers=self.headers)
+
+    async def incident(self, http):
+        if len(self.incident_ids) < 3 or random.random() < 0.4:
+            response = await self.recorder.call(http, "POST /api/incidents", "POST", "/api/incidents", headers=self.headers, json={
+                "title": random.choice(["Ruhestörung", "Verkehrsunfall", "Diebstahl", "Sachbeschädigung"]),
+                "description": "Meldung aus dem Lasttest, Streife prüft vor Ort.",
+                "priority": random.choice(["low", "medium", "high"]),
+                "location": {"lat": self.position[0], "lng": self.position[1]},
+                "address": "Hauptstraße 1, 58332 Schwelm"
+            })
+            if response is not None and response.status_code == 200:
+                self.incident_ids.append(response.json()["id"])
+            return
+        incident_id = random.choice(self.incident_ids)
+        await self.recorder.call(http, "GET /api/incidents/{id}", "GET", f"/api/incidents/{incident_id}", headers=self.headers)
+        await self.recorder.call(http, "PUT /api/incidents/{id}", "PUT", f"/api/incidents/{incident_id}", headers=self.headers,
+                                 json={"status": random.choice(["open", "in_progress"])})
+        if self.can_complete and random.random() < 0.3:
+            self.incident_ids.remove(incident_id)
+            await self.recorder.call(http, "PUT /api/incidents/{id}/complete", "PUT",
+                                     f"/api/incidents/{incident_id}/complete", headers=self.headers)
+
+    async def run(self, http, stop_at: float, think_ms: float):
+        actions = list(WORKLOAD)
+        weights = [WORKLOAD[action] for action in actions]
+        while time.monotonic() < stop_at:
+            await getattr(self, random.choices(actions, weights)[0])(http)
+            await asyncio.sleep(random.uniform(0.5, 1.5) * think_ms / 1000)
+
+
+async def run_load(args) -> dict:
+    import httpx
+
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=30, limits=limits) as http:
+        await wait_for_server(http)
+
+        # mongomock kennt kein $merge - Abschließen nur gegen echte MongoDB
+        officers = [Officer(i, run_id, recorder, can_complete=not args.in_memory) for i in range(args.users)]
+        # Normale Streifenbeamte - keiner der simulierten Endpunkte braucht Admin-Rechte
+        await asyncio.gather(*(officer.register(http, "police") for officer in officers))
+        recorder.timings.clear()
+        recorder.errors.clear()
+        print(f"👮 {args.users} Beamte angemeldet, Lasttest läuft {args.duration}s ...")
+
+        started = time.monotonic()
+        await asyncio.gather(*(officer.run(http, started + args.duration, args.think_ms) for officer in officers))
+        elapsed = time.monotonic() - started
+
+    endpoints = {}
+    for label, timings in sorted(recorder.timings.items()):
+        endpoints[label] = {
+            "count": len(timings),
+            "errors": recorder.errors.get(label, 0),
+            "rps": round(len(timings) / elapsed, 1),
+            "p50": round(percentile(timings, 50), 2),
+            "p95": round(percentile(timings, 95), 2),
+            "p99": round(percentile(timings, 99), 2),
+        }
+    total = sum(endpoint["count"] for endpoint in endpoints.values())
+    return {
+        "users": args.users,
+        "duration": args.duration,
+        "think_ms": args.think_ms,
+        "in_memory": args.in_memory,
+        "throughput": round(total / elapsed, 1),
+        "errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+        "endpoints": endpoints,
+    }
+
+
+# ------------------------------------------------------------------ Report
+
+
+def print_report(result: dict):
+    print(f"\n{'Endpunkt':<36}{'Anzahl':>8}{'Fehler':>8}{'req/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for label, stats in result["endpoints"].items():
+        print(f"{label:<36}{stats['count']:>8}{stats['errors']:>8}{stats['rps']:>9.1f}"
+              f"{stats['p50']:>7.1f} ms{stats['p95']:>7.1f} ms{stats['p99']:>7.1f} ms")
+    print(f"\n📈 Gesamt: {result['throughput']:.1f} req/s, {result['errors']} Fehler")
+
+
+def compare(result: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """Regressions against the stored baseline (empty list = ok)"""
+    regressions = []
+    if result["throughput"] < baseline["throughput"] * (1 - tolerance):
+        regressions.append(f"Durchsatz {result['throughput']} req/s < Baseline {baseline['throughput']} req/s")
+    for label, base in baseline["endpoints"].items():
+        current = result["endpoints"].get(label)
+        if current is None:
+            continue
+        for key in ("p95", "p99"):
+            limit = base[key] * (1 + tolerance)
+            # Tiny absolute changes on fast endpoints are noise, not regressions
+            if current[key] > limit and current[key] - base[key] > min_delta_ms:
+                regressions.append(f"{label} {key} {current[key]:.1f} ms > Baseline {base[key]:.1f} ms")
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{label} {current['errors']} Fehler (Baseline {base['errors']})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest für das Stadtwache Backend")
+    parser.add_argument("--users", type=int, default=50, help="Simulierte Beamte")
+    parser.add_argument("--duration", type=float, default=30, help="Messdauer in Sekunden")
+    parser.add_argument("--think-ms", type=float, default=100, help="Mittlere Pause zwischen Aktionen")
+    parser.add_argument("--in-memory", action="store_true", help="mongomock-motor statt MongoDB")
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="stadtwache_loadtest")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Ergebnis als neue Baseline speichern")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Erlaubte Verschlechterung (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0)
+    parser.add_argument("--json", help="Ergebnis zusätzlich als JSON schreiben")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.port = args.port or free_port()
+
+    if args.serve:
+        serve(args)
+        return
+
+    random.seed(42)
+    process = start_server(args)
+    try:
+        result = asyncio.run(run_load(args))
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(result, handle, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as handle:
+            json.dump(result, handle, indent=2)
+        print(f"💾 Baseline gespeichert: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("ℹ️  Keine Baseline vorhanden - mit --save-baseline anlegen")
+        return
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    regressions = compare(result, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print("\n❌ Regression gegenüber Baseline:")
+        for line in regressions:
+            print(f"   - {line}")
+        sys.exit(1)
+    print("\n✅ Keine Regression gegenüber Baseline")
+
+
+if __name__ == "__main__":
+    main()
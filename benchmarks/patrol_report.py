@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Streifen-Auswertung Benchmark
+Misst shift_report() (Strecke, Verweildauer pro Bezirk, Abdeckung) für eine
+synthetische Schicht aller Beamten - Ziel: deutlich unter einer Sekunde.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from patrol_analytics import DistrictCenters, shift_report  # noqa: E402
+from track_storage import make_shift  # noqa: E402
+from track_store import Track, floor_hour  # noqa: E402
+
+# Rough centers around Schwelm for the nearest-center district lookup
+DISTRICTS = [
+    {"id": "innenstadt", "name": "Innenstadt", "coordinates": {"lat": 51.2879, "lng": 7.2954}},
+    {"id": "nord", "name": "Nord", "coordinates": {"lat": 51.3020, "lng": 7.2950}},
+    {"id": "sued", "name": "Süd", "coordinates": {"lat": 51.2740, "lng": 7.2960}},
+    {"id": "ost", "name": "Ost", "coordinates": {"lat": 51.2880, "lng": 7.3180}},
+    {"id": "west", "name": "West", "coordinates": {"lat": 51.2880, "lng": 7.2730}},
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Laufzeit der vektorisierten Streifen-Auswertung")
+    parser.add_argument("--officers", type=int, default=40)
+    parser.add_argument("--hours", type=float, default=10, help="Schichtlänge")
+    parser.add_argument("--interval", type=float, default=5, help="Sekunden zwischen Pings")
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    start = floor_hour(datetime.utcnow()) - timedelta(hours=args.hours)
+    pings = make_shift(args.officers, args.hours, args.interval, start)
+    by_user = {}
+    for ping in pings:
+        by_user.setdefault(ping["user_id"], []).append(ping)
+    tracks = {user_id: Track.from_pings(user_id, user_pings) for user_id, user_pings in by_user.items()}
+    districts = DistrictCenters(DISTRICTS)
+    print(f"📐 {len(tracks)} Beamte, {len(pings)} Punkte, {len(DISTRICTS)} Bezirke\n")
+
+    timings = []
+    for _ in range(args.rounds):
+        started = time.perf_counter()
+        report = shift_report(tracks, districts)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    print(f"   median {statistics.median(timings):8.1f} ms")
+    print(f"   max    {max(timings):8.1f} ms")
+    print(f"\n   Strecke gesamt: {report['totals']['distance_km']:.1f} km, "
+          f"Abdeckung: {report['coverage']['cells_visited']} Zellen ({report['coverage']['covered_km2']} km²)")
+    for row in report["districts"]:
+        print(f"   {row['name']:<12}{row['dwell_minutes']:>10.0f} min{row['officers']:>5} Beamte")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Projection Benchmark für Stadtwache Listen-Endpunkte
+Vergleicht die übertragenen Bytes (BSON) von vollständigen Dokumenten mit den
+Projektionen aus server.py - entweder mit synthetischen Daten oder gegen eine
+echte MongoDB (--mongo-url).
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import sys
+import uuid
+from datetime import datetime
+
+import bson
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from server import (  # noqa: E402
+    INCIDENT_LIST_FIELDS,
+    PERSON_LIST_FIELDS,
+    USER_LIST_FIELDS,
+    USER_STATUS_FIELDS,
+    build_projection,
+)
+
+
+def fake_base64_image(size_kb: int) -> str:
+    return "data:image/jpeg;base64," + base64.b64encode(os.urandom(size_kb * 1024)).decode()
+
+
+def make_user(i: int) -> dict:
+    return {
+        "_id": bson.ObjectId(),
+        "id": str(uuid.uuid4()),
+        "email": f"officer{i}@stadtwache.de",
+        "username": f"Beamter {i}",
+        "role": "police",
+        "hashed_password": "$2b$12$" + "x" * 53,
+        "phone": "+49 2336 0000",
+        "service_number": f"SW-{i:04d}",
+        "rank": "Kommissar",
+        "department": "Streifendienst",
+        "status": "Im Dienst",
+        "photo": fake_base64_image(60),
+        "is_active": True,
+        "assigned_district": "innenstadt",
+        "patrol_team": "alpha",
+        "last_activity": datetime.utcnow(),
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+    }
+
+
+def make_incident(i: int) -> dict:
+    return {
+        "_id": bson.ObjectId(),
+        "id": str(uuid.uuid4()),
+        "title": f"Vorfall {i}",
+        "description": "Ruhestörung in der Hauptstraße, Anwohner melden laute Musik. " * 3,
+        "priority": "medium",
+        "status": "open",
+        "location": {"lat": 51.2879, "lng": 7.2954},
+        "coordinates": {"lat": 51.2879, "lng": 7.2954},
+        "address": "Hauptstraße 1, 58332 Schwelm",
+        "reported_by": "Beamter 1",
+        "images": [fake_base64_image(120)] if i % 3 == 0 else [],
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+    }
+
+
+def make_person(i: int) -> dict:
+    return {
+        "_id": bson.ObjectId(),
+        "id": str(uuid.uuid4()),
+        "first_name": "Max",
+        "last_name": f"Mustermann {i}",
+        "birth_date": "1990-01-01",
+        "status": "vermisst",
+        "description": "Zuletzt gesehen am Bahnhof, trägt eine blaue Jacke.",
+        "case_number": f"AZ-{i:05d}",
+        "priority": "medium",
+        "photo": fake_base64_image(80),
+        "created_by": str(uuid.uuid4()),
+        "created_by_name": "Beamter 1",
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+        "is_active": True,
+    }
+
+
+def project(doc: dict, projection: dict) -> dict:
+    """Mimic what MongoDB sends back for an inclusion projection"""
+    return {key: value for key, value in doc.items() if projection.get(key)}
+
+
+def bson_size(docs) -> int:
+    return sum(len(bson.encode(doc)) for doc in docs)
+
+
+# (Name, Collection, Standard-Projektion, typisches Sparse-Fieldset einer Listenkarte)
+CASES = [
+    ("GET /users", "users", build_projection(None, USER_LIST_FIELDS),
+     build_projection("username,status,rank,patrol_team", USER_LIST_FIELDS)),
+    ("GET /users/by-status", "users", build_projection(None, USER_STATUS_FIELDS),
+     build_projection("username,rank", USER_STATUS_FIELDS)),
+    ("GET /incidents", "incidents", build_projection(None, INCIDENT_LIST_FIELDS),
+     build_projection("title,priority,status,address,location,created_at", INCIDENT_LIST_FIELDS)),
+    ("GET /persons", "persons", build_projection(None, PERSON_LIST_FIELDS),
+     build_projection("first_name,last_name,status,case_number,priority", PERSON_LIST_FIELDS)),
+]
+
+FACTORIES = {"users": make_user, "incidents": make_incident, "persons": make_person}
+
+
+def print_row(name: str, full: int, default: int, sparse: int):
+    def fmt(size):
+        return f"{size / 1024:10.1f} KB"
+
+    saved = 100.0 * (1 - default / full) if full else 0.0
+    saved_sparse = 100.0 * (1 - sparse / full) if full else 0.0
+    print(f"{name:<22}{fmt(full)}{fmt(default)} ({saved:5.1f}%){fmt(sparse)} ({saved_sparse:5.1f}%)")
+
+
+def run_synthetic(count: int):
+    print(f"📊 Synthetische Daten: {count} Dokumente pro Collection\n")
+    print(f"{'Endpunkt':<22}{'vorher':>13}{'Projektion':>21}{'?fields=':>21}")
+    for name, collection, default_projection, sparse_projection in CASES:
+        docs = [FACTORIES[collection](i) for i in range(count)]
+        print_row(
+            name,
+            bson_size(docs),
+            bson_size(project(doc, default_projection) for doc in docs),
+            bson_size(project(doc, sparse_projection) for doc in docs),
+        )
+
+
+async def run_live(mongo_url: str, db_name: str, count: int):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    db = AsyncIOMotorClient(mongo_url)[db_name]
+    print(f"📊 Live-Daten aus {db_name}: max. {count} Dokumente pro Collection\n")
+    print(f"{'Endpunkt':<22}{'vorher':>13}{'Projektion':>21}{'?fields=':>21}")
+    for name, collection, default_projection, sparse_projection in CASES:
+        full = await db[collection].find().to_list(count)
+        default = await db[collection].find({}, default_projection).to_list(count)
+        sparse = await db[collection].find({}, sparse_projection).to_list(count)
+        print_row(name, bson_size(full), bson_size(default), bson_size(sparse))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes pro Listen-Endpunkt vor/nach Projektion")
+    parser.add_argument("--count", type=int, default=100, help="Dokumente pro Liste (Endpunkte laden max. 100)")
+    parser.add_argument("--mongo-url", help="Echte MongoDB statt synthetischer Daten messen")
+    parser.add_argument("--db-name", default=os.getenv("DB_NAME", "stadtwache_db"))
+    args = parser.parse_args()
+
+    if args.mongo_url:
+        asyncio.run(run_live(args.mongo_url, args.db_name, args.count))
+    else:
+        run_synthetic(args.count)
+
+
+if __name__ == "__main__":
+    main()
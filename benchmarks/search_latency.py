@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Latenz-Benchmark für die Volltextsuche (/api/search)
+Befüllt eine eigene Benchmark-Datenbank mit N Dokumenten (Standard: 100k,
+verteilt auf Berichte, Vorfälle und Personen), legt die Text-Indizes aus
+server.ensure_indexes() an und misst p50/p95/p99 der Suche.
+
+Benötigt eine laufende MongoDB:
+    python benchmarks/search_latency.py --mongo-url mongodb://localhost:27017
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+import server  # noqa: E402
+
+STREETS = ["Hauptstraße", "Bahnhofstraße", "Kölner Straße", "Untermauerstraße", "Römerstraße", "Markt"]
+INCIDENT_WORDS = ["Einbruch", "Diebstahl", "Ruhestörung", "Verkehrsunfall", "Sachbeschädigung", "Körperverletzung", "Brand"]
+DETAILS = [
+    "Zeugen berichten von einem dunklen Fahrzeug",
+    "Anwohner haben Hilferufe gehört",
+    "Täter flüchtete zu Fuß in Richtung Bahnhof",
+    "Fenster im Erdgeschoss wurde aufgehebelt",
+    "Fahrrad wurde vom Ständer gestohlen",
+    "Streife vor Ort, Lage unter Kontrolle",
+]
+FIRST_NAMES = ["Max", "Anna", "Jonas", "Lea", "Lukas", "Marie", "Paul", "Sophie", "Felix", "Mia"]
+LAST_NAMES = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Schulz", "Hoffmann"]
+
+QUERIES = ["Einbrüche", "Diebstahl Fahrrad", "Bahnhof", "Müller", "Hauptstraße", "Verkehrsunfälle", "Zeugen Fahrzeug", "AZ-004711"]
+
+
+def make_report(i: int) -> dict:
+    word = random.choice(INCIDENT_WORDS)
+    return {
+        "id": str(uuid.uuid4()),
+        "title": f"Bericht {word} {random.choice(STREETS)}",
+        "content": ". ".join(random.sample(DETAILS, 3)) + f". {word} aufgenommen.",
+        "author_id": "bench",
+        "author_name": "Benchmark",
+        "shift_date": "2025-01-01",
+        "status": "submitted",
+        "created_at": datetime.utcnow() - timedelta(minutes=i),
+    }
+
+
+def make_incident(i: int) -> dict:
+    word = random.choice(INCIDENT_WORDS)
+    return {
+        "id": str(uuid.uuid4()),
+        "title": word,
+        "description": ". ".join(random.sample(DETAILS, 2)),
+        "address": f"{random.choice(STREETS)} {random.randint(1, 120)}, 58332 Schwelm",
+        "priority": random.choice(["low", "medium", "high"]),
+        "status": "open",
+        "location": {"lat": 51.28, "lng": 7.29},
+        "reported_by": "bench",
+        "created_at": datetime.utcnow() - timedelta(minutes=i),
+    }
+
+
+def make_person(i: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "first_name": random.choice(FIRST_NAMES),
+        "last_name": random.choice(LAST_NAMES),
+        "case_number": f"AZ-{i:06d}",
+        "description": random.choice(DETAILS),
+        "status": random.choice(["vermisst", "gesucht"]),
+        "is_active": True,
+        "created_by": "bench",
+        "created_by_name": "Benchmark",
+        "created_at": datetime.utcnow() - timedelta(minutes=i),
+    }
+
+
+async def seed(db, total: int, batch_size: int = 5000):
+    share = {"reports": make_report, "incidents": make_incident, "persons": make_person}
+    per_collection = total // len(share)
+    for name, factory in share.items():
+        await db[name].delete_many({})
+        for offset in range(0, per_collection, batch_size):
+            batch = [factory(i) for i in range(offset, min(offset + batch_size, per_collection))]
+            await db[name].insert_many(batch)
+        print(f"🌱 {per_collection} Dokumente in {name}")
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(args):
+    bench_db = AsyncIOMotorClient(args.mongo_url)[args.db_name]
+    server.db = bench_db
+
+    if not args.skip_seed:
+        await seed(bench_db, args.documents)
+    start = time.perf_counter()
+    await server.ensure_indexes()
+    print(f"🗂️  Indizes bereit nach {time.perf_counter() - start:.1f}s\n")
+
+    admin = server.User(email="bench@stadtwache.de", username="bench", role=server.UserRole.ADMIN)
+    print(f"{'Query':<22}{'p50':>10}{'p95':>10}{'p99':>10}{'Treffer':>10}")
+    all_timings = []
+    for query in QUERIES:
+        timings = []
+        for i in range(args.iterations):
+            page = 1 + (i % 3)
+            start = time.perf_counter()
+            await server.search(q=query, page=page, page_size=20, current_user=admin)
+            timings.append((time.perf_counter() - start) * 1000)
+        # Counting is opt-in (one count_documents per type) - outside the timing
+        response = await server.search(q=query, page_size=1, with_totals=True, current_user=admin)
+        total = server.orjson.loads(response.body)["total"]
+        all_timings.extend(timings)
+        print(f"{query:<22}{percentile(timings, 50):>7.1f} ms{percentile(timings, 95):>7.1f} ms"
+              f"{percentile(timings, 99):>7.1f} ms{total:>10}")
+    print(f"\n{'Gesamt':<22}{percentile(all_timings, 50):>7.1f} ms{percentile(all_timings, 95):>7.1f} ms"
+          f"{percentile(all_timings, 99):>7.1f} ms   (Mittel {statistics.mean(all_timings):.1f} ms)")
+
+    if args.drop:
+        await bench_db.client.drop_database(args.db_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Volltextsuche Latenz-Benchmark")
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="stadtwache_search_bench")
+    parser.add_argument("--documents", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--skip-seed", action="store_true", help="Vorhandene Benchmark-Daten wiederverwenden")
+    parser.add_argument("--drop", action="store_true", help="Benchmark-Datenbank danach löschen")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
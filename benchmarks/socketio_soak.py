@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Socket.IO Soak- und Fan-out-Benchmark
+Öffnet N simulierte Beamte (socketio.AsyncClient), die über join_user_room
+und join_channel ihren Räumen beitreten und mit einstellbarer Rate
+location_update und send_message senden. Gemessen werden:
+
+  - End-to-End-Latenz der Emits (Zeitstempel im Payload -> Empfang)
+  - CPU und RSS des Server-Prozesses aus /proc, auch pro Verbindung
+  - zugestellte Nachrichten pro Sekunde (location_updated geht an alle)
+
+Die Clients können auf mehrere Prozesse verteilt werden (--processes), damit
+bei Tausenden Verbindungen nicht der Lastgenerator der Engpass ist.
+
+    pip install "python-socketio[asyncio_client]"  # bringt aiohttp mit
+    python benchmarks/socketio_soak.py --in-memory --clients 500 --duration 120
+    python benchmarks/socketio_soak.py --url http://localhost:8001 --pid 12345 --clients 200
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import random
+import statistics
+import time
+
+import socketio
+
+from load_test import free_port, percentile, start_server
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+CENTER = (51.2879, 7.2954)
+
+
+# ------------------------------------------------------------------ Server-Metriken
+
+
+def read_proc(pid: int):
+    """(CPU-Sekunden, RSS in Bytes) eines Prozesses aus /proc"""
+    with open(f"/proc/{pid}/stat") as handle:
+        fields = handle.read().rsplit(")", 1)[1].split()
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS  # utime + stime
+    rss = 0
+    with open(f"/proc/{pid}/status") as handle:
+        for line in handle:
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1]) * 1024
+                break
+    return cpu_seconds, rss
+
+
+# ------------------------------------------------------------------ Clients
+
+
+class SoakClient:
+    def __init__(self, index: int, args, stats: dict):
+        self.index = index
+        self.user_id = f"soak-{index}"
+        self.channel = f"revier{index % args.channels}"
+        self.args = args
+        self.stats = stats
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.position = (CENTER[0] + random.uniform(-0.01, 0.01), CENTER[1] + random.uniform(-0.01, 0.01))
+
+        @self.sio.on("location_updated")
+        async def location_updated(data):
+            sent_at = (data.get("location") or {}).get("ts")
+            if sent_at:
+                self.stats["latencies"].append((time.time() - sent_at) * 1000)
+            self.stats["received"] += 1
+
+        @self.sio.on("new_message")
+        async def new_message(data):
+            parts = str(data.get("content", "")).split("|")
+            if len(parts) == 3 and parts[0] == "soak":
+                self.stats["latencies"].append((time.time() - float(parts[2])) * 1000)
+            self.stats["received"] += 1
+
+    async def connect(self):
+        await self.sio.connect(self.args.url, transports=["websocket"], wait_timeout=30)
+        await self.sio.emit("join_user_room", self.user_id)
+        await self.sio.emit("join_channel", self.channel)
+
+    async def send_loop(self, stop_at: float):
+        # Rates are per client and second; poisson-ish spacing avoids lockstep bursts
+        next_gps = time.monotonic() + random.expovariate(self.args.gps_rate) if self.args.gps_rate else None
+        next_chat = time.monotonic() + random.expovariate(self.args.chat_rate) if self.args.chat_rate else None
+        while time.monotonic() < stop_at and self.sio.connected:
+            now = time.monotonic()
+            try:
+                if next_gps and now >= next_gps:
+                    lat, lng = self.position
+                    self.position = (lat + random.uniform(-0.0003, 0.0003), lng + random.uniform(-0.0003, 0.0003))
+                    await self.sio.emit("location_update", {
+                        "user_id": self.user_id,
+                        "location": {"lat": self.position[0], "lng": self.position[1], "ts": time.time()}
+                    })
+                    self.stats["sent"] += 1
+                    next_gps = now + random.expovariate(self.args.gps_rate)
+                if next_chat and now >= next_chat:
+                    await self.sio.emit("send_message", {
+                        "channel": self.channel,
+                        "content": f"soak|{self.user_id}|{time.time()}",
+                        "sender_id": self.user_id
+                    })
+                    self.stats["sent"] += 1
+                    next_chat = now + random.expovariate(self.args.chat_rate)
+            except Exception:
+                self.stats["errors"] += 1
+            wake = min(t for t in (next_gps, next_chat, stop_at) if t)
+            await asyncio.sleep(max(0.0, wake - time.monotonic()))
+
+
+async def run_clients(worker: int, indices, args, results, stop_at: float):
+    stats = {"latencies": [], "received": 0, "sent": 0, "errors": 0, "connected": 0}
+    clients = [SoakClient(index, args, stats) for index in indices]
+
+    async def report():
+        while time.monotonic() < stop_at + 2:
+            await asyncio.sleep(args.interval)
+            stats["connected"] = sum(1 for client in clients if client.sio.connected)
+            results.put({"worker": worker, **stats})
+            stats["latencies"] = []
+            stats["received"] = stats["sent"] = 0
+
+    reporter = asyncio.create_task(report())
+
+    # Ramp up: args.ramp connections per second across all workers
+    per_worker_ramp = max(1.0, args.ramp / args.processes)
+    senders = []
+    for number, client in enumerate(clients):
+        try:
+            await client.connect()
+            senders.append(asyncio.create_task(client.send_loop(stop_at)))
+        except Exception:
+            stats["errors"] += 1
+        if (number + 1) % max(1, int(per_worker_ramp)) == 0:
+            await asyncio.sleep(1)
+
+    await asyncio.gather(*senders)
+    await asyncio.sleep(1)  # let in-flight emits arrive
+    await asyncio.gather(*(client.sio.disconnect() for client in clients if client.sio.connected), return_exceptions=True)
+    await reporter
+
+
+def client_worker(worker: int, indices, args, results, stop_at_wall: float):
+    # monotonic clocks are per process - hand over the end as wall time
+    stop_at = time.monotonic() + (stop_at_wall - time.time())
+    asyncio.run(run_clients(worker, indices, args, results, stop_at))
+
+
+# ------------------------------------------------------------------ Main
+
+
+def summarize(samples):
+    latencies = [value for sample in samples for value in sample["latencies"]]
+    if not latencies:
+        return "      -          -          -"
+    return (f"{percentile(latencies, 50):>7.1f} ms{percentile(latencies, 95):>8.1f} ms"
+            f"{percentile(latencies, 99):>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Socket.IO Soak- und Fan-out-Benchmark")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--processes", type=int, default=max(1, min(4, os.cpu_count() or 1)))
+    parser.add_argument("--duration", type=float, default=60, help="Sekunden nach Start des Ramp-ups")
+    parser.add_argument("--ramp", type=float, default=100, help="Neue Verbindungen pro Sekunde")
+    parser.add_argument("--gps-rate", type=float, default=0.2, help="location_update pro Client und Sekunde")
+    parser.add_argument("--chat-rate", type=float, default=0.02, help="send_message pro Client und Sekunde")
+    parser.add_argument("--channels", type=int, default=10, help="Anzahl Kanäle (Clients verteilt)")
+    parser.add_argument("--interval", type=float, default=5, help="Messintervall in Sekunden")
+    parser.add_argument("--url", help="Bestehenden Server testen statt einen zu starten")
+    parser.add_argument("--pid", type=int, help="PID des bestehenden Servers für CPU/RSS")
+    parser.add_argument("--in-memory", action="store_true", help="mongomock-motor statt MongoDB")
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="stadtwache_soak")
+    parser.add_argument("--json", help="Zeitreihe zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    process = None
+    pid = args.pid
+    if not args.url:
+        args.port = free_port()
+        args.url = f"http://127.0.0.1:{args.port}"
+        process = start_server(args, quiet=True)
+        pid = process.pid
+        import httpx
+        for _ in range(150):
+            try:
+                if httpx.get(f"{args.url}/api/health").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                time.sleep(0.2)
+    try:
+        run(args, pid)
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+def run(args, pid):
+    cpu_before, rss_before = read_proc(pid) if pid else (0.0, 0)
+    print(f"🖥️  Server-PID {pid or '-'}, RSS vor Verbindungen {rss_before / 2**20:.1f} MB")
+    print(f"📡 {args.clients} Clients auf {args.processes} Prozessen, GPS {args.gps_rate}/s, Chat {args.chat_rate}/s\n")
+
+    results = multiprocessing.Queue()
+    stop_at_wall = time.time() + args.duration
+    workers = []
+    for worker in range(args.processes):
+        indices = list(range(worker, args.clients, args.processes))
+        proc = multiprocessing.Process(target=client_worker, args=(worker, indices, args, results, stop_at_wall))
+        proc.start()
+        workers.append(proc)
+
+    print(f"{'t':>6}{'Verb.':>8}{'gesendet/s':>12}{'empf./s':>10}{'p50':>10}{'p95':>11}{'p99':>11}"
+          f"{'CPU':>8}{'RSS':>10}{'KB/Verb.':>10}")
+    timeline = []
+    started = time.monotonic()
+    last_cpu, last_time = cpu_before, started
+    latest = {}
+    while any(proc.is_alive() for proc in workers) or not results.empty():
+        window = []
+        deadline = time.monotonic() + args.interval
+        while time.monotonic() < deadline:
+            try:
+                window.append(results.get(timeout=max(0.01, deadline - time.monotonic())))
+            except queue.Empty:
+                if not any(proc.is_alive() for proc in workers):
+                    break
+        for sample in window:
+            latest[sample["worker"]] = sample
+        now = time.monotonic()
+        connected = sum(sample["connected"] for sample in latest.values())
+        sent = sum(sample["sent"] for sample in window) / args.interval
+        received = sum(sample["received"] for sample in window) / args.interval
+        cpu_percent, rss = 0.0, 0
+        if pid:
+            try:
+                cpu, rss = read_proc(pid)
+                cpu_percent = (cpu - last_cpu) / (now - last_time) * 100
+                last_cpu, last_time = cpu, now
+            except FileNotFoundError:
+                pass
+        per_connection = (rss - rss_before) / connected / 1024 if connected and rss else 0.0
+        latencies = [value for sample in window for value in sample["latencies"]]
+        print(f"{now - started:>5.0f}s{connected:>8}{sent:>12.1f}{received:>10.1f}  {summarize(window)}"
+              f"{cpu_percent:>7.0f}%{rss / 2**20:>7.1f} MB{per_connection:>10.1f}")
+        timeline.append({
+            "t": round(now - started, 1), "connected": connected, "sent_per_s": sent, "received_per_s": received,
+            "p50": percentile(latencies, 50) if latencies else None,
+            "p95": percentile(latencies, 95) if latencies else None,
+            "p99": percentile(latencies, 99) if latencies else None,
+            "cpu_percent": round(cpu_percent, 1), "rss": rss, "rss_per_connection": round(per_connection * 1024)
+        })
+
+    for proc in workers:
+        proc.join()
+
+    loaded = [point for point in timeline if point["connected"] == args.clients and point["p95"] is not None]
+    if loaded:
+        print(f"\n📊 Unter Volllast ({len(loaded)} Intervalle): "
+              f"p95 Median {statistics.median(p['p95'] for p in loaded):.1f} ms, "
+              f"CPU Mittel {statistics.mean(p['cpu_percent'] for p in loaded):.0f}%, "
+              f"RSS/Verbindung {statistics.median(p['rss_per_connection'] for p in loaded) / 1024:.1f} KB")
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump({"args": {k: v for k, v in vars(args).items()}, "timeline": timeline}, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+GPS-Track Benchmark: ein Dokument pro Ping vs. stündliche Track-Buckets
+Erzeugt eine synthetische Schicht (N Beamte, ein Ping alle X Sekunden) und
+vergleicht BSON-Bytes auf der Platte, Speicher im Prozess sowie die Zeit zum
+Laden eines Schicht-Tracks aus beiden Layouts.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import bson
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from track_store import Track, decode_bucket, deep_sizeof, encode_bucket, floor_hour, to_ms  # noqa: E402
+
+
+def make_shift(officers: int, hours: float, interval: float, start: datetime):
+    """Raw ping documents as stored today, one random walk per officer"""
+    pings = []
+    steps = int(hours * 3600 / interval)
+    for _ in range(officers):
+        user_id = str(uuid.uuid4())
+        lat, lng = 51.2879 + random.uniform(-0.02, 0.02), 7.2954 + random.uniform(-0.03, 0.03)
+        for step in range(steps):
+            lat += random.gauss(0, 0.00005)
+            lng += random.gauss(0, 0.00008)
+            timestamp = start + timedelta(seconds=step * interval + random.uniform(0, 1))
+            pings.append({
+                "_id": bson.ObjectId(),
+                "user_id": user_id,
+                "location": {"lat": lat, "lng": lng, "accuracy": 8.0},
+                "timestamp": timestamp,
+                "expire_at": timestamp + timedelta(days=7),
+            })
+    return pings
+
+
+def make_buckets(pings):
+    by_bucket = {}
+    for ping in pings:
+        by_bucket.setdefault((ping["user_id"], floor_hour(ping["timestamp"])), []).append(ping)
+    return [encode_bucket(Track.from_pings(user_id, group), hour) for (user_id, hour), group in by_bucket.items()]
+
+
+def fmt_bytes(size: float) -> str:
+    return f"{size / 1024 / 1024:9.2f} MB" if size >= 1024 * 1024 else f"{size / 1024:9.1f} KB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speicherbedarf und Ladezeit von GPS-Tracks")
+    parser.add_argument("--officers", type=int, default=40)
+    parser.add_argument("--hours", type=float, default=10, help="Schichtlänge")
+    parser.add_argument("--interval", type=float, default=5, help="Sekunden zwischen Pings")
+    args = parser.parse_args()
+
+    start = floor_hour(datetime.utcnow()) - timedelta(hours=args.hours)
+    pings = make_shift(args.officers, args.hours, args.interval, start)
+    count = len(pings)
+    print(f"🛰️ {args.officers} Beamte, {args.hours:g}h, ein Ping alle {args.interval:g}s = {count} Punkte\n")
+
+    started = time.perf_counter()
+    buckets = make_buckets(pings)
+    encode_s = time.perf_counter() - started
+
+    raw_bson = sum(len(bson.encode(ping)) for ping in pings)
+    bucket_bson = sum(len(bson.encode(bucket)) for bucket in buckets)
+    raw_memory = sum(deep_sizeof(ping) for ping in pings[:1000]) / min(count, 1000) * count
+    tracks = [decode_bucket(bucket) for bucket in buckets]
+    track_memory = sum(track.nbytes for track in tracks)
+
+    print(f"{'':<28}{'Dokumente':>14}{'Buckets':>14}{'Faktor':>9}")
+    print(f"{'Anzahl Dokumente':<28}{count:>14}{len(buckets):>14}{count / len(buckets):>8.0f}x")
+    print(f"{'BSON (Platte, unkompr.)':<28}{fmt_bytes(raw_bson):>14}{fmt_bytes(bucket_bson):>14}"
+          f"{raw_bson / bucket_bson:>8.1f}x")
+    print(f"{'Bytes pro Punkt':<28}{raw_bson / count:>14.1f}{bucket_bson / count:>14.1f}")
+    print(f"{'Speicher im Prozess':<28}{fmt_bytes(raw_memory):>14}{fmt_bytes(track_memory):>14}"
+          f"{raw_memory / track_memory:>8.1f}x")
+
+    # One officer's shift: documents -> Track vs. decode his buckets
+    user_id = pings[0]["user_id"]
+    officer_pings = [ping for ping in pings if ping["user_id"] == user_id]
+    officer_buckets = [bucket for bucket in buckets if bucket["user_id"] == user_id]
+    encoded_pings = [bson.encode(ping) for ping in officer_pings]
+    encoded_buckets = [bson.encode(bucket) for bucket in officer_buckets]
+
+    rounds = 20
+    started = time.perf_counter()
+    for _ in range(rounds):
+        Track.from_pings(user_id, [bson.decode(data) for data in encoded_pings])
+    raw_load = (time.perf_counter() - started) / rounds
+    started = time.perf_counter()
+    for _ in range(rounds):
+        track = Track.concat(user_id, [decode_bucket(bson.decode(data)) for data in encoded_buckets])
+    bucket_load = (time.perf_counter() - started) / rounds
+
+    print(f"\n⏱️ Schicht-Track eines Beamten laden ({len(officer_pings)} Punkte, BSON-Decode inkl.):")
+    print(f"   Dokumente: {raw_load * 1000:8.2f} ms")
+    print(f"   Buckets:   {bucket_load * 1000:8.2f} ms  ({raw_load / bucket_load:.0f}x)")
+    print(f"   Verdichten aller Buckets: {encode_s * 1000:.0f} ms")
+
+    # Lossless apart from µ° rounding
+    original = Track.from_pings(user_id, officer_pings)
+    assert (track.t == original.t).all()
+    error_m = max(abs(track.lat - original.lat).max(), abs(track.lng - original.lng).max()) * 111_320
+    assert track.t[0] == to_ms(officer_pings[0]["timestamp"])
+    print(f"   Max. Rundungsfehler: {error_m:.3f} m")
+
+
+if __name__ == "__main__":
+    main()
@@ -1550,6 +1550,20 @@ const MainApp = ({ appConfig, setAppConfig }) => {
     setShowReportModal(true);
   };
 
+  // Listen kommen ohne Bilder (images/photo) - die Detailansicht lädt sie nach
+  const loadDetails = async (path) => {
+    try {
+      const config = token ? {
+        headers: { Authorization: `Bearer ${token}` }
+      } : {};
+      const response = await axios.get(`${API_URL}/api/${path}`, config);
+      return response.data;
+    } catch (error) {
+      console.error(`❌ Details ${path} konnten nicht geladen werden:`, error);
+      return null;
+    }
+  };
+
   // Open report for editing
   const editReport = (report) => {
     setEditingReport(report);
@@ -1557,15 +1571,25 @@ const MainApp = ({ appConfig, setAppConfig }) => {
       title: report.title,
       content: report.content,
       shift_date: report.shift_date,
-      images: report.images || []
+      images: []
     });
     setShowReportModal(true);
+    loadDetails(`reports/${report.id}`).then(details => {
+      if (details) {
+        setReportFormData(prev => ({ ...prev, images: details.images || [] }));
+      }
+    });
   };
 
   // View report details with status actions
   const viewReportDetails = (report) => {
     setSelectedReport(report);
     setShowReportDetailModal(true);
+    loadDetails(`reports/${report.id}`).then(details => {
+      if (details) {
+        setSelectedReport(prev => prev && prev.id === details.id ? { ...prev, images: details.images } : prev);
+      }
+    });
   };
 
   useEffect(() => {
@@ -2037,7 +2061,14 @@ const MainApp = ({ appConfig, setAppConfig }) => {
     setShowPersonModal(true);
   };
 
-  const editPerson = (person) => {
+  const editPerson = async (person) => {
+    // Ohne das Foto aus der Detailansicht würde Speichern es leeren
+    const details = await loadDetails(`persons/${person.id}`);
+    if (!details) {
+      Alert.alert('❌ Person konnte nicht geladen werden');
+      return;
+    }
+    person = { ...person, ...details };
     setEditingPerson(person);
     setPersonFormData({
       first_name: person.first_name,
@@ -2124,14 +2155,8 @@ const MainApp = ({ appConfig, setAppConfig }) => {
       
       console.log('👤 Nehme Vorfall an:', incidentId, incidentTitle);
       
-      const updateData = {
-        assigned_to: user?.id,
-        assigned_to_name: user?.username,
-        assigned_at: new Date().toISOString(),
-        status: 'in_progress'
-      };
-      
-      await axios.put(`${API_URL}/api/incidents/${incidentId}`, updateData, config);
+      // Zuweisung nur über /assign (409, falls schon jemand anderes übernommen hat)
+      await axios.put(`${API_URL}/api/incidents/${incidentId}/assign`, {}, config);
       
       Alert.alert(`✅ Erfolg\n\nVorfall "${incidentTitle}" wurde Ihnen zugewiesen und ist nun in Bearbeitung!`);
       
@@ -2919,7 +2944,7 @@ const MainApp = ({ appConfig, setAppConfig }) => {
   };
 
   const showIncidentOnMap = (incident) => {
-    setSelectedIncident(incident);
+    selectIncident(incident);
     setShowIncidentMap(true);
   };
 
@@ -3677,13 +3702,31 @@ const MainApp = ({ appConfig, setAppConfig }) => {
     }
   };
 
-  const openIncidentDetails = (incident) => {
+  const selectIncident = (incident) => {
     setSelectedIncident(incident);
+    loadDetails(`incidents/${incident.id}`).then(details => {
+      if (details) {
+        setSelectedIncident(prev => prev && prev.id === details.id ? { ...prev, images: details.images } : prev);
+      }
+    });
+  };
+
+  const selectPerson = (person) => {
+    setSelectedPerson(person);
+    loadDetails(`persons/${person.id}`).then(details => {
+      if (details) {
+        setSelectedPerson(prev => prev && prev.id === details.id ? { ...prev, photo: details.photo } : prev);
+      }
+    });
+  };
+
+  const openIncidentDetails = (incident) => {
+    selectIncident(incident);
     setShowIncidentModal(true);
   };
 
   const openIncidentMap = (incident) => {
-    setSelectedIncident(incident);
+    selectIncident(incident);
     setShowMapModal(true);
   };
 
@@ -9562,7 +9605,7 @@ const MainApp = ({ appConfig, setAppConfig }) => {
                   key={incident.id || index} 
                   style={dynamicStyles.cyberIncidentCard}
                   onPress={() => {
-                    setSelectedIncident(incident);
+                    selectIncident(incident);
                     setShowIncidentDetailModal(true);
                   }}
                   activeOpacity={0.8}
@@ -10974,7 +11017,7 @@ const MainApp = ({ appConfig, setAppConfig }) => {
                     }
                   ]}
                   onPress={() => {
-                    setSelectedPerson(person);
+                    selectPerson(person);
                     setShowPersonDetailModal(true);
                   }}
                 >
@@ -11092,7 +11135,7 @@ const MainApp = ({ appConfig, setAppConfig }) => {
                     }
                   ]}
                   onPress={() => {
-                    setSelectedIncident(incident);
+                    selectIncident(incident);
                     setShowIncidentDetailModal(true);
                   }}
                   activeOpacity={0.7}
@@ -13990,7 +14033,7 @@ Beispielinhalt:
                   ]}
                   onPress={() => {
                     // Bleibe in der Übersicht, zeige nur erweiterte Info
-                    setSelectedIncident(incident);
+                    selectIncident(incident);
                   }}
                 >
                   <View style={[dynamicStyles.incidentIcon, 
@@ -14020,7 +14063,7 @@ Beispielinhalt:
                       style={[dynamicStyles.mapButton, { backgroundColor: colors.secondary }]}
                       onPress={(e) => {
                         e.stopPropagation();
-                        setSelectedIncident(incident);
+                        selectIncident(incident);
                         // Schließe Übersicht und öffne Vorfall-Details
                         setShowAllIncidentsModal(false);
                         setTimeout(() => {
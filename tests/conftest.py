@@ -0,0 +1,66 @@
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime
+
+import pytest
+
+# Backend modules import each other as top-level modules (like uvicorn runs them)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+
+class Api:
+    """TestClient for the API against an in-memory database.
+
+    Startup hooks don't run (no indexes, no retention loop, no logging setup);
+    db calls in tests go through run().
+    """
+
+    def __init__(self, server, db):
+        from fastapi.testclient import TestClient
+
+        self.server = server
+        self.db = db
+        self.client = TestClient(server.app)
+
+    def run(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def login(self, role="police", email=None):
+        """Create a user and return the Authorization headers for it"""
+        user_id = str(uuid.uuid4())
+        email = email or f"{user_id[:8]}@stadtwache.de"
+        self.run(self.db.users.insert_one({
+            "id": user_id, "email": email, "username": email.split("@")[0], "role": role,
+            "status": "Im Dienst", "is_active": True,
+            "created_at": datetime.utcnow(), "updated_at": datetime.utcnow(),
+        }))
+        token = self.server.create_access_token({"sub": email, "user_id": user_id, "role": role})
+        return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import mongomock.collection
+    import server
+    from heatmap import HeatmapIndex
+    from person_matching import PersonMatchIndex
+
+    # mongomock re-reads a find_one_and_update result with the original filter
+    # when the projection drops _id - a compare-and-set on "version" then finds
+    # nothing. MongoDB returns the modified document; resolve the _id first.
+    find_and_modify = mongomock.collection.Collection._find_and_modify
+
+    def find_and_modify_by_id(self, query, *args, **kwargs):
+        match = self.find_one(query, {"_id": 1}, sort=kwargs.get("sort"))
+        return find_and_modify(self, {"_id": match["_id"]} if match else query, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, "_find_and_modify", find_and_modify_by_id)
+    db = mongomock_motor.AsyncMongoMockClient()["stadtwache_test"]
+    monkeypatch.setattr(server, "db", db)
+    # In-memory indexes would otherwise carry state from test to test
+    monkeypatch.setattr(server, "person_match_index", PersonMatchIndex())
+    monkeypatch.setattr(server, "heatmap_index", HeatmapIndex())
+    return Api(server, db)
@@ -0,0 +1,117 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware, choose_encoding, parse_accept_encoding
+
+BIG = "Einsatzbericht " * 500  # ~7.5 KB, compresses well
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("br;q=1.0, gzip;q=0.8, *;q=0") == {"br": 1.0, "gzip": 0.8, "*": 0.0}
+    assert parse_accept_encoding("gzip, deflate") == {"gzip": 1.0, "deflate": 1.0}
+    assert parse_accept_encoding("gzip;q=1.2.3") == {"gzip": 0.0}
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "br"),
+    ("*;q=0", None),
+    ("br;q=0.5, gzip", "gzip"),
+    ("gzip, br", "br"),
+])
+def test_choose_encoding(monkeypatch, header, expected):
+    if compression.brotli is None and expected == "br":
+        expected = "gzip"
+    assert choose_encoding(header) == expected
+
+
+def test_choose_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding("br, gzip;q=0.5") == "gzip"
+    assert choose_encoding("br") is None
+
+
+def make_client(**options):
+    async def big(request):
+        return PlainTextResponse(BIG, headers={"ETag": request.query_params.get("etag", '"big-1"')})
+
+    async def small(request):
+        return PlainTextResponse("ok")
+
+    async def image(request):
+        return Response(b"\x89PNG" + b"\0" * 4096, media_type="image/png")
+
+    async def stream(request):
+        async def chunks():
+            for _ in range(20):
+                yield BIG.encode()
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    app = Starlette(routes=[Route("/api/big", big), Route("/api/small", small),
+                            Route("/api/image", image), Route("/api/export", stream)])
+    middleware = CompressionMiddleware(app, **options)
+    return TestClient(middleware), middleware
+
+
+def test_gzip_response_is_compressed_with_exact_length():
+    client, _ = make_client()
+    response = client.get("/api/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BIG) / 10
+    assert response.text == BIG  # httpx decodes transparently
+
+
+@pytest.mark.parametrize("etag, expected", [('"big-1"', 'W/"big-1"'), ('W/"big-1"', 'W/"big-1"')])
+def test_compressed_response_has_weak_etag(etag, expected):
+    client, _ = make_client()
+    assert client.get("/api/big", params={"etag": etag}, headers={"Accept-Encoding": "gzip"}).headers["etag"] == expected
+    assert client.get("/api/big", headers={"Accept-Encoding": "identity"}).headers["etag"] == '"big-1"'
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli not installed")
+def test_brotli_preferred_when_accepted():
+    client, _ = make_client()
+    response = client.get("/api/big", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.text == BIG
+
+
+@pytest.mark.parametrize("path, accept", [
+    ("/api/small", "gzip"),   # below minimum_size
+    ("/api/image", "gzip"),   # already compressed content type
+    ("/api/big", "identity"),  # client does not accept compression
+])
+def test_passthrough(path, accept):
+    client, _ = make_client()
+    response = client.get(path, headers={"Accept-Encoding": accept})
+    assert "content-encoding" not in response.headers
+
+
+def test_streaming_body_is_compressed_incrementally():
+    client, _ = make_client()
+    with client.stream("GET", "/api/export", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw) == BIG.encode() * 20
+
+
+def test_budget_counts_uncompressed_size():
+    client, middleware = make_client(budgets=[(r"^/api/big$", 1024), (r"^/api/export$", None), (r"^/api/", 10**6)])
+    client.get("/api/big", headers={"Accept-Encoding": "gzip"})
+    client.get("/api/big")
+    client.get("/api/export", headers={"Accept-Encoding": "gzip"})
+    client.get("/api/small")
+    assert middleware.violations == {"/api/big": 2}
+    assert middleware.budget_for("/api/export") is None
+    assert middleware.budget_for("/other") is None
@@ -0,0 +1,141 @@
+import pytest
+from fastapi import HTTPException
+
+import server
+
+INCIDENT = {"title": "Ruhestörung", "description": "Laute Musik", "priority": "medium",
+            "location": {"lat": 51.2879, "lng": 7.2954}, "address": "Marktplatz 1"}
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, {}),
+    ("", {}),
+    ("*", {}),
+    ('W/"abc-3"', {"version": {"$in": [3]}}),
+    ('"abc-3"', {"version": {"$in": [3]}}),
+    ('W/"abc-2", W/"abc-4"', {"version": {"$in": [2, 4]}}),
+    ('W/"other-2", W/"abc-4"', {"version": {"$in": [4]}}),
+])
+def test_if_match_filter(header, expected):
+    assert server.if_match_filter(header, "abc") == expected
+
+
+@pytest.mark.parametrize("header", ['W/"other-3"', 'W/"abc-x"', "garbage"])
+def test_if_match_filter_rejects_foreign_tags(header):
+    with pytest.raises(HTTPException) as error:
+        server.if_match_filter(header, "abc")
+    assert error.value.status_code == 412
+
+
+def test_resource_etag_follows_version():
+    assert server.resource_etag({"id": "abc"}) == 'W/"abc-1"'
+    assert server.resource_etag({"id": "abc", "version": 7}) == 'W/"abc-7"'
+
+
+def test_incident_update_with_if_match(api):
+    headers = api.login()
+    created = api.client.post("/api/incidents", headers=headers, json=INCIDENT).json()
+    incident_id = created["id"]
+    etag = api.client.get(f"/api/incidents/{incident_id}", headers=headers).headers["etag"]
+    assert etag == f'W/"{incident_id}-1"'
+
+    response = api.client.put(f"/api/incidents/{incident_id}", headers={**headers, "If-Match": etag},
+                              json={"status": "in_progress"})
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+    assert response.headers["etag"] == f'W/"{incident_id}-2"'
+
+    # Someone who still holds version 1 loses
+    stale = api.client.put(f"/api/incidents/{incident_id}", headers={**headers, "If-Match": etag},
+                           json={"status": "closed"})
+    assert stale.status_code == 412
+    assert api.client.get(f"/api/incidents/{incident_id}", headers=headers).json()["status"] == "in_progress"
+
+
+def test_incident_update_without_if_match_still_bumps_version(api):
+    headers = api.login()
+    incident_id = api.client.post("/api/incidents", headers=headers, json=INCIDENT).json()["id"]
+    for expected in (2, 3):
+        response = api.client.put(f"/api/incidents/{incident_id}", headers=headers,
+                                  json={"description": f"v{expected}", "version": 99})
+        assert response.status_code == 200
+        assert response.json()["version"] == expected  # client-sent version is ignored
+    wildcard = api.client.put(f"/api/incidents/{incident_id}", headers={**headers, "If-Match": "*"},
+                              json={"description": "v4"})
+    assert wildcard.json()["version"] == 4
+
+
+def test_incident_update_missing_incident(api):
+    headers = api.login()
+    assert api.client.put("/api/incidents/nope", headers=headers, json={"status": "x"}).status_code == 404
+    response = api.client.put("/api/incidents/nope", headers={**headers, "If-Match": 'W/"nope-1"'},
+                              json={"status": "x"})
+    assert response.status_code == 404
+    assert api.client.put("/api/incidents/nope/assign", headers=headers).status_code == 404
+
+
+def test_assign_is_first_come_first_served(api):
+    first, second = api.login(), api.login()
+    incident_id = api.client.post("/api/incidents", headers=first, json=INCIDENT).json()["id"]
+
+    taken = api.client.put(f"/api/incidents/{incident_id}/assign", headers=first)
+    assert taken.status_code == 200
+    assert taken.json()["version"] == 2
+    # Taking it again is idempotent for the assignee
+    assert api.client.put(f"/api/incidents/{incident_id}/assign", headers=first).status_code == 200
+    conflict = api.client.put(f"/api/incidents/{incident_id}/assign", headers=second)
+    assert conflict.status_code == 409
+
+
+def test_assign_with_stale_etag(api):
+    headers = api.login()
+    incident_id = api.client.post("/api/incidents", headers=headers, json=INCIDENT).json()["id"]
+    api.client.put(f"/api/incidents/{incident_id}", headers=headers, json={"description": "geändert"})
+    response = api.client.put(f"/api/incidents/{incident_id}/assign",
+                              headers={**headers, "If-Match": f'W/"{incident_id}-1"'})
+    assert response.status_code == 412
+    assert api.client.get(f"/api/incidents/{incident_id}", headers=headers).json()["assigned_to"] is None
+
+
+def test_person_update_with_stale_etag(api):
+    headers = api.login()
+    person = {"first_name": "Hans", "last_name": "Müller", "status": "vermisst"}
+    person_id = api.client.post("/api/persons", headers=headers, json=person).json()["id"]
+    etag = api.client.get(f"/api/persons/{person_id}", headers=headers).headers["etag"]
+
+    response = api.client.put(f"/api/persons/{person_id}", headers={**headers, "If-Match": etag},
+                              json={"status": "gefunden"})
+    assert response.status_code == 200
+    assert response.headers["etag"] == f'W/"{person_id}-2"'
+    stale = api.client.put(f"/api/persons/{person_id}", headers={**headers, "If-Match": etag},
+                           json={"status": "vermisst"})
+    assert stale.status_code == 412
+
+
+def test_concurrent_report_edit_conflicts(api, monkeypatch):
+    headers = api.login()
+    report = {"title": "Streife", "content": "Beginn 18:00\n", "shift_date": "2024-05-13"}
+    report_id = api.client.post("/api/reports", headers=headers, json=report).json()["id"]
+    edited = api.client.put(f"/api/reports/{report_id}", headers=headers, json={**report, "content": "Beginn 18:15\n"})
+    assert edited.json()["version"] == 2
+
+    # A second request that read version 1 before the first one wrote
+    collection = type(api.db.reports)
+    real_find_one = collection.find_one
+
+    async def stale_find_one(self, query, *args, **kwargs):
+        document = await real_find_one(self, query, *args, **kwargs)
+        if document and self.name == "reports":
+            document["version"] = 1
+        return document
+
+    monkeypatch.setattr(collection, "find_one", stale_find_one)
+    conflict = api.client.put(f"/api/reports/{report_id}", headers=headers, json={**report, "content": "Anders\n"})
+    monkeypatch.setattr(collection, "find_one", real_find_one)
+
+    assert conflict.status_code == 409
+    history = api.client.get(f"/api/reports/{report_id}/history", headers=headers).json()
+    assert history["current_version"] == 2
+    assert [entry["version"] for entry in history["versions"]] == [1]
+    current = api.client.get(f"/api/reports/{report_id}/versions/2", headers=headers).json()
+    assert current["content"] == "Beginn 18:15\n"
@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+import pytest
+from starlette.requests import Request
+
+import server
+
+ETAG = 'W/"0123456789abcdef01234567"'
+MODIFIED = datetime(2024, 5, 13, 14, 30, 15, 250000)
+
+
+def request(**headers):
+    return Request({"type": "http", "method": "GET", "path": "/",
+                    "headers": [(key.replace("_", "-").encode(), value.encode()) for key, value in headers.items()]})
+
+
+@pytest.mark.parametrize("if_none_match, fresh", [
+    (ETAG, True),
+    ('"0123456789abcdef01234567"', True),                 # weak comparison ignores W/
+    ('W/"other", ' + ETAG, True),
+    ('W/"other",W/"0123456789abcdef01234567"', True),
+    ('W/"other", "another"', False),
+    ("*", True),
+    ('W/"other", *', True),
+    ('W/"0123456789abcdef"', False),
+])
+def test_if_none_match(if_none_match, fresh):
+    assert server.request_is_fresh(request(if_none_match=if_none_match), ETAG, MODIFIED) is fresh
+
+
+def test_if_none_match_wins_over_if_modified_since():
+    headers = {"if_none_match": 'W/"other"', "if_modified_since": format_datetime(datetime(2030, 1, 1, tzinfo=timezone.utc), usegmt=True)}
+    assert server.request_is_fresh(request(**headers), ETAG, MODIFIED) is False
+
+
+@pytest.mark.parametrize("since, fresh", [
+    ("Mon, 13 May 2024 14:30:15 GMT", True),    # sub-second part of last_modified is ignored
+    ("Mon, 13 May 2024 14:30:14 GMT", False),
+    ("Tue, 14 May 2024 00:00:00 GMT", True),
+    ("not a date", False),
+])
+def test_if_modified_since(since, fresh):
+    assert server.request_is_fresh(request(if_modified_since=since), ETAG, MODIFIED) is fresh
+
+
+def test_no_validators():
+    assert server.request_is_fresh(request(), ETAG, MODIFIED) is False
+    assert server.request_is_fresh(request(if_modified_since="Tue, 14 May 2024 00:00:00 GMT"), ETAG, None) is False
+
+
+@pytest.mark.parametrize("path, content", [("/api/districts", server.DISTRICT_LIST), ("/api/teams", server.TEAM_LIST)])
+def test_fixed_lists_use_a_body_hash(api, path, content):
+    headers = api.login()
+    response = api.client.get(path, headers=headers)
+    assert response.json() == content
+    etag = response.headers["etag"]
+    # Unrelated counter bumps don't change the validator
+    api.run(server.bump_collection_version("districts", "teams"))
+    again = api.client.get(path, headers={**headers, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+
+def test_collection_lists_change_etag_on_writes(api):
+    headers = api.login()
+    first = api.client.get("/api/incidents", headers=headers)
+    etag = first.headers["etag"]
+    assert api.client.get("/api/incidents", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    api.client.post("/api/incidents", headers=headers, json={
+        "title": "Einbruch", "description": "Kiosk", "priority": "high",
+        "location": {"lat": 51.2879, "lng": 7.2954}, "address": "Marktplatz 1"})
+    changed = api.client.get("/api/incidents", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(changed.json()) == 1
@@ -0,0 +1,173 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from district_index import OUTSIDE, DistrictIndex, boundary_rings, points_in_polygon
+
+ORIGIN = (7.22, 51.24)  # lng, lat
+
+
+def naive_lookup(rings_by_district, lat, lng):
+    """Reference: even-odd ray casting over every ring of every district"""
+    for index, rings in enumerate(rings_by_district):
+        inside = False
+        for ring in rings:
+            for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+                if (y1 > lat) != (y2 > lat) and lng < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+                    inside = not inside
+        if inside:
+            return index
+    return OUTSIDE
+
+
+def jagged(start, end, vertices, amplitude, rng):
+    """Border from start (included) to end (excluded), wobbling sideways"""
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    normal = (-dy / math.hypot(dx, dy), dx / math.hypot(dx, dy))
+    points = [start]
+    for step in range(1, vertices):
+        f = step / vertices
+        wobble = amplitude * math.sin(f * math.pi) * rng.uniform(-1, 1)
+        points.append((start[0] + dx * f + normal[0] * wobble, start[1] + dy * f + normal[1] * wobble))
+    return points
+
+
+def tiled_districts(side=3, size=0.02, vertices=40, seed=7):
+    """side x side districts with shared jagged borders (no gaps, no overlaps)"""
+    rng = random.Random(seed)
+    corner = {(row, column): (ORIGIN[0] + column * size, ORIGIN[1] + row * size)
+              for row in range(side + 1) for column in range(side + 1)}
+    borders = {}
+
+    def border(a, b):
+        key = (min(a, b), max(a, b))
+        if key not in borders:
+            borders[key] = jagged(corner[key[0]], corner[key[1]], vertices, size * 0.1, rng)
+        points = borders[key]
+        return points if a == key[0] else [corner[a]] + points[1:][::-1]
+
+    districts = []
+    for row in range(side):
+        for column in range(side):
+            a, b, c, d = (row, column), (row, column + 1), (row + 1, column + 1), (row + 1, column)
+            ring = border(a, b) + border(b, c) + border(c, d) + border(d, a)
+            districts.append({"id": f"d{row}_{column}", "name": f"Bezirk {row}/{column}",
+                              "boundary": {"type": "Polygon", "coordinates": [[list(p) for p in ring + ring[:1]]]}})
+    return districts
+
+
+def square(x0, y0, size):
+    return [[x0, y0], [x0 + size, y0], [x0 + size, y0 + size], [x0, y0 + size], [x0, y0]]
+
+
+def random_points(count, x0, y0, width, height, seed=1):
+    rng = np.random.default_rng(seed)
+    return y0 + rng.random(count) * height, x0 + rng.random(count) * width
+
+
+def assert_matches_naive(districts, lat, lng, cell_deg=0.002):
+    index = DistrictIndex(districts, cell_deg=cell_deg)
+    rings = [boundary_rings(district["boundary"]) for district in districts]
+    expected = [naive_lookup(rings, la, ln) for la, ln in zip(lat.tolist(), lng.tolist())]
+    assert [index.lookup_index(la, ln) for la, ln in zip(lat.tolist(), lng.tolist())] == expected
+    assert index.assign(lat, lng).tolist() == expected
+    return index, expected
+
+
+def test_jagged_tiling_matches_naive_ray_casting():
+    districts = tiled_districts()
+    # Slightly beyond the tiled area, so OUTSIDE is exercised too
+    lat, lng = random_points(4000, ORIGIN[0] - 0.005, ORIGIN[1] - 0.005, 0.07, 0.07)
+    index, expected = assert_matches_naive(districts, lat, lng)
+    assert index.stats()["boundary_cells"] > 0
+    assert OUTSIDE in expected and len(set(expected)) == len(districts) + 1
+
+
+def test_points_near_vertices_match_naive():
+    districts = tiled_districts(side=2, vertices=20)
+    rng = np.random.default_rng(2)
+    vertices = np.array([point for district in districts
+                         for point in district["boundary"]["coordinates"][0]])
+    near = vertices[rng.integers(0, len(vertices), 2000)] + rng.normal(0, 2e-5, (2000, 2))
+    assert_matches_naive(districts, near[:, 1], near[:, 0])
+
+
+def test_polygon_with_hole():
+    outer = square(7.20, 51.20, 0.05)
+    hole = square(7.21, 51.21, 0.02)
+    districts = [
+        {"id": "ring", "boundary": {"type": "Polygon", "coordinates": [outer, hole[::-1]]}},
+        {"id": "island", "boundary": {"type": "Polygon", "coordinates": [square(7.215, 51.215, 0.005)]}},
+    ]
+    index = DistrictIndex(districts)
+    assert index.lookup(51.205, 7.205) == "ring"
+    assert index.lookup(51.212, 7.212) is None  # inside the hole
+    assert index.lookup(51.217, 7.217) == "island"
+    assert index.lookup(51.30, 7.30) is None
+    lat, lng = random_points(3000, 7.195, 51.195, 0.06, 0.06, seed=3)
+    assert_matches_naive(districts, lat, lng)
+
+
+def test_multipolygon_matches_naive():
+    districts = [{"id": "split", "boundary": {"type": "MultiPolygon", "coordinates": [
+        [square(7.20, 51.20, 0.01)],
+        [square(7.23, 51.23, 0.01), square(7.233, 51.233, 0.003)],
+    ]}}]
+    index = DistrictIndex(districts)
+    assert index.lookup(51.205, 7.205) == "split"
+    assert index.lookup(51.235, 7.235) is None
+    assert index.lookup(51.215, 7.215) is None
+    lat, lng = random_points(3000, 7.195, 51.195, 0.05, 0.05, seed=4)
+    assert_matches_naive(districts, lat, lng)
+
+
+def test_points_in_polygon_matches_naive():
+    ring = boundary_rings(tiled_districts(side=1)[0]["boundary"])[0]
+    points = np.array(ring)
+    edges = np.hstack([points, np.roll(points, -1, axis=0)])
+    lat, lng = random_points(2000, ORIGIN[0] - 0.005, ORIGIN[1] - 0.005, 0.03, 0.03, seed=5)
+    expected = [naive_lookup([[ring]], la, ln) == 0 for la, ln in zip(lat.tolist(), lng.tolist())]
+    assert points_in_polygon(lng, lat, edges, chunk=256).tolist() == expected
+
+
+def test_invalid_boundaries_are_skipped():
+    districts = [
+        {"id": "bad", "boundary": {"type": "Point", "coordinates": [7.2, 51.2]}},
+        {"id": "none"},
+        {"id": "ok", "boundary": {"type": "Polygon", "coordinates": [square(7.20, 51.20, 0.01)]}},
+    ]
+    index = DistrictIndex(districts)
+    assert index.ids == ["ok"]
+    assert index.lookup(51.205, 7.205) == "ok"
+
+
+def test_empty_index():
+    index = DistrictIndex([])
+    assert index.lookup(51.2, 7.2) is None
+    assert index.assign(np.array([51.2]), np.array([7.2])).tolist() == [OUTSIDE]
+    assert index.stats()["districts"] == 0
+
+
+@pytest.mark.parametrize("boundary", [
+    None,
+    {"type": "LineString", "coordinates": [[0, 0], [1, 1]]},
+    {"type": "Polygon", "coordinates": []},
+    {"type": "Polygon", "coordinates": [[]]},
+    {"type": "Polygon", "coordinates": [[[0, 0], [1, 1], [0, 0]]]},
+    {"type": "Polygon", "coordinates": [[[0, 0], [1], [1, 1], [0, 0]]]},
+    {"type": "Polygon", "coordinates": [[[0, 0], ["a", 1], [1, 1], [0, 0]]]},
+    {"type": "Polygon", "coordinates": [[[0, 0], [200, 0], [0, 1], [0, 0]]]},
+    {"type": "MultiPolygon", "coordinates": [[]]},
+])
+def test_boundary_rings_rejects_malformed(boundary):
+    with pytest.raises(ValueError):
+        boundary_rings(boundary)
+
+
+def test_boundary_rings_drops_closing_position():
+    rings = boundary_rings({"type": "Polygon", "coordinates": [square(7.2, 51.2, 0.01)]})
+    assert len(rings) == 1 and len(rings[0]) == 4
+    unclosed = boundary_rings({"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1]]]})
+    assert unclosed == [[(0.0, 0.0), (1.0, 0.0), (1.0, 1.0)]]
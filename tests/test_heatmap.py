@@ -0,0 +1,192 @@
+import asyncio
+import struct
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+from heatmap import EMPTY_TILE, KINDS, TILE_SIZE, HeatmapIndex, encode_png, mercator
+from track_store import to_ms
+
+LAT, LNG = 51.2879, 7.2954
+T0 = to_ms(datetime(2024, 5, 13, 14))
+HOUR_MS = 3_600_000
+Z = 14
+
+
+def tile_of(lat, lng, z=Z):
+    wx, wy = mercator(np.array([lat]), np.array([lng]))
+    return int(wx[0] * (1 << z)), int(wy[0] * (1 << z))
+
+
+def decode_png(png):
+    """(width, height, rgba) from a PNG written by encode_png"""
+    assert png[:8] == b"\x89PNG\r\n\x1a\n"
+    chunks, offset = {}, 8
+    while offset < len(png):
+        length, tag = struct.unpack(">I4s", png[offset:offset + 8])
+        data = png[offset + 8:offset + 8 + length]
+        crc, = struct.unpack(">I", png[offset + 8 + length:offset + 12 + length])
+        assert crc == zlib.crc32(tag + data) & 0xFFFFFFFF
+        chunks[tag] = data
+        offset += 12 + length
+    width, height, depth, color_type = struct.unpack(">IIBB", chunks[b"IHDR"][:10])
+    assert (depth, color_type) == (8, 6)
+    raw = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), np.uint8).reshape(height, width * 4 + 1)
+    assert not raw[:, 0].any()
+    return width, height, raw[:, 1:].reshape(height, width, 4)
+
+
+def add(index, count, kind="incidents", t_ms=T0, lat=LAT, lng=LNG):
+    index.add(np.full(count, t_ms, np.int64), np.full(count, lat), np.full(count, lng),
+              np.full(count, KINDS[kind], np.int8))
+
+
+def tile(index, kind=-1, start_ms=T0, end_ms=T0 + HOUR_MS, lat=LAT, lng=LNG):
+    x, y = tile_of(lat, lng)
+    return asyncio.run(index.tile(kind, Z, x, y, start_ms, end_ms))
+
+
+def test_encode_png_round_trip():
+    rgba = np.random.default_rng(0).integers(0, 256, (3, 5, 4), dtype=np.uint8)
+    width, height, decoded = decode_png(encode_png(rgba))
+    assert (width, height) == (5, 3)
+    np.testing.assert_array_equal(decoded, rgba)
+
+
+def test_empty_tile_is_transparent():
+    width, height, rgba = decode_png(EMPTY_TILE)
+    assert (width, height) == (TILE_SIZE, TILE_SIZE)
+    assert not rgba.any()
+
+
+def test_mercator_origin_and_orientation():
+    wx, wy = mercator(np.array([0.0, 60.0]), np.array([0.0, 180.0]))
+    assert wx.tolist() == [0.5, 1.0]
+    assert wy[0] == 0.5 and wy[1] < 0.5
+
+
+def test_render_counts_only_kind_time_and_tile():
+    index = HeatmapIndex(cell_px=8)
+    add(index, 5)
+    add(index, 3, kind="emergencies")
+    add(index, 7, t_ms=T0 + 2 * HOUR_MS)
+    add(index, 9, lat=LAT + 1)
+    _, _, rgba = decode_png(tile(index, kind=KINDS["incidents"]))
+    assert rgba.shape == (TILE_SIZE, TILE_SIZE, 4)
+    hot = rgba[..., 3] > 0
+    # One 8x8 cell, everything else transparent
+    assert hot.sum() == 64
+    assert tile(index, end_ms=T0) == EMPTY_TILE
+    assert tile(index, lng=LNG + 10) == EMPTY_TILE
+
+
+def test_denser_cells_are_more_opaque():
+    index = HeatmapIndex(saturation=50)
+    add(index, 1)
+    add(index, 50, lng=LNG + 0.002)
+    _, _, rgba = decode_png(tile(index))
+    alpha = np.unique(rgba[..., 3])
+    assert alpha.tolist()[0] == 0 and len(alpha) == 3
+    assert alpha[-1] == 235  # saturated
+
+
+def test_add_keeps_points_sorted_by_time():
+    index = HeatmapIndex()
+    add(index, 1, t_ms=T0 + HOUR_MS)
+    add(index, 1, t_ms=T0)
+    add(index, 1, t_ms=T0 + 2 * HOUR_MS)
+    assert index.points[0].tolist() == [T0, T0 + HOUR_MS, T0 + 2 * HOUR_MS]
+    assert len(index) == 3
+
+
+def test_add_invalidates_only_matching_tiles():
+    index = HeatmapIndex()
+    add(index, 1)
+    tile(index)                                    # all kinds, this hour
+    tile(index, kind=KINDS["emergencies"])         # other kind
+    tile(index, start_ms=T0 + HOUR_MS, end_ms=T0 + 2 * HOUR_MS)  # later hour
+    tile(index, lat=LAT + 1)                       # other position
+    assert len(index.tiles) == 4
+
+    add(index, 1, t_ms=T0 + 60_000)
+    x, y = tile_of(LAT, LNG)
+    assert set(index.tiles) == {
+        (KINDS["emergencies"], Z, x, y, T0, T0 + HOUR_MS),
+        (-1, Z, x, y, T0 + HOUR_MS, T0 + 2 * HOUR_MS),
+        (-1, Z, *tile_of(LAT + 1, LNG), T0, T0 + HOUR_MS),
+    }
+    assert all(key in index.tiles_by_position[key[1:4]] for key in index.tiles)
+
+
+def test_cached_tile_reflects_new_points():
+    index = HeatmapIndex()
+    assert tile(index) == EMPTY_TILE
+    add(index, 1)
+    assert tile(index) != EMPTY_TILE
+
+
+def test_tile_cache_is_bounded():
+    index = HeatmapIndex(max_tiles=2)
+    for hour in range(4):
+        tile(index, start_ms=T0 + hour * HOUR_MS, end_ms=T0 + (hour + 1) * HOUR_MS)
+    assert len(index.tiles) == 2
+    assert sum(len(keys) for keys in index.tiles_by_position.values()) == 2
+
+
+def test_points_from_falls_back_to_second_time_field():
+    created = datetime(2024, 1, 1, 12)
+    documents = [
+        {"id": "a", "location": {"lat": LAT, "lng": LNG}, "incident_created_at": created,
+         "created_at": datetime(2024, 2, 1)},
+        {"id": "b", "location": {"lat": LAT, "lng": LNG}, "created_at": created},
+        {"id": "c", "location": None, "created_at": created},
+    ]
+    ids, t, lat, lng, kind = HeatmapIndex.points_from(
+        documents, "incident_created_at", KINDS["incidents"], fallback_field="created_at")
+    assert [point_id for point_id, _ in ids] == ["a", "b"]
+    assert t.tolist() == [to_ms(created)] * 2
+    assert kind.tolist() == [KINDS["incidents"]] * 2
+
+
+def test_replace_invalidates_old_and_new_position():
+    index = HeatmapIndex()
+    add(index, 1)
+    add(index, 1, lat=LAT + 2)
+    tile(index)                                    # old position
+    tile(index, lat=LAT + 1)                       # new position
+    tile(index, lat=LAT + 2)                       # unchanged point
+    assert len(index.tiles) == 3
+
+    # The point at LAT moved to LAT + 1
+    index.replace(np.array([T0, T0]), np.array([LAT + 1, LAT + 2]), np.array([LNG, LNG]),
+                  np.full(2, KINDS["incidents"], np.int8))
+    assert set(index.tiles) == {(-1, Z, *tile_of(LAT + 2, LNG), T0, T0 + HOUR_MS)}
+    assert tile(index) == EMPTY_TILE
+    assert tile(index, lat=LAT + 1) != EMPTY_TILE
+
+
+def test_moved_and_deleted_incidents_leave_the_heatmap(api):
+    headers = api.login("admin")
+    incident = {"title": "Unfall", "description": "Blechschaden", "priority": "low",
+                "location": {"lat": LAT, "lng": LNG}, "address": "Marktplatz 1"}
+    incident_id = api.client.post("/api/incidents", headers=headers, json=incident).json()["id"]
+
+    def heatmap_tile(lat):
+        # The endpoint syncs at most once a second - sync here first
+        api.run(api.server.heatmap_index.sync(api.db, min_interval=0))
+        x, y = tile_of(lat, LNG)
+        return api.client.get(f"/api/heatmap/{Z}/{x}/{y}.png", headers=headers).content
+
+    assert heatmap_tile(LAT) != EMPTY_TILE
+    assert heatmap_tile(LAT + 1) == EMPTY_TILE
+
+    moved = api.client.put(f"/api/incidents/{incident_id}", headers=headers,
+                           json={"location": {"lat": LAT + 1, "lng": LNG}})
+    assert moved.status_code == 200
+    assert heatmap_tile(LAT) == EMPTY_TILE
+    assert heatmap_tile(LAT + 1) != EMPTY_TILE
+
+    assert api.client.delete(f"/api/incidents/{incident_id}", headers=headers).status_code == 200
+    assert heatmap_tile(LAT + 1) == EMPTY_TILE
+    assert len(api.server.heatmap_index) == 0
@@ -0,0 +1,86 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+IMAGE = "data:image/jpeg;base64," + "A" * 2000
+INCIDENT = {"title": "Einbruch", "description": "Fenster eingeschlagen", "priority": "high",
+            "location": {"lat": 51.2879, "lng": 7.2954}, "address": "Marktplatz 1", "images": [IMAGE]}
+
+
+def test_build_projection_defaults_to_allowed_fields():
+    assert server.build_projection(None, ["id", "title"]) == {"id": 1, "title": 1, "_id": 0}
+    assert server.build_projection("title", ["id", "title"]) == {"id": 1, "title": 1, "_id": 0}
+
+
+def test_list_fields_leave_out_images():
+    assert "images" not in server.INCIDENT_LIST_FIELDS
+    assert "photo" not in server.PERSON_LIST_FIELDS
+    assert "images" not in server.REPORT_LIST_PROJECTION
+
+
+def test_images_cannot_be_requested_from_lists():
+    with pytest.raises(HTTPException) as error:
+        server.build_projection("title,images", server.INCIDENT_LIST_FIELDS)
+    assert error.value.status_code == 400
+
+
+def test_incident_images_only_in_detail(api):
+    headers = api.login()
+    incident_id = api.client.post("/api/incidents", headers=headers, json=INCIDENT).json()["id"]
+
+    listed = api.client.get("/api/incidents", headers=headers).json()
+    assert [incident["id"] for incident in listed] == [incident_id]
+    assert "images" not in listed[0]
+
+    detail = api.client.get(f"/api/incidents/{incident_id}", headers=headers).json()
+    assert detail["images"] == [IMAGE]
+
+
+def test_person_photo_only_in_detail(api):
+    headers = api.login()
+    person = {"first_name": "Anna", "last_name": "Schmidt", "photo": IMAGE}
+    person_id = api.client.post("/api/persons", headers=headers, json=person).json()["id"]
+
+    listed = api.client.get("/api/persons", headers=headers).json()
+    assert [person["id"] for person in listed] == [person_id]
+    assert "photo" not in listed[0]
+    assert api.client.get("/api/persons?fields=photo", headers=headers).status_code == 400
+
+    detail = api.client.get(f"/api/persons/{person_id}", headers=headers).json()
+    assert detail["photo"] == IMAGE
+
+
+def insert_report(api, author_id):
+    report_id = str(uuid.uuid4())
+    api.run(api.db.reports.insert_one({
+        "id": report_id, "title": "Nachtschicht", "content": "Ruhig.\n", "author_id": author_id,
+        "author_name": "Wache", "shift_date": "2026-10-18", "images": [IMAGE], "status": "draft",
+        "created_at": datetime.utcnow(), "updated_at": datetime.utcnow(),
+    }))
+    return report_id
+
+
+def test_report_images_only_in_detail(api):
+    headers = api.login()
+    author_id = api.client.get("/api/auth/me", headers=headers).json()["id"]
+    report_id = insert_report(api, author_id)
+
+    listed = api.client.get("/api/reports", headers=headers).json()
+    assert [report["id"] for report in listed] == [report_id]
+    assert "images" not in listed[0]
+
+    detail = api.client.get(f"/api/reports/{report_id}", headers=headers)
+    assert detail.status_code == 200
+    assert detail.json()["images"] == [IMAGE]
+
+
+def test_report_detail_is_limited_to_author_and_admin(api):
+    report_id = insert_report(api, str(uuid.uuid4()))
+
+    assert api.client.get(f"/api/reports/{report_id}", headers=api.login()).status_code == 403
+    assert api.client.get(f"/api/reports/{report_id}", headers=api.login("admin")).status_code == 200
+    assert api.client.get("/api/reports/missing", headers=api.login("admin")).status_code == 404
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from geo import haversine_m
+from patrol_analytics import DistrictCenters, shift_report
+from track_store import Track
+
+T0 = 1_715_608_800_000  # 2024-05-13 14:00 UTC in ms
+DISTRICTS = [
+    {"id": "nord", "name": "Nord", "coordinates": {"lat": 51.30, "lng": 7.30}},
+    {"id": "sued", "name": "Süd", "coordinates": {"lat": 51.25, "lng": 7.30}},
+    {"id": "ohne", "name": "Ohne Koordinaten"},
+]
+
+
+def walk(user_id, lat, lng, count, step_s=30, step_deg=1e-4):
+    """Straight walk north, one ping every step_s seconds"""
+    t = T0 + np.arange(count, dtype=np.int64) * step_s * 1000
+    return Track(user_id, t, lat + np.arange(count) * step_deg, np.full(count, lng))
+
+
+def test_district_centers_skip_districts_without_coordinates():
+    centers = DistrictCenters(DISTRICTS, max_radius_m=2000)
+    assert centers.ids == ["nord", "sued"]
+    index = centers.assign(np.array([51.301, 51.249, 52.0]), np.array([7.30, 7.30, 7.30]))
+    assert index.tolist() == [0, 1, -1]
+
+
+def test_district_centers_without_districts_or_points():
+    assert DistrictCenters([]).assign(np.array([51.3]), np.array([7.3])).tolist() == [-1]
+    assert DistrictCenters(DISTRICTS).assign(np.empty(0), np.empty(0)).tolist() == []
+
+
+@pytest.mark.parametrize("tracks", [{}, {"officer-1": Track.empty("officer-1")}])
+def test_shift_report_without_points(tracks):
+    report = shift_report(tracks, DistrictCenters(DISTRICTS))
+    assert report["officers"] == []
+    assert report["totals"] == {"officers": 0, "points": 0, "distance_km": 0.0}
+    assert report["coverage"]["cells_visited"] == 0
+    assert [row["dwell_minutes"] for row in report["districts"]] == [0.0, 0.0]
+
+
+def test_shift_report_single_point():
+    track = walk("officer-1", 51.30, 7.30, 1)
+    report = shift_report({"officer-1": track}, DistrictCenters(DISTRICTS))
+    officer, = report["officers"]
+    assert officer["points"] == 1
+    assert officer["distance_km"] == 0.0
+    assert officer["dwell_minutes"] == {}
+    assert officer["cells_visited"] == 1
+    assert report["coverage"]["cells_visited"] == 1
+
+
+def test_shift_report_single_officer():
+    track = walk("officer-1", 51.30, 7.30, 121)  # one hour, ~11 m per step
+    report = shift_report({"officer-1": track}, DistrictCenters(DISTRICTS), grid_m=100)
+    officer, = report["officers"]
+    expected_m = haversine_m(51.30, 7.30, float(track.lat[-1]), 7.30)
+
+    assert officer["points"] == 121
+    assert officer["distance_km"] == pytest.approx(expected_m / 1000, abs=1e-3)
+    assert officer["active_minutes"] == 60.0
+    assert officer["dwell_minutes"] == {"nord": 60.0}
+    assert officer["outside_minutes"] == 0.0
+    # ~1.3 km north on a 100 m grid
+    assert 13 <= officer["cells_visited"] <= 15
+    nord, sued = report["districts"]
+    assert (nord["officers"], sued["officers"]) == (1, 0)
+    assert nord["cells_visited"] == officer["cells_visited"]
+    assert report["totals"]["distance_km"] == officer["distance_km"]
+
+
+def test_shift_report_drops_gaps_and_jumps():
+    track = walk("officer-1", 51.30, 7.30, 11)
+    lat = track.lat.copy()
+    lat[5:] += 1.0  # 111 km jump within 30 s
+    t = track.t.copy()
+    t[8:] += 3_600_000  # app in background for an hour
+    jumpy = Track("officer-1", t, lat, track.lng)
+    officer, = shift_report({"officer-1": jumpy}, DistrictCenters([]))["officers"]
+    # 10 segments, minus the jump and the gap
+    assert officer["active_minutes"] == 4.0
+    assert officer["outside_minutes"] == 4.0
+
+
+def test_shift_report_keeps_officers_apart():
+    tracks = {
+        "officer-1": walk("officer-1", 51.30, 7.30, 61),
+        "officer-2": walk("officer-2", 51.25, 7.30, 31),
+    }
+    report = shift_report(tracks, DistrictCenters(DISTRICTS))
+    by_id = {row["user_id"]: row for row in report["officers"]}
+    # No segment from the last point of officer-1 to the first of officer-2
+    assert by_id["officer-1"]["dwell_minutes"] == {"nord": 30.0}
+    assert by_id["officer-2"]["dwell_minutes"] == {"sued": 15.0}
+    assert report["officers"][0]["user_id"] == "officer-1"
+    assert report["totals"]["points"] == 92
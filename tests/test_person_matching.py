@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import pytest
+
+from person_matching import SYNC_OVERLAP, PersonMatchIndex, koelner_phonetik, normalize_name
+
+
+@pytest.mark.parametrize("name, code", [
+    ("Müller", "657"),
+    ("Mueller", "657"),
+    ("Wikipedia", "3412"),
+    ("Müller-Lüdenscheidt", "65752682"),
+    ("Breschnew", "17863"),
+    ("Meyer", "67"),
+    ("Maier", "67"),
+    ("Christoph", "47823"),
+    ("Xaver", "4837"),
+    ("", ""),
+    (None, ""),
+])
+def test_koelner_phonetik(name, code):
+    assert koelner_phonetik(name) == code
+
+
+def test_normalize_name_folds_umlauts_and_punctuation():
+    assert normalize_name("  Jürgen-Öztürk ß ") == "JURGEN OZTURK SS"
+
+
+def person(person_id, first, last, birth_date=None, case_number=None, **extra):
+    return {"id": person_id, "first_name": first, "last_name": last, "birth_date": birth_date,
+            "case_number": case_number, "status": "vermisst", **extra}
+
+
+@pytest.fixture
+def index():
+    index = PersonMatchIndex()
+    index.load([
+        person("1", "Hans", "Müller", "1980-01-01"),
+        person("2", "Hans", "Mueller", "1980-01-01"),
+        person("3", "Hans", "Müller", "1955-07-07"),
+        person("4", "Petra", "Schmidt", case_number="AZ-2024/17"),
+        person("5", "Klaus", "Wagner"),
+    ])
+    return index
+
+
+def test_find_duplicates_ranks_exact_birth_date_first(index):
+    matches = index.find_duplicates(person(None, "Hans", "Müller", "1980-01-01"))
+    assert [match["id"] for match in matches[:2]] == ["1", "2"]
+    assert "birth_date" in matches[0]["reasons"]
+    assert all(match["id"] != "5" for match in matches)
+    # A different birth date lowers the score below the threshold
+    assert "3" not in [match["id"] for match in matches]
+
+
+def test_find_duplicates_skips_the_person_itself(index):
+    assert "1" not in [match["id"] for match in index.find_duplicates(index.entries["1"] | {"id": "1"})]
+
+
+def test_case_number_matches_regardless_of_name(index):
+    matches = index.find_duplicates(person(None, "P.", "Schmitz", case_number="az 2024 17"))
+    assert matches[0]["id"] == "4"
+    assert matches[0]["score"] >= 0.95
+    assert "case_number" in matches[0]["reasons"]
+
+
+def test_archived_person_leaves_the_index(index):
+    index.apply(person("2", "Hans", "Mueller", "1980-01-01", is_active=False))
+    assert "2" not in index.entries
+    assert "2" not in [match["id"] for match in index.find_duplicates(person(None, "Hans", "Müller", "1980-01-01"))]
+
+
+def test_duplicate_report_lists_each_pair_once(index):
+    pairs = [(pair["person_a"]["id"], pair["person_b"]["id"]) for pair in index.duplicate_report()]
+    assert ("1", "2") in pairs
+    assert len(pairs) == len(set(pairs))
+
+
+def test_sync_cursor_only_moves_on_loaded_documents():
+    index = PersonMatchIndex()
+    assert index.sync_query() == {}
+    index.load([person("1", "Hans", "Müller", updated_at=datetime(2024, 5, 1, 12))])
+    assert index.last_sync == datetime(2024, 5, 1, 12)
+    # A worker's own write must not skip persons other workers wrote earlier
+    index.apply(person("2", "Petra", "Schmidt", updated_at=datetime(2024, 5, 1, 13)))
+    assert "2" in index.entries
+    assert index.last_sync == datetime(2024, 5, 1, 12)
+    assert index.sync_query() == {"updated_at": {"$gte": datetime(2024, 5, 1, 12) - SYNC_OVERLAP}}
+
+
+def test_reloading_the_overlap_window_is_idempotent(index):
+    before = {key: set(ids) for key, ids in index.by_phonetic.items()}
+    index.load([person("1", "Hans", "Müller", "1980-01-01"), person("1", "Hans", "Müller", "1980-01-01")])
+    assert len(index) == 5
+    assert index.by_phonetic == before
@@ -0,0 +1,129 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from report_versions import (apply_content_patch, field_changes, legacy_version_entries, make_content_patch,
+                             rebuild_revision)
+
+
+@pytest.mark.parametrize("old, new", [
+    ("", ""),
+    ("", "Neuer Bericht\n"),
+    ("Alter Bericht\n", ""),
+    ("Zeile 1\nZeile 2", "Zeile 1\nZeile 2\n"),        # trailing newline added
+    ("Zeile 1\nZeile 2\n", "Zeile 1\nZeile 2"),        # and removed
+    ("a\nb\nc\n", "a\nB\nc\nd\n"),
+    ("Straße: Königsallee\nÄrger mit 🚓\n", "Straße: Königsallee 12\nÄrger mit 🚓\n"),
+    ("Windows\r\nZeilen\r\n", "Windows\r\nZeilen geändert\r\n"),
+    ("Trenner\u2028im Text\n", "Trenner\u2028im Text!\n"),  # splitlines() splits here too
+    ("keine Änderung\n", "keine Änderung\n"),
+])
+def test_patch_round_trip(old, new):
+    patch = make_content_patch(old, new)
+    assert apply_content_patch(new, patch) == old
+    if old == new:
+        assert patch == []
+
+
+def test_patch_only_stores_changed_lines():
+    old = "".join(f"Zeile {i}\n" for i in range(1000))
+    new = old.replace("Zeile 500\n", "Zeile 500 (korrigiert)\n")
+    patch = make_content_patch(old, new)
+    assert patch == [[500, 501, ["Zeile 500\n"]]]
+
+
+def test_random_edit_chains_round_trip():
+    rng = random.Random(42)
+    words = ["Einsatz", "Streife", "Ärger", "Zeuge", "", "🚓", "Ende"]
+    content = "".join(f"{rng.choice(words)}\n" for _ in range(30))
+    for _ in range(50):
+        lines = content.splitlines(keepends=True)
+        for _ in range(rng.randint(1, 4)):
+            position = rng.randint(0, len(lines))
+            action = rng.choice(["insert", "delete", "change"])
+            if action == "insert" or not lines:
+                lines.insert(position, f"{rng.choice(words)}\n")
+            elif action == "delete":
+                del lines[min(position, len(lines) - 1)]
+            else:
+                lines[min(position, len(lines) - 1)] = f"{rng.choice(words)} neu\n"
+        new = "".join(lines)
+        assert apply_content_patch(new, make_content_patch(content, new)) == content
+        content = new
+
+
+def edit(report, versions, title=None, content=None, shift_date=None):
+    """What update_report stores: a versions entry for the replaced revision"""
+    updated = {
+        "title": title if title is not None else report["title"],
+        "content": content if content is not None else report["content"],
+        "shift_date": shift_date if shift_date is not None else report["shift_date"],
+    }
+    versions.insert(0, {
+        "version": report["version"],
+        "changes": field_changes(report, updated),
+        "content_patch": make_content_patch(report["content"], updated["content"])
+        if report["content"] != updated["content"] else [],
+    })
+    return {**report, **updated, "version": report["version"] + 1}
+
+
+def test_rebuild_every_version_from_current_content():
+    report = {"id": "r1", "title": "Streife Nord", "content": "Beginn 18:00\n", "shift_date": "2024-05-13",
+              "version": 1}
+    versions = []  # newest first, like the $gte query sorted by version desc
+    revisions = [{field: report[field] for field in ("title", "content", "shift_date")}]
+    steps = [
+        {"content": "Beginn 18:00\nRuhestörung Marktplatz\n"},
+        {"title": "Streife Nord (Nachtrag)"},
+        {"content": "Beginn 18:15\nRuhestörung Marktplatz\n", "shift_date": "2024-05-14"},
+        {"content": ""},
+        {"content": "Neu geschrieben 🚓"},
+    ]
+    for step in steps:
+        report = edit(report, versions, **step)
+        revisions.append({field: report[field] for field in ("title", "content", "shift_date")})
+
+    assert report["version"] == len(steps) + 1
+    for version in range(1, report["version"] + 1):
+        newer = [entry for entry in versions if entry["version"] >= version]
+        assert rebuild_revision(report, newer) == revisions[version - 1]
+
+
+def test_field_changes_only_lists_changed_fields():
+    existing = {"title": "A", "content": "x", "shift_date": "2024-05-13"}
+    assert field_changes(existing, {**existing, "content": "y"}) == {}
+    assert field_changes(existing, {**existing, "title": "B"}) == {"title": {"old": "A", "new": "B"}}
+
+
+def test_legacy_history_migration():
+    edited_at = datetime(2023, 11, 2, 9, 30)
+    report = {"id": "r1", "title": "T", "content": "neu", "edit_history": [
+        {"edited_by": "u1", "edited_by_name": "Anna", "edited_at": edited_at,
+         "changes": {"content": {"old": "alt", "new": "neu"}}},
+        {"edited_by": "u2", "edited_at": edited_at},
+    ]}
+    entries = legacy_version_entries(report)
+    assert [entry["edited_by"] for entry in entries] == ["u1", "u2"]
+    assert all(entry["report_id"] == "r1" and entry["version"] == 0 and entry["legacy"] for entry in entries)
+    assert entries[0]["changes"] == {"content": {"old": "alt", "new": "neu"}}
+    assert entries[1]["changes"] == {} and entries[1]["edited_by_name"] is None
+    assert len({entry["id"] for entry in entries}) == 2
+    assert "content_patch" not in entries[0]
+
+
+def test_legacy_entries_do_not_affect_rebuilt_versions():
+    report = {"id": "r1", "title": "T", "content": "neu\n", "shift_date": "2024-05-13", "version": 2,
+              "edit_history": [{"changes": {"content": {"old": "uralt", "new": "alt"}}}]}
+    versions = legacy_version_entries(report)
+    report.pop("edit_history")
+    report_v2 = edit({**report, "content": "alt\n", "version": 1}, versions, content="neu\n")
+    # get_report_version only reads entries with version >= 1
+    newer = [entry for entry in versions if entry["version"] >= 1]
+    assert rebuild_revision(report_v2, newer)["content"] == "alt\n"
+
+
+@pytest.mark.parametrize("history", [None, []])
+def test_legacy_migration_without_history(history):
+    assert legacy_version_entries({"id": "r1", "edit_history": history}) == []
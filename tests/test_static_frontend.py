@@ -0,0 +1,45 @@
+import gzip
+
+import pytest
+
+from static_frontend import IMMUTABLE, REVALIDATE, StaticFrontend
+
+
+@pytest.fixture
+def frontend(tmp_path):
+    html = b"<html>" + b"x" * 2000 + b"</html>"
+    (tmp_path / "index.html").write_bytes(html)
+    (tmp_path / "index.html.gz").write_bytes(gzip.compress(html))
+    (tmp_path / "index.html.br").write_bytes(b"brotli bytes")
+    (tmp_path / "app-0123456789abcdef.js").write_bytes(b"console.log(1)")
+    return StaticFrontend(tmp_path)
+
+
+def test_each_encoding_has_its_own_etag(frontend):
+    identity = frontend.response("/", {})
+    gzipped = frontend.response("/", {"accept-encoding": "gzip"})
+    brotli = frontend.response("/", {"accept-encoding": "gzip, br"})
+
+    assert "content-encoding" not in identity.headers
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert brotli.headers["content-encoding"] == "br"
+    etag = identity.headers["etag"]
+    assert gzipped.headers["etag"] == etag[:-1] + '-gzip"'
+    assert brotli.headers["etag"] == etag[:-1] + '-br"'
+    assert all(response.headers["vary"] == "Accept-Encoding" for response in (identity, gzipped, brotli))
+
+
+def test_if_none_match_only_matches_the_same_encoding(frontend):
+    gzip_etag = frontend.response("/", {"accept-encoding": "gzip"}).headers["etag"]
+
+    assert frontend.response("/", {"accept-encoding": "gzip", "if-none-match": gzip_etag}).status_code == 304
+    assert frontend.response("/", {"accept-encoding": "gzip", "if-none-match": "W/" + gzip_etag}).status_code == 304
+    # A client that now gets another encoding must not reuse the gzip body
+    assert frontend.response("/", {"accept-encoding": "br", "if-none-match": gzip_etag}).status_code == 200
+    assert frontend.response("/", {"if-none-match": gzip_etag}).status_code == 200
+
+
+def test_cache_control_and_spa_fallback(frontend):
+    assert frontend.response("/app-0123456789abcdef.js", {}).headers["cache-control"] == IMMUTABLE
+    assert frontend.response("/settings", {}).headers["cache-control"] == REVALIDATE
+    assert frontend.response("/missing.js", {}).status_code == 404
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from track_store import Track, decode_bucket, encode_bucket, floor_hour, naive_utc, to_ms
+
+HOUR = datetime(2024, 5, 13, 14)
+
+
+def make_track(count=720, seed=1):
+    rng = np.random.default_rng(seed)
+    t = to_ms(HOUR) + np.sort(rng.choice(3_600_000, count, replace=False)).astype(np.int64)
+    lat = 51.2879 + np.cumsum(rng.normal(0, 1e-4, count))
+    lng = 7.2954 + np.cumsum(rng.normal(0, 1e-4, count))
+    return Track("officer-1", t, lat, lng)
+
+
+def test_bucket_round_trip_keeps_times_and_microdegrees():
+    track = make_track()
+    bucket = encode_bucket(track, HOUR)
+    assert bucket["_id"] == "officer-1:2024051314"
+    assert bucket["count"] == len(track)
+    assert bucket["end"] == HOUR + timedelta(hours=1)
+
+    decoded = decode_bucket(bucket)
+    assert decoded.user_id == "officer-1"
+    np.testing.assert_array_equal(decoded.t, track.t)
+    np.testing.assert_allclose(decoded.lat, track.lat, atol=5e-7)
+    np.testing.assert_allclose(decoded.lng, track.lng, atol=5e-7)
+    # Far smaller than 24 bytes/point in memory
+    assert len(bucket["data"]) < len(track) * 8
+
+
+def test_empty_bucket_round_trip():
+    decoded = decode_bucket(encode_bucket(Track.empty("u"), HOUR))
+    assert len(decoded) == 0
+
+
+def test_unknown_encoding_is_rejected():
+    bucket = encode_bucket(make_track(10), HOUR)
+    bucket["encoding"] = "something/2"
+    with pytest.raises(ValueError):
+        decode_bucket(bucket)
+
+
+def test_from_pings_sorts_and_skips_invalid():
+    pings = [
+        {"location": {"lat": 51.1, "lng": 7.1}, "timestamp": HOUR + timedelta(seconds=30)},
+        {"location": {"latitude": 51.0, "longitude": 7.0}, "timestamp": HOUR},
+        {"location": None, "timestamp": HOUR},
+        {"location": {"lat": 51.2, "lng": 7.2}, "timestamp": "not a datetime"},
+    ]
+    track = Track.from_pings("u", pings)
+    assert track.t.tolist() == [to_ms(HOUR), to_ms(HOUR) + 30_000]
+    assert track.lat.tolist() == [51.0, 51.1]
+
+
+def test_concat_is_idempotent_for_the_same_points():
+    track = make_track(100)
+    merged = Track.concat("officer-1", [track, track, track.between(track.t[10], track.t[20])])
+    assert len(merged) == len(track)
+    np.testing.assert_array_equal(merged.t, track.t)
+
+
+def test_between_is_half_open():
+    track = make_track(100)
+    part = track.between(int(track.t[5]), int(track.t[15]))
+    assert part.t.tolist() == track.t[5:15].tolist()
+
+
+def test_time_helpers():
+    assert floor_hour(datetime(2024, 5, 13, 14, 59, 59, 999)) == HOUR
+    aware = datetime(2024, 5, 13, 16, tzinfo=timezone(timedelta(hours=2)))
+    assert naive_utc(aware) == HOUR
+    assert to_ms(datetime(1970, 1, 1, 0, 0, 1)) == 1000